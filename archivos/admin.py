@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ArchivoCargado, CarpetaCompartida, ArchivoDetectado, ArchivoProcesado
+from .models import ArchivoCargado, CarpetaCompartida, ArchivoDetectado, ArchivoProcesado, TrabajoCola
 
 @admin.register(CarpetaCompartida)
 class CarpetaCompartidaAdmin(admin.ModelAdmin):
@@ -23,3 +23,9 @@ class ArchivoCargadoAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'tipo', 'fecha_carga', 'filas']
     list_filter = ['tipo', 'fecha_carga']
     search_fields = ['nombre']
+
+@admin.register(TrabajoCola)
+class TrabajoColaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'estado', 'sentencias_ejecutadas', 'filas_cargadas', 'worker', 'creado', 'finalizado']
+    list_filter = ['tipo', 'estado', 'creado']
+    readonly_fields = ['iniciado', 'finalizado', 'actualizado']
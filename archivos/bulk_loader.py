@@ -0,0 +1,170 @@
+"""
+Carga masiva de DataFrames en bases de datos
+
+Reemplaza a df.to_sql(...) en los puntos de carga de la aplicación:
+  - La tabla se crea una sola vez con los tipos inferidos de todo el DataFrame
+    (o los indicados en `dtype`), igual que haría pandas.
+  - Las filas se insertan por lotes de `batch_size`, cada uno en su propia
+    transacción, y tras cada commit se informa el avance a `progreso`.
+  - La estrategia de inserción depende del dialecto:
+      * mssql+pyodbc: executemany con `fast_executemany` (parámetros en bloque)
+      * postgresql+psycopg2: COPY ... FROM STDIN en formato CSV
+      * resto (sqlite, mysql, ...): executemany del driver con el INSERT ya
+        compilado; pymysql además reescribe el lote como un INSERT multifila
+
+La misma API funciona con SQLite para poder medir tiempos en local.
+"""
+import csv
+import io
+import logging
+import weakref
+
+import pandas as pd
+from django.conf import settings
+from sqlalchemy import MetaData, Table, event, inspect, text
+
+from . import metadatos
+
+logger = logging.getLogger(__name__)
+
+TAMANIO_LOTE = getattr(settings, 'CARGA_MASIVA_TAMANIO_LOTE', 10000)
+
+_motores_con_fast_executemany = weakref.WeakSet()
+
+
+def _habilitar_fast_executemany(engine):
+    """Activa fast_executemany de pyodbc en las ejecuciones múltiples del motor."""
+    if engine in _motores_con_fast_executemany:
+        return
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _fast_executemany(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            cursor.fast_executemany = True
+
+    _motores_con_fast_executemany.add(engine)
+
+
+def _preparar_tabla(df, tabla, engine, if_exists, dtype, schema):
+    """Crea, reemplaza o valida la tabla destino y la devuelve reflejada."""
+    if if_exists not in ('fail', 'replace', 'append'):
+        raise ValueError(f"Valor de if_exists no válido: {if_exists}")
+
+    existe = inspect(engine).has_table(tabla, schema=schema)
+    if existe and if_exists == 'fail':
+        raise ValueError(f"La tabla '{tabla}' ya existe.")
+
+    with engine.begin() as conn:
+        if existe and if_exists == 'replace':
+            Table(tabla, MetaData(), schema=schema).drop(conn)
+            existe = False
+        if not existe:
+            # Tipos inferidos con las mismas reglas que df.to_sql
+            ddl = pd.io.sql.get_schema(df, tabla, con=conn, dtype=dtype, schema=schema)
+            conn.execute(text(ddl))
+
+    return Table(tabla, MetaData(), schema=schema, autoload_with=engine)
+
+
+def _filas(lote, procesadores=None):
+    """
+    Filas del lote como tuplas, con None en lugar de NaN/NaT y aplicando los
+    conversores de tipo de SQLAlchemy columna a columna.
+    """
+    lote = lote.astype(object).where(pd.notna(lote), None)
+    columnas = []
+    for i, col in enumerate(lote.columns):
+        valores = lote[col].tolist()
+        procesar = procesadores[i] if procesadores else None
+        if procesar is not None:
+            valores = [None if v is None else procesar(v) for v in valores]
+        columnas.append(valores)
+    return list(zip(*columnas))
+
+
+def _insertador(conn, tabla_sa, columnas):
+    """
+    Devuelve una función insertar(conn, lote).
+
+    Con drivers de parámetros posicionales (pyodbc, sqlite3, pymysql) el INSERT
+    se compila una vez y se ejecuta directamente con cursor.executemany; así se
+    evita la preparación de parámetros fila a fila de SQLAlchemy. Con el resto
+    se usa el executemany de SQLAlchemy Core.
+    """
+    dialecto = conn.dialect
+    if dialecto.positional:
+        sql = str(tabla_sa.insert().compile(dialect=dialecto, column_keys=columnas))
+        procesadores = [tabla_sa.c[c].type._cached_bind_processor(dialecto) for c in columnas]
+        return lambda c, lote: c.exec_driver_sql(sql, _filas(lote, procesadores))
+
+    def _insertar_core(c, lote):
+        registros = [dict(zip(columnas, fila)) for fila in _filas(lote)]
+        c.execute(tabla_sa.insert(), registros)
+    return _insertar_core
+
+
+def _insertar_copy(conn, tabla_sa, lote):
+    """COPY FROM STDIN (psycopg2). Devuelve False si el driver no lo admite."""
+    cursor = conn.connection.driver_connection.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        return False
+
+    preparer = conn.dialect.identifier_preparer
+    columnas = ', '.join(preparer.quote(str(c)) for c in lote.columns)
+    buffer = io.StringIO()
+    lote.to_csv(buffer, index=False, header=False, na_rep='\\N', quoting=csv.QUOTE_MINIMAL)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {preparer.format_table(tabla_sa)} ({columnas}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+        buffer
+    )
+    return True
+
+
+def cargar_dataframe(df, tabla, engine, if_exists='replace', batch_size=None, dtype=None,
+                     progreso=None, schema=None):
+    """
+    Carga un DataFrame en una tabla por lotes.
+
+    Parámetros:
+    - df: DataFrame a cargar (el índice no se guarda)
+    - tabla: Nombre de la tabla destino
+    - engine: Engine de SQLAlchemy
+    - if_exists: 'replace', 'append' o 'fail' (como en df.to_sql)
+    - batch_size: Filas por lote y por transacción (por defecto CARGA_MASIVA_TAMANIO_LOTE)
+    - dtype: Dict {columna: tipo SQLAlchemy} para fijar tipos al crear la tabla
+    - progreso: Función opcional progreso(filas_cargadas, total_filas) llamada tras cada lote
+    - schema: Esquema de la tabla destino
+
+    Retorna:
+    - Número de filas cargadas
+    """
+    batch_size = batch_size or TAMANIO_LOTE
+    df = df.reset_index(drop=True)
+    df.columns = [str(c) for c in df.columns]
+
+    tabla_sa = _preparar_tabla(df, tabla, engine, if_exists, dtype, schema)
+
+    dialecto = engine.dialect.name
+    driver = engine.dialect.driver
+    if dialecto == 'mssql' and driver == 'pyodbc':
+        _habilitar_fast_executemany(engine)
+    usar_copy = dialecto == 'postgresql' and driver == 'psycopg2'
+
+    total = len(df)
+    cargadas = 0
+    insertar = None
+    for inicio in range(0, total, batch_size):
+        lote = df.iloc[inicio:inicio + batch_size]
+        with engine.begin() as conn:
+            if not (usar_copy and _insertar_copy(conn, tabla_sa, lote)):
+                insertar = insertar or _insertador(conn, tabla_sa, list(df.columns))
+                insertar(conn, lote)
+        cargadas += len(lote)
+        if progreso:
+            progreso(cargadas, total)
+
+    # La tabla pudo crearse o cambiar de tamaño: descartar sus metadatos en caché
+    metadatos.invalidar(engine)
+    logger.info(f"Carga masiva en {tabla} ({dialecto}+{driver}): {cargadas} filas en lotes de {batch_size}")
+    return cargadas
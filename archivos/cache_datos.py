@@ -0,0 +1,206 @@
+"""
+Caché en disco de DataFrames ya parseados
+
+Guarda el resultado de leer un archivo de carpeta compartida (y una hoja, si es
+Excel) en formato Arrow IPC (Feather v2). Las páginas se leen mapeando el archivo
+en memoria y cortando solo el rango pedido, así que paginar un archivo grande
+ya no vuelve a parsear el Excel/CSV original en cada petición.
+
+Clave de caché: (ruta_completa, hoja, mtime, tamaño, fecha_modificacion del
+ArchivoDetectado). Si cualquiera cambia se construye una nueva entrada y las
+versiones anteriores del mismo archivo se eliminan. El tamaño total del
+directorio se limita con expulsión LRU.
+"""
+import hashlib
+import logging
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from .ingesta import iterar_bloques
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = None
+    pa_ipc = None
+
+CACHE_DIR = Path(getattr(settings, 'CACHE_DATOS_DIR', Path(settings.BASE_DIR) / 'cache_datos'))
+CACHE_MAX_BYTES = getattr(settings, 'CACHE_DATOS_MAX_BYTES', 2 * 1024 ** 3)
+CACHE_MAX_ARCHIVOS = getattr(settings, 'CACHE_DATOS_MAX_ARCHIVOS', 500)
+
+EXTENSION = '.arrow'
+
+
+def disponible():
+    """Indica si la caché puede usarse (requiere pyarrow)."""
+    return pa is not None
+
+
+def _hash(texto, largo=16):
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:largo]
+
+
+def _prefijo(archivo_detectado, hoja):
+    return f"{_hash(archivo_detectado.ruta_completa)}_{_hash(str(hoja or ''), 8)}"
+
+
+def _version(archivo_detectado):
+    st = os.stat(archivo_detectado.ruta_completa)
+    fecha = archivo_detectado.fecha_modificacion
+    marca = fecha.timestamp() if fecha else ''
+    return _hash(f"{st.st_mtime_ns}|{st.st_size}|{marca}")
+
+
+def ruta_cache(archivo_detectado, hoja=None):
+    """Ruta del archivo de caché para la versión actual del archivo/hoja."""
+    return CACHE_DIR / f"{_prefijo(archivo_detectado, hoja)}_{_version(archivo_detectado)}{EXTENSION}"
+
+
+def invalidar(archivo_detectado, hoja=None, conservar=None):
+    """
+    Elimina las entradas en caché de un archivo/hoja, excepto `conservar`.
+    """
+    if not CACHE_DIR.exists():
+        return
+    for ruta in CACHE_DIR.glob(f"{_prefijo(archivo_detectado, hoja)}_*{EXTENSION}"):
+        if conservar is not None and ruta == conservar:
+            continue
+        try:
+            ruta.unlink()
+        except OSError:
+            pass
+
+
+def _a_tabla_arrow(df):
+    """Convierte un DataFrame a tabla Arrow, pasando a texto las columnas de tipo mixto."""
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].map(lambda v: None if v is None or v != v else str(v))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _escribir_atomico(destino, escribir):
+    """Escribe en un temporal del mismo directorio y lo renombra al final."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_name(f".{uuid.uuid4().hex}.tmp")
+    try:
+        escribir(temporal)
+        os.replace(temporal, destino)
+    finally:
+        if temporal.exists():
+            temporal.unlink()
+
+
+def guardar(archivo_detectado, hoja, df):
+    """
+    Guarda un DataFrame ya leído en la caché (p.e. desde procesar_archivo_vista).
+    No hace nada si pyarrow no está instalado.
+    """
+    if not disponible():
+        return None
+    destino = ruta_cache(archivo_detectado, hoja)
+    tabla = _a_tabla_arrow(df.reset_index(drop=True))
+
+    def _escribir(ruta):
+        with pa_ipc.new_file(str(ruta), tabla.schema) as writer:
+            writer.write_table(tabla)
+
+    _escribir_atomico(destino, _escribir)
+    invalidar(archivo_detectado, hoja, conservar=destino)
+    _expulsar()
+    return destino
+
+
+def _construir(archivo_detectado, hoja, destino):
+    """Parsea el archivo original y lo escribe en la caché."""
+    if archivo_detectado.tipo in ('csv', 'txt'):
+        # Escritura por lotes: nunca se tiene el archivo completo en memoria.
+        # Todo se lee como texto para que el esquema sea idéntico en todos los bloques.
+        def _escribir(ruta):
+            writer = None
+            try:
+                for bloque in iterar_bloques(archivo_detectado.ruta_completa, archivo_detectado.tipo, dtype=str):
+                    bloque.columns = [str(c) for c in bloque.columns]
+                    if writer is None:
+                        esquema = pa.schema([(c, pa.string()) for c in bloque.columns])
+                        writer = pa_ipc.new_file(str(ruta), esquema)
+                    writer.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+                if writer is None:
+                    vacia = pa.table({})
+                    writer = pa_ipc.new_file(str(ruta), vacia.schema)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+        _escribir_atomico(destino, _escribir)
+        invalidar(archivo_detectado, hoja, conservar=destino)
+        _expulsar()
+    else:
+        from .utils import procesar_archivo
+        df, _ = procesar_archivo(archivo_detectado, hoja)
+        guardar(archivo_detectado, hoja, df)
+
+
+def obtener_pagina(archivo_detectado, hoja, inicio, limite):
+    """
+    Devuelve (DataFrame con las filas [inicio, inicio+limite), total de filas).
+
+    La primera llamada construye la caché; las siguientes solo leen el rango
+    pedido del archivo Arrow mapeado en memoria.
+    """
+    if not disponible():
+        from .utils import procesar_archivo
+        df, _ = procesar_archivo(archivo_detectado, hoja)
+        return df.iloc[inicio:inicio + limite], len(df)
+
+    destino = ruta_cache(archivo_detectado, hoja)
+    if not destino.exists():
+        _construir(archivo_detectado, hoja, destino)
+    else:
+        # Marca de acceso para la expulsión LRU
+        try:
+            os.utime(destino)
+        except OSError:
+            pass
+
+    with pa.memory_map(str(destino), 'r') as fuente:
+        tabla = pa_ipc.open_file(fuente).read_all()
+        total = tabla.num_rows
+        # Copia explícita: la página no debe depender del mapeo una vez cerrado
+        segmento = tabla.slice(inicio, max(limite, 0)).to_pandas().copy()
+    segmento.index = range(inicio, inicio + len(segmento))
+    return segmento, total
+
+
+def _expulsar():
+    """Aplica los límites de tamaño y cantidad eliminando las entradas menos usadas."""
+    if not CACHE_DIR.exists():
+        return
+    entradas = []
+    for ruta in CACHE_DIR.glob(f"*{EXTENSION}"):
+        try:
+            st = ruta.stat()
+        except OSError:
+            continue
+        entradas.append((st.st_mtime, st.st_size, ruta))
+
+    entradas.sort()
+    total = sum(e[1] for e in entradas)
+    while entradas and (total > CACHE_MAX_BYTES or len(entradas) > CACHE_MAX_ARCHIVOS):
+        _, tamanio, ruta = entradas.pop(0)
+        try:
+            ruta.unlink()
+            total -= tamanio
+        except OSError:
+            pass
@@ -0,0 +1,123 @@
+"""
+Carga en paralelo de hojas Excel y archivos CSV/TXT en base de datos
+
+Origen 'excel'/'csv' de los procesos guardados: cada hoja (o archivo) se lee
+por bloques y se inserta con el cargador masivo, en procesos separados porque
+el parseo de openpyxl es intensivo en CPU y no escala con hilos.
+
+Este módulo no importa modelos de Django: sus funciones se ejecutan en los
+procesos hijos ('spawn') de un ProcessPoolExecutor, que solo necesitan los
+settings (DJANGO_SETTINGS_MODULE) para crear el engine.
+
+Una tarea es un dict serializable:
+    {'ruta', 'tipo' ('excel'|'csv'|'txt'), 'hoja', 'tabla', 'modo', 'engine_url'}
+Las tareas que escriben en la misma tabla forman un grupo y se ejecutan en
+orden dentro del mismo proceso: 'modo' lo aplica la primera que carga filas
+(si una falla antes de escribir, la siguiente reemplaza igual la tabla de la
+ejecución anterior) y las demás anexan.
+
+Las columnas se leen y se crean como texto (NVARCHAR(MAX)): la tabla se crea
+con el primer bloque, y si tomara los tipos inferidos en él, un bloque
+posterior con texto en una columna numérica fallaría con la tabla a medio
+cargar.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from sqlalchemy.types import UnicodeText
+
+from . import excel_reader
+from .bulk_loader import TAMANIO_LOTE, cargar_dataframe
+from .engines import get_engine
+from . import ingesta
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, 'CARGA_ARCHIVOS_WORKERS', 4)
+
+
+def cargar_tarea(tarea, modo=None):
+    """
+    Lee una hoja o archivo por bloques y lo carga en su tabla.
+
+    Retorna:
+    - Dict con 'archivo', 'hoja', 'tabla', 'filas', 'segundos' y, si falló, 'error'
+    """
+    inicio = time.perf_counter()
+    estadistica = {
+        'archivo': os.path.basename(tarea['ruta']),
+        'hoja': tarea.get('hoja'),
+        'tabla': tarea['tabla'],
+        'filas': 0,
+    }
+    try:
+        engine = get_engine(tarea['engine_url'])
+        modo = modo or tarea.get('modo', 'replace')
+        if tarea['tipo'] == 'excel':
+            bloques = excel_reader.iterar_bloques(tarea['ruta'], tarea['hoja'], TAMANIO_LOTE, texto=True)
+        else:
+            bloques = ingesta.iterar_bloques(tarea['ruta'], tarea['tipo'], TAMANIO_LOTE, dtype=str)
+        # 'filas' crece bloque a bloque: si la carga falla a medias refleja lo ya escrito
+        for bloque in bloques:
+            tipos = {str(c): UnicodeText() for c in bloque.columns}
+            estadistica['filas'] += cargar_dataframe(bloque, tarea['tabla'], engine, if_exists=modo, dtype=tipos)
+            modo = 'append'
+    except Exception as e:
+        logger.exception(f"Error cargando {estadistica['archivo']} {estadistica['hoja'] or ''} en {tarea['tabla']}")
+        estadistica['error'] = str(e)
+    estadistica['segundos'] = round(time.perf_counter() - inicio, 2)
+    return estadistica
+
+
+def cargar_grupo(tareas):
+    """
+    Carga en orden las tareas de una misma tabla. El 'modo' de la tarea se
+    aplica hasta que una de ellas carga filas; desde ahí se anexa.
+
+    Retorna:
+    - Lista de estadísticas (ver cargar_tarea)
+    """
+    estadisticas = []
+    modo = None
+    for tarea in tareas:
+        estadistica = cargar_tarea(tarea, modo=modo)
+        estadisticas.append(estadistica)
+        if estadistica['filas']:
+            modo = 'append'
+    return estadisticas
+
+
+def agrupar_por_tabla(tareas):
+    grupos = {}
+    for tarea in tareas:
+        grupos.setdefault(tarea['tabla'].lower(), []).append(tarea)
+    return list(grupos.values())
+
+
+def cargar_en_paralelo(tareas, workers=None):
+    """
+    Carga las tareas en un pool de procesos, un grupo (tabla) por proceso.
+
+    Parámetros:
+    - tareas: Lista de tareas (ver docstring del módulo)
+    - workers: Procesos simultáneos (por defecto CARGA_ARCHIVOS_WORKERS, sin
+      superar el número de CPUs); con uno solo se carga en este proceso
+
+    Retorna:
+    - Iterador de listas de estadísticas, una por grupo, a medida que terminan
+    """
+    grupos = agrupar_por_tabla(tareas)
+    workers = min(workers or WORKERS, len(grupos), os.cpu_count() or 1)
+    if workers <= 1:
+        for grupo in grupos:
+            yield cargar_grupo(grupo)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futuros = [pool.submit(cargar_grupo, grupo) for grupo in grupos]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
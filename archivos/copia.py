@@ -0,0 +1,132 @@
+"""
+Copia de tablas entre bases de datos
+
+Copiar una tabla con pd.read_sql + to_sql trae todas las filas a Python y las
+vuelve a enviar, aunque origen y destino sean la misma base. copiar_tabla
+elige el plan según los engines:
+  - Misma base: la copia se hace en el servidor con una sola sentencia
+    (SELECT ... INTO / CREATE TABLE ... AS SELECT para 'replace',
+    INSERT INTO ... SELECT para 'append'); ninguna fila pasa por Python.
+  - Bases distintas: se lee el origen en streaming (lectura_sql) y cada
+    bloque se carga con cargar_dataframe, sin tener la tabla completa en memoria.
+Cada copia devuelve sus métricas (plan, filas y segundos).
+"""
+import logging
+import time
+
+from sqlalchemy import inspect, text
+
+from . import metadatos
+from .bulk_loader import TAMANIO_LOTE, cargar_dataframe
+from .engines import normalizar_url
+from .lectura_sql import iterar_consulta
+
+logger = logging.getLogger(__name__)
+
+MODOS = ('replace', 'append')
+
+
+def misma_base(engine_origen, engine_destino):
+    """True si ambos engines apuntan a la misma base (la copia puede hacerse en el servidor)."""
+    return engine_origen is engine_destino or normalizar_url(engine_origen.url) == normalizar_url(engine_destino.url)
+
+
+def _existe(conn, tabla):
+    return inspect(conn).has_table(tabla)
+
+
+def _copiar_en_servidor(engine, tabla_origen, tabla_destino, modo):
+    """Copia con una sola sentencia SQL. Retorna las filas copiadas o None si el motor no las informa."""
+    quote = engine.dialect.identifier_preparer.quote
+    origen, destino = quote(tabla_origen), quote(tabla_destino)
+    with engine.begin() as conn:
+        if tabla_origen == tabla_destino:
+            if modo == 'replace':
+                # Reemplazar una tabla por sí misma no cambia nada
+                return None
+            resultado = conn.execute(text(f"INSERT INTO {destino} SELECT * FROM {origen}"))
+            return resultado.rowcount
+
+        if modo == 'append' and _existe(conn, tabla_destino):
+            # Solo las columnas comunes, en el orden del destino
+            columnas_origen = {c['name'].lower() for c in inspect(conn).get_columns(tabla_origen)}
+            columnas = [c['name'] for c in inspect(conn).get_columns(tabla_destino)
+                        if c['name'].lower() in columnas_origen]
+            lista = ", ".join(quote(c) for c in columnas)
+            resultado = conn.execute(text(f"INSERT INTO {destino} ({lista}) SELECT {lista} FROM {origen}"))
+            return resultado.rowcount
+
+        if _existe(conn, tabla_destino):
+            conn.execute(text(f"DROP TABLE {destino}"))
+        if engine.dialect.name == 'mssql':
+            resultado = conn.execute(text(f"SELECT * INTO {destino} FROM {origen}"))
+        else:
+            resultado = conn.execute(text(f"CREATE TABLE {destino} AS SELECT * FROM {origen}"))
+        return resultado.rowcount
+
+
+def _copiar_por_bloques(engine_origen, tabla_origen, engine_destino, tabla_destino, modo, progreso=None):
+    """Lee el origen en streaming (lectura_sql) y carga cada bloque en el destino."""
+    quote = engine_origen.dialect.identifier_preparer.quote
+    filas = 0
+    primero = True
+    # Un origen sin filas entrega un bloque vacío: el destino igual queda con la estructura
+    for bloque in iterar_consulta(engine_origen, f"SELECT * FROM {quote(tabla_origen)}", tamanio_bloque=TAMANIO_LOTE):
+        if bloque.empty and modo == 'append':
+            continue
+        cargar_dataframe(bloque, tabla_destino, engine_destino, if_exists=modo if primero else 'append')
+        primero = False
+        filas += len(bloque)
+        if progreso:
+            progreso(filas)
+    return filas
+
+
+def copiar_tabla(engine_origen, tabla_origen, engine_destino=None, tabla_destino=None, modo='replace',
+                 progreso=None):
+    """
+    Copia una tabla eligiendo el plan más barato.
+
+    Parámetros:
+    - engine_origen: Engine donde está la tabla
+    - tabla_origen: Tabla a copiar
+    - engine_destino: Engine destino (el de origen si es None)
+    - tabla_destino: Nombre en el destino (el mismo si es None)
+    - modo: 'replace' o 'append'
+    - progreso: Función opcional progreso(filas_copiadas); en la copia en el
+      servidor se llama una sola vez al terminar
+
+    Retorna:
+    - Dict con 'origen', 'destino', 'modo', 'plan' ('servidor' o 'bloques'),
+      'filas' y 'segundos'
+    """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de copia desconocido: {modo}")
+    engine_destino = engine_destino or engine_origen
+    tabla_destino = tabla_destino or tabla_origen
+    inicio = time.perf_counter()
+
+    if misma_base(engine_origen, engine_destino):
+        plan = 'servidor'
+        filas = _copiar_en_servidor(engine_destino, tabla_origen, tabla_destino, modo)
+        metadatos.invalidar(engine_destino)
+        if filas is None or filas < 0:
+            # El motor no informa las filas de la sentencia (p.e. CREATE TABLE AS en SQLite)
+            filas = metadatos.conteo_filas(engine_destino, [tabla_origen if modo == 'append' else tabla_destino],
+                                           usar_cache=False).popitem()[1] or 0
+        if progreso:
+            progreso(filas)
+    else:
+        plan = 'bloques'
+        filas = _copiar_por_bloques(engine_origen, tabla_origen, engine_destino, tabla_destino, modo, progreso)
+
+    estadistica = {
+        'origen': tabla_origen,
+        'destino': tabla_destino,
+        'modo': modo,
+        'plan': plan,
+        'filas': filas,
+        'segundos': round(time.perf_counter() - inicio, 2),
+    }
+    logger.info(f"Copia {tabla_origen} -> {tabla_destino} ({modo}, {plan}): {filas} filas en {estadistica['segundos']}s")
+    return estadistica
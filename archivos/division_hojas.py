@@ -0,0 +1,134 @@
+"""
+División de un libro Excel en un archivo por hoja
+
+Al subir un Excel a una carpeta compartida el usuario puede elegir hojas
+sueltas; cada una se guarda como un .xlsx independiente. El libro de origen
+se abre una sola vez por proceso (LibroExcel) y cada hoja se copia fila a fila
+a un libro openpyxl write_only, sin construir DataFrames ni el DOM del libro.
+
+Con varias hojas los grupos se reparten entre procesos ('spawn'); con un solo
+worker todo se hace en el proceso actual.
+
+Con DIVISION_HOJAS_MEDIR_MEMORIA se informa además el pico de memoria
+(tracemalloc); queda desactivado por defecto porque tracemalloc hace la
+división unas cinco veces más lenta.
+"""
+import logging
+import multiprocessing
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .excel_reader import LibroExcel
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, 'CARGA_ARCHIVOS_WORKERS', 4)
+MEDIR_MEMORIA = getattr(settings, 'DIVISION_HOJAS_MEDIR_MEMORIA', False)
+
+
+def _copiar_hoja(libro, hoja, ruta_destino):
+    """Copia los valores de una hoja a un libro nuevo. Retorna las filas escritas."""
+    from openpyxl import Workbook
+    destino = Workbook(write_only=True)
+    # Excel limita el nombre de la hoja a 31 caracteres
+    hoja_destino = destino.create_sheet(title=str(hoja)[:31])
+    filas = 0
+    for fila in libro.filas(hoja):
+        hoja_destino.append(fila)
+        filas += 1
+    destino.save(ruta_destino)
+    return filas
+
+
+def dividir_grupo(ruta, destinos, medir_memoria=False):
+    """
+    Escribe varias hojas de un mismo libro, abierto una sola vez.
+
+    Parámetros:
+    - ruta: Libro de origen
+    - destinos: Lista de tuplas (hoja, ruta_destino)
+    - medir_memoria: Registrar el pico de memoria del proceso con tracemalloc
+
+    Retorna:
+    - Tupla (lista de dicts con 'hoja', 'archivo', 'filas', 'segundos' y, si
+      falló, 'error'; pico de memoria en MB o None)
+    """
+    if medir_memoria:
+        tracemalloc.start()
+    estadisticas = []
+    try:
+        with LibroExcel(ruta) as libro:
+            for hoja, ruta_destino in destinos:
+                inicio = time.perf_counter()
+                estadistica = {'hoja': hoja, 'archivo': os.path.basename(ruta_destino), 'filas': 0}
+                try:
+                    estadistica['filas'] = _copiar_hoja(libro, hoja, ruta_destino)
+                except Exception as e:
+                    logger.exception(f"Error copiando la hoja {hoja} de {os.path.basename(ruta)}")
+                    estadistica['error'] = str(e)
+                    if os.path.exists(ruta_destino):
+                        os.remove(ruta_destino)
+                estadistica['segundos'] = round(time.perf_counter() - inicio, 2)
+                estadisticas.append(estadistica)
+    finally:
+        pico = None
+        if medir_memoria:
+            pico = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+            tracemalloc.stop()
+    return estadisticas, pico
+
+
+def _registrar(ruta, estadisticas, pico, inicio):
+    """Deja en el log las filas, el tiempo y, si se midió, el pico de memoria de una división."""
+    filas = sum(e['filas'] for e in estadisticas)
+    memoria = f", pico de memoria {pico} MB" if pico is not None else ""
+    logger.info(f"{os.path.basename(ruta)}: {len(estadisticas)} hoja(s), {filas} filas "
+                f"en {time.perf_counter() - inicio:.2f} s{memoria}")
+
+
+def dividir_hojas(ruta, destinos, workers=None, medir_memoria=None):
+    """
+    Guarda cada hoja indicada de un libro en su propio archivo .xlsx.
+
+    Parámetros:
+    - ruta: Libro de origen (.xlsx o .xls)
+    - destinos: Lista de tuplas (hoja, ruta_destino)
+    - workers: Procesos simultáneos (por defecto CARGA_ARCHIVOS_WORKERS, sin
+      superar el número de CPUs ni de hojas)
+    - medir_memoria: Informar el pico de memoria con tracemalloc (por defecto
+      DIVISION_HOJAS_MEDIR_MEMORIA)
+
+    Retorna:
+    - Tupla (estadísticas por hoja en el orden de 'destinos', pico de memoria
+      en MB del proceso que más usó o None)
+    """
+    if medir_memoria is None:
+        medir_memoria = MEDIR_MEMORIA
+    inicio = time.perf_counter()
+    workers = min(workers or WORKERS, len(destinos), os.cpu_count() or 1)
+    if workers <= 1:
+        estadisticas, pico = dividir_grupo(ruta, destinos, medir_memoria)
+        _registrar(ruta, estadisticas, pico, inicio)
+        return estadisticas, pico
+
+    # Reparto alternado: cada proceso abre el libro una vez para todas sus hojas
+    grupos = [destinos[i::workers] for i in range(workers)]
+    estadisticas = []
+    picos = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futuros = [pool.submit(dividir_grupo, ruta, grupo, medir_memoria) for grupo in grupos]
+        for futuro in as_completed(futuros):
+            parcial, pico = futuro.result()
+            estadisticas.extend(parcial)
+            if pico is not None:
+                picos.append(pico)
+
+    orden = {hoja: i for i, (hoja, _) in enumerate(destinos)}
+    estadisticas.sort(key=lambda e: orden[e['hoja']])
+    pico = max(picos) if picos else None
+    _registrar(ruta, estadisticas, pico, inicio)
+    return estadisticas, pico
@@ -0,0 +1,83 @@
+"""
+Registro de engines de SQLAlchemy compartidos por el proceso
+
+Crear un engine por petición obliga a abrir una conexión ODBC nueva cada vez.
+get_engine(url) devuelve siempre el mismo engine (con su pool de conexiones)
+para una misma URL, normalizada para que variaciones en el orden de los
+parámetros de la query apunten a la misma entrada.
+
+Opciones del pool (settings):
+- SQLALCHEMY_POOL_SIZE, SQLALCHEMY_MAX_OVERFLOW
+- SQLALCHEMY_POOL_RECYCLE: segundos antes de renovar una conexión
+- SQLALCHEMY_POOL_PRE_PING: verificar la conexión antes de entregarla
+"""
+import logging
+import threading
+
+from django.conf import settings
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = getattr(settings, 'SQLALCHEMY_POOL_SIZE', 5)
+MAX_OVERFLOW = getattr(settings, 'SQLALCHEMY_MAX_OVERFLOW', 10)
+POOL_RECYCLE = getattr(settings, 'SQLALCHEMY_POOL_RECYCLE', 1800)
+POOL_PRE_PING = getattr(settings, 'SQLALCHEMY_POOL_PRE_PING', True)
+
+_engines = {}
+_lock = threading.Lock()
+
+
+def normalizar_url(url):
+    """Forma canónica de la URL: parámetros de la query ordenados."""
+    url = make_url(url)
+    url = url.set(query=dict(sorted(url.query.items())))
+    return url.render_as_string(hide_password=False)
+
+
+def _opciones(url):
+    opciones = {
+        'pool_pre_ping': POOL_PRE_PING,
+        'pool_recycle': POOL_RECYCLE,
+    }
+    if url.get_backend_name() != 'sqlite':
+        # SQLite usa su propio pool; estos parámetros solo aplican a QueuePool
+        opciones['pool_size'] = POOL_SIZE
+        opciones['max_overflow'] = MAX_OVERFLOW
+    if url.get_backend_name() == 'mssql' and url.get_driver_name() == 'pyodbc':
+        opciones['fast_executemany'] = True
+    return opciones
+
+
+def get_engine(url):
+    """
+    Devuelve el engine compartido para la URL, creándolo la primera vez.
+
+    Parámetros:
+    - url: URL de conexión (string o sqlalchemy.engine.URL)
+
+    Retorna:
+    - Engine de SQLAlchemy; no debe cerrarse con dispose() al terminar
+    """
+    clave = normalizar_url(url)
+    engine = _engines.get(clave)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        engine = _engines.get(clave)
+        if engine is None:
+            url_obj = make_url(clave)
+            engine = create_engine(url_obj, **_opciones(url_obj))
+            _engines[clave] = engine
+            logger.info(f"Engine creado para {url_obj.render_as_string(hide_password=True)}")
+    return engine
+
+
+def dispose_all():
+    """Cierra todos los pools del registro (p.e. tras un fork o en pruebas)."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
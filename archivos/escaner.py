@@ -0,0 +1,180 @@
+"""
+Escaneo incremental de carpetas compartidas
+
+Recorre la carpeta con os.scandir (un solo stat por archivo, que en Windows
+viene ya en la entrada del directorio), compara contra los ArchivoDetectado
+existentes obtenidos en una sola consulta y aplica las diferencias con
+bulk_create / bulk_update / delete.
+
+Cada CarpetaCompartida guarda una marca del último escaneo (fecha y mtime del
+directorio). Si el directorio no cambió desde entonces se reutilizan los
+registros de la base de datos sin recorrer la carpeta. Como el mtime de un
+directorio no cambia cuando se modifica un archivo existente, se fuerza un
+escaneo completo cuando la marca supera ESCANER_MAX_EDAD_SEGUNDOS.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .excel_reader import nombres_hojas
+from .models import ArchivoDetectado
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_SOPORTADAS = {
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.csv': 'csv',
+    '.txt': 'txt',
+}
+
+MAX_EDAD_SEGUNDOS = getattr(settings, 'ESCANER_MAX_EDAD_SEGUNDOS', 900)
+
+# SQL Server admite como máximo 2100 parámetros por consulta
+TAMANIO_LOTE = 500
+
+
+def _normalizar_ruta(ruta):
+    return os.path.normcase(os.path.normpath(ruta))
+
+
+def _listar_directorio(ruta):
+    """Devuelve {ruta_normalizada: (ruta, nombre, tipo, tamaño, fecha_modificacion)}."""
+    encontrados = {}
+    with os.scandir(ruta) as entradas:
+        for entrada in entradas:
+            tipo = EXTENSIONES_SOPORTADAS.get(os.path.splitext(entrada.name)[1].lower())
+            if not tipo:
+                continue
+            try:
+                if not entrada.is_file():
+                    continue
+                st = entrada.stat()
+            except OSError:
+                continue
+            fecha = datetime.fromtimestamp(st.st_mtime, tz=dt_timezone.utc)
+            encontrados[_normalizar_ruta(entrada.path)] = (entrada.path, entrada.name, tipo, st.st_size, fecha)
+    return encontrados
+
+
+def _archivos_de(carpeta):
+    return list(ArchivoDetectado.objects.filter(carpeta=carpeta).order_by('nombre'))
+
+
+def escanear_carpeta(carpeta, forzar=False):
+    """
+    Sincroniza los ArchivoDetectado de una carpeta con su contenido en disco.
+
+    Parámetros:
+    - carpeta: CarpetaCompartida a escanear
+    - forzar: Si es True se recorre la carpeta aunque la marca de escaneo esté vigente
+
+    Retorna:
+    - Lista de ArchivoDetectado de la carpeta ordenada por nombre
+      (lista vacía si la carpeta no es accesible)
+    """
+    if sincronizar_carpeta(carpeta, forzar) is None:
+        return []
+    return _archivos_de(carpeta)
+
+
+def sincronizar_carpeta(carpeta, forzar=False):
+    """
+    Aplica en la base de datos los cambios de la carpeta.
+
+    Retorna:
+    - Dict con el número de archivos 'nuevos', 'modificados' y 'eliminados'
+      (todo en cero si se reutilizó la marca de escaneo), o None si la
+      carpeta no es accesible
+    """
+    try:
+        mtime_dir = os.stat(carpeta.ruta).st_mtime
+    except OSError:
+        return None
+
+    ahora = timezone.now()
+    vigente = (
+        carpeta.ultimo_escaneo is not None
+        and carpeta.mtime_escaneo == mtime_dir
+        and (ahora - carpeta.ultimo_escaneo).total_seconds() < MAX_EDAD_SEGUNDOS
+    )
+    if vigente and not forzar:
+        return {'nuevos': 0, 'modificados': 0, 'eliminados': 0}
+
+    encontrados = _listar_directorio(carpeta.ruta)
+    existentes = {
+        _normalizar_ruta(a.ruta_completa): a
+        for a in ArchivoDetectado.objects.filter(carpeta=carpeta)
+    }
+
+    nuevos = []
+    modificados = []
+    for clave, (ruta, nombre, tipo, tamanio, fecha) in encontrados.items():
+        archivo = existentes.get(clave)
+        if archivo is None:
+            nuevos.append(ArchivoDetectado(
+                carpeta=carpeta,
+                nombre=nombre,
+                ruta_completa=ruta,
+                tipo=tipo,
+                tamaño=tamanio,
+                fecha_modificacion=fecha,
+            ))
+        elif archivo.tamaño != tamanio or archivo.fecha_modificacion != fecha:
+            archivo.tamaño = tamanio
+            archivo.fecha_modificacion = fecha
+            archivo.hojas = None  # Las hojas pudieron cambiar; se recalculan bajo demanda
+            modificados.append(archivo)
+
+    desaparecidos = [a.pk for clave, a in existentes.items() if clave not in encontrados]
+
+    with transaction.atomic():
+        if nuevos:
+            ArchivoDetectado.objects.bulk_create(nuevos, batch_size=TAMANIO_LOTE)
+        if modificados:
+            ArchivoDetectado.objects.bulk_update(
+                modificados, ['tamaño', 'fecha_modificacion', 'hojas'], batch_size=TAMANIO_LOTE
+            )
+        for i in range(0, len(desaparecidos), TAMANIO_LOTE):
+            ArchivoDetectado.objects.filter(pk__in=desaparecidos[i:i + TAMANIO_LOTE]).delete()
+
+        carpeta.mtime_escaneo = mtime_dir
+        carpeta.ultimo_escaneo = ahora
+        carpeta.save(update_fields=['mtime_escaneo', 'ultimo_escaneo'])
+
+    cambios = {'nuevos': len(nuevos), 'modificados': len(modificados), 'eliminados': len(desaparecidos)}
+    if any(cambios.values()):
+        logger.info(
+            f"Escaneo de {carpeta.ruta}: {cambios['nuevos']} nuevos, "
+            f"{cambios['modificados']} modificados, {cambios['eliminados']} eliminados"
+        )
+    return cambios
+
+
+def actualizar_hojas(carpeta):
+    """
+    Completa el campo `hojas` (lista JSON) de los Excel de la carpeta que aún
+    no lo tienen. Pensado para el vigilante en segundo plano, no para las vistas.
+    Si un libro no se puede leer (bloqueado o a medio copiar) el campo queda
+    vacío y se reintenta en la siguiente pasada.
+
+    Retorna:
+    - Número de archivos actualizados
+    """
+    pendientes = ArchivoDetectado.objects.filter(carpeta=carpeta, tipo='excel', hojas__isnull=True)
+    actualizados = []
+    for archivo in pendientes:
+        try:
+            archivo.hojas = json.dumps(nombres_hojas(archivo.ruta_completa))
+        except Exception as e:
+            logger.info(f"No se pudieron leer las hojas de {archivo.ruta_completa}, se reintentará: {e}")
+            continue
+        actualizados.append(archivo)
+    if actualizados:
+        ArchivoDetectado.objects.bulk_update(actualizados, ['hojas'], batch_size=TAMANIO_LOTE)
+    return len(actualizados)
@@ -0,0 +1,240 @@
+"""
+Inferencia de esquema antes de cargar un DataFrame en base de datos
+
+Las fuentes del asistente se leen con dtype=object para no perder datos, y
+cargadas tal cual todas las columnas terminan como NVARCHAR(MAX)/TEXT. Este
+módulo elige para cada columna el tipo SQL más estrecho que admite todos sus
+valores y convierte la columna con casts vectorizados de pandas:
+
+  1. Con una muestra de la columna se decide la clase: booleano, entero,
+     decimal, fecha o texto.
+  2. La columna completa se convierte a esa clase; si algún valor no se puede
+     convertir la columna queda como texto.
+  3. Con los valores convertidos se fija el tipo exacto: INT/BIGINT según el
+     rango, DECIMAL(p,s) según dígitos y decimales, DATE o DATETIME2, y
+     NVARCHAR(n) según el largo máximo.
+
+Los textos vacíos cuentan como nulos en las columnas no textuales. Los
+números con ceros a la izquierda ('00123') se tratan como texto (códigos).
+"""
+import importlib.util
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from sqlalchemy.types import BigInteger, Boolean, Date, DateTime, Float, Integer, Numeric, Unicode, UnicodeText
+
+# Valores no nulos que se examinan por columna para decidir su clase
+MUESTRA = getattr(settings, 'ESQUEMA_FILAS_MUESTRA', 10000)
+
+# Largos de NVARCHAR: se usa el primero que admite el texto más largo; si no
+# alcanza ninguno, NVARCHAR(MAX)
+LARGOS_TEXTO = (10, 50, 100, 255, 500, 1000, 4000)
+
+# DECIMAL(p,s) hasta estos límites; con más decimales se usa FLOAT
+MAX_PRECISION = 38
+MAX_ESCALA = 10
+
+VERDADEROS = {'true', 'verdadero', 'si', 'sí'}
+FALSOS = {'false', 'falso', 'no'}
+
+# Formatos de fecha probados en orden sobre la muestra (ISO8601 cubre también
+# las fechas de Excel, que llegan como datetime)
+FORMATOS_FECHA = ('ISO8601', '%d/%m/%Y', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%d-%m-%Y', '%Y/%m/%d')
+
+_TIPO_TEXTO = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else 'string'
+
+_LIMITE_INT = 2 ** 31
+
+
+def _texto(serie):
+    """Valores como texto sin espacios en los extremos; vacíos y nulos quedan como NA."""
+    texto = serie.astype(_TIPO_TEXTO).str.strip()
+    return texto.mask(texto == '')
+
+
+def _muestra(texto):
+    """Hasta MUESTRA valores no nulos repartidos a lo largo de la columna."""
+    valores = texto.dropna()
+    if len(valores) > MUESTRA:
+        valores = valores.iloc[np.linspace(0, len(valores) - 1, MUESTRA).astype(int)]
+    return valores
+
+
+def _clase(muestra):
+    """Clase de la columna ('booleano', 'entero', 'decimal', 'fecha' o 'texto') y formato de fecha."""
+    if muestra.empty:
+        return 'texto', None
+    minusculas = muestra.str.lower()
+    if minusculas.isin(VERDADEROS | FALSOS).all():
+        return 'booleano', None
+
+    numeros = pd.to_numeric(muestra, errors='coerce')
+    if numeros.notna().all():
+        if muestra.str.match(r'^[+-]?0\d').any():
+            return 'texto', None
+        if muestra.str.match(r'^[+-]?\d+(\.0*)?$').all():
+            return 'entero', None
+        return 'decimal', None
+
+    for formato in FORMATOS_FECHA:
+        if pd.to_datetime(muestra, errors='coerce', format=formato).notna().all():
+            return 'fecha', formato
+    return 'texto', None
+
+
+def _largo_texto(largo):
+    for limite in LARGOS_TEXTO:
+        if largo <= limite:
+            return limite
+    return None
+
+
+def _columna_texto(serie, nombre, nulos):
+    valores = serie.astype(_TIPO_TEXTO)
+    largo = valores.str.len().max()
+    largo = _largo_texto(0 if pd.isna(largo) else int(largo))
+    return valores, {
+        'columna': nombre,
+        'tipo': 'texto',
+        'largo': largo,
+        'nulos': nulos,
+        'sql': f"NVARCHAR({largo})" if largo else 'NVARCHAR(MAX)',
+    }
+
+
+def _columna_entera(valores, nombre, nulos):
+    """Int64 con INT o BIGINT según el rango; None si no cabe en 64 bits."""
+    try:
+        valores = valores.astype('Int64')
+    except (OverflowError, TypeError, ValueError):
+        return None
+    minimo, maximo = valores.min(), valores.max()
+    grande = not pd.isna(minimo) and (minimo < -_LIMITE_INT or maximo >= _LIMITE_INT)
+    return valores, {
+        'columna': nombre,
+        'tipo': 'entero_grande' if grande else 'entero',
+        'nulos': nulos,
+        'sql': 'BIGINT' if grande else 'INT',
+    }
+
+
+def _columna_numerica(texto, numeros, nombre, nulos):
+    """INT/BIGINT, DECIMAL(p,s) o FLOAT según los dígitos de los valores; None si no cabe en ninguno."""
+    enteros = texto.str.replace(r'^[+-]?0*|\..*$', '', regex=True).str.len().max()
+    decimales = texto.str.replace(r'^[^.]*\.?', '', regex=True).str.rstrip('0').str.len().max()
+    enteros, decimales = int(enteros or 0), int(decimales or 0)
+    exponente = bool(texto.str.contains('[eE]').fillna(False).any())
+
+    if not exponente and decimales == 0:
+        # Más de 18 dígitos no cabe en BIGINT: se deja como texto
+        return _columna_entera(numeros, nombre, nulos) if enteros <= 18 else None
+    if not exponente and decimales <= MAX_ESCALA and enteros + decimales <= MAX_PRECISION:
+        precision = max(enteros + decimales, 1)
+        return numeros.astype('Float64'), {
+            'columna': nombre, 'tipo': 'decimal', 'precision': precision, 'escala': decimales,
+            'nulos': nulos, 'sql': f"DECIMAL({precision},{decimales})",
+        }
+    return numeros.astype('Float64'), {'columna': nombre, 'tipo': 'flotante', 'nulos': nulos, 'sql': 'FLOAT'}
+
+
+def tipar_columna(serie, nombre=None):
+    """
+    Infiere el tipo SQL de una columna y la convierte.
+
+    Retorna:
+    - Tupla (Serie convertida, dict de esquema con 'columna', 'tipo', 'nulos',
+      'sql' y, según el tipo, 'largo', 'precision' y 'escala')
+    """
+    nombre = str(serie.name if nombre is None else nombre)
+    nulos = bool(serie.isna().any())
+
+    # Columnas ya tipadas (origen SQL, normalización Int64)
+    if pd.api.types.is_bool_dtype(serie.dtype):
+        return serie.astype('boolean'), {'columna': nombre, 'tipo': 'booleano', 'nulos': nulos, 'sql': 'BIT'}
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return _columna_entera(serie, nombre, nulos)
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        clase, formato = 'fecha', None
+        texto = None
+    else:
+        texto = _texto(serie)
+        nulos = bool(texto.isna().any())
+        clase, formato = _clase(_muestra(texto))
+
+    if clase == 'booleano':
+        minusculas = texto.str.lower()
+        if (minusculas.isin(VERDADEROS | FALSOS) | texto.isna()).all():
+            valores = minusculas.isin(VERDADEROS).astype('boolean').mask(texto.isna())
+            return valores, {'columna': nombre, 'tipo': 'booleano', 'nulos': nulos, 'sql': 'BIT'}
+
+    if clase in ('entero', 'decimal'):
+        numeros = pd.to_numeric(texto, errors='coerce')
+        convertible = not (numeros.isna() & texto.notna()).any()
+        if convertible and not texto.str.match(r'^[+-]?0\d').fillna(False).any():
+            resultado = _columna_numerica(texto, numeros, nombre, nulos)
+            if resultado:
+                return resultado
+
+    if clase == 'fecha':
+        if texto is None:
+            fechas = serie
+        else:
+            fechas = pd.to_datetime(texto, errors='coerce', format=formato)
+        if texto is None or not (fechas.isna() & texto.notna()).any():
+            fechas_validas = fechas.dropna()
+            solo_fecha = bool((fechas_validas == fechas_validas.dt.normalize()).all())
+            return fechas, {
+                'columna': nombre,
+                'tipo': 'fecha' if solo_fecha else 'fecha_hora',
+                'nulos': nulos,
+                'sql': 'DATE' if solo_fecha else 'DATETIME2',
+            }
+
+    return _columna_texto(serie, nombre, bool(serie.isna().any()))
+
+
+def tipar_dataframe(df):
+    """
+    Infiere el esquema de todas las columnas y las convierte a sus tipos.
+
+    Retorna:
+    - Tupla (DataFrame convertido, lista de dicts de esquema en el orden de las columnas)
+    """
+    columnas = {}
+    esquema = []
+    for i, nombre in enumerate(df.columns):
+        valores, columna = tipar_columna(df.iloc[:, i], nombre)
+        columnas[nombre] = valores
+        esquema.append(columna)
+    return pd.DataFrame(columnas, index=df.index), esquema
+
+
+def inferir_esquema(df):
+    """Esquema inferido de un DataFrame (sin devolver los datos convertidos)."""
+    return tipar_dataframe(df)[1]
+
+
+def tipo_sqlalchemy(columna):
+    """Tipo de SQLAlchemy para un dict de esquema (Unicode(n) es NVARCHAR(n) en SQL Server)."""
+    tipo = columna['tipo']
+    if tipo == 'entero':
+        return Integer()
+    if tipo == 'entero_grande':
+        return BigInteger()
+    if tipo == 'decimal':
+        return Numeric(columna['precision'], columna['escala'])
+    if tipo == 'flotante':
+        return Float()
+    if tipo == 'fecha':
+        return Date()
+    if tipo == 'fecha_hora':
+        return DateTime()
+    if tipo == 'booleano':
+        return Boolean()
+    return Unicode(columna['largo']) if columna.get('largo') else UnicodeText()
+
+
+def tipos_sqlalchemy(esquema):
+    """Dict {columna: tipo SQLAlchemy} para el parámetro dtype de cargar_dataframe."""
+    return {columna['columna']: tipo_sqlalchemy(columna) for columna in esquema}
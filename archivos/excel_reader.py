@@ -0,0 +1,269 @@
+"""
+Lectura rápida de libros Excel
+
+pd.ExcelFile / pd.read_excel abren el libro completo (estilos, cadenas
+compartidas) aunque solo se necesiten los nombres de las hojas o unas pocas
+filas. Este módulo concentra la lectura de Excel de la aplicación:
+  - Los nombres de las hojas se leen directamente del manifiesto del libro
+    (xl/workbook.xml dentro del .xlsx), sin abrir ninguna hoja.
+  - Las filas se recorren en streaming (openpyxl read_only / iter_rows) y se
+    entregan como bloques de DataFrame de tamaño acotado.
+  - Si python-calamine está instalado se usa como motor (lector en Rust,
+    varias veces más rápido que openpyxl y también lee .xls).
+
+EXCEL_MOTOR en settings: 'auto' (calamine si está instalado), 'calamine' u
+'openpyxl'.
+
+El formato (.xls o .xlsx) se decide por el contenido y no por la extensión:
+los archivos del área de staging se guardan con su hash como nombre.
+"""
+import importlib.util
+import logging
+import posixpath
+import zipfile
+from functools import lru_cache
+from xml.etree import ElementTree
+
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MOTOR = getattr(settings, 'EXCEL_MOTOR', 'auto')
+
+# Filas por bloque en la lectura en streaming
+TAMANIO_BLOQUE = getattr(settings, 'INGESTA_TAMANIO_BLOQUE', 50000)
+
+_NS_RELACIONES = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_TIPO_DOCUMENTO = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+# Un .xls es un documento OLE2 (los .xlsx/.xlsm son archivos zip)
+_FIRMA_OLE2 = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+@lru_cache(maxsize=None)
+def calamine_disponible():
+    return importlib.util.find_spec('python_calamine') is not None
+
+
+def motor_lectura(motor=None):
+    """
+    Motor efectivo para leer Excel.
+
+    Retorna:
+    - 'calamine' u 'openpyxl' ('openpyxl' también cubre .xls, que se lee con xlrd)
+    """
+    motor = motor or MOTOR
+    if motor in ('auto', 'calamine') and calamine_disponible():
+        return 'calamine'
+    if motor == 'calamine':
+        logger.warning("EXCEL_MOTOR='calamine' pero python-calamine no está instalado; se usa openpyxl")
+    return 'openpyxl'
+
+
+def _es_xls(ruta):
+    """True si el libro es .xls, según su firma (el nombre puede no tener extensión)."""
+    with open(ruta, 'rb') as f:
+        return f.read(len(_FIRMA_OLE2)) == _FIRMA_OLE2
+
+
+def _ruta_workbook(zf):
+    """Ubicación de workbook.xml según _rels/.rels (casi siempre xl/workbook.xml)."""
+    try:
+        with zf.open('_rels/.rels') as f:
+            for _, elem in ElementTree.iterparse(f):
+                if elem.tag == f'{_NS_RELACIONES}Relationship' and elem.get('Type') == _TIPO_DOCUMENTO:
+                    return posixpath.normpath(elem.get('Target').lstrip('/'))
+    except KeyError:
+        pass
+    return 'xl/workbook.xml'
+
+
+def nombres_hojas(ruta):
+    """
+    Nombres de las hojas de un libro Excel en el orden del libro.
+
+    En .xlsx/.xlsm se leen del manifiesto (workbook.xml) sin tocar las hojas,
+    las cadenas compartidas ni los estilos; el costo no depende del tamaño
+    de los datos.
+    """
+    if _es_xls(ruta):
+        if motor_lectura() == 'calamine':
+            from python_calamine import CalamineWorkbook
+            return list(CalamineWorkbook.from_path(str(ruta)).sheet_names)
+        return pd.ExcelFile(ruta).sheet_names
+
+    with zipfile.ZipFile(ruta) as zf:
+        with zf.open(_ruta_workbook(zf)) as f:
+            nombres = []
+            for _, elem in ElementTree.iterparse(f):
+                etiqueta = elem.tag.rsplit('}', 1)[-1]
+                if etiqueta == 'sheet':
+                    nombres.append(elem.get('name'))
+                elif etiqueta == 'sheets':
+                    break
+            return nombres
+
+
+def leer_excel(ruta, hoja=0, nrows=None, dtype=None, motor=None):
+    """
+    Equivalente a pd.read_excel con el motor más rápido disponible.
+    Con openpyxl pandas abre el libro en modo read_only y con 'nrows' deja de
+    leer al completar las filas pedidas.
+
+    Parámetros:
+    - ruta: Ruta del archivo
+    - hoja: Nombre o índice de la hoja
+    - nrows: Filas de datos a leer (todas si es None)
+    - dtype: Igual que en pd.read_excel (p.e. object para no inferir tipos)
+    """
+    motor = motor_lectura(motor)
+    return pd.read_excel(
+        ruta,
+        sheet_name=hoja,
+        nrows=nrows,
+        dtype=dtype,
+        engine='calamine' if motor == 'calamine' else None,
+    )
+
+
+class LibroExcel:
+    """
+    Libro abierto una sola vez para recorrer varias de sus hojas en streaming.
+
+        with LibroExcel(ruta) as libro:
+            for fila in libro.filas('Ventas'):
+                ...
+    """
+
+    def __init__(self, ruta, motor=None):
+        self.ruta = str(ruta)
+        self.motor = motor_lectura(motor)
+        if self.motor == 'calamine':
+            from python_calamine import CalamineWorkbook
+            self._libro = CalamineWorkbook.from_path(self.ruta)
+        elif _es_xls(self.ruta):
+            # xlrd no admite lectura en streaming: cada hoja se carga al pedirla
+            self._libro = pd.ExcelFile(self.ruta)
+        else:
+            from openpyxl import load_workbook
+            # Con un archivo abierto openpyxl no exige la extensión .xlsx
+            self._archivo = open(self.ruta, 'rb')
+            try:
+                self._libro = load_workbook(self._archivo, read_only=True, data_only=True, keep_links=False)
+            except Exception:
+                self._archivo.close()
+                raise
+
+    def filas(self, hoja=0):
+        """Filas de la hoja (nombre o índice) como tuplas, con None en las celdas vacías."""
+        if self.motor == 'calamine':
+            if isinstance(hoja, int):
+                hoja_calamine = self._libro.get_sheet_by_index(hoja)
+            else:
+                hoja_calamine = self._libro.get_sheet_by_name(hoja)
+            for fila in hoja_calamine.iter_rows():
+                yield tuple(None if v == '' else v for v in fila)
+        elif isinstance(self._libro, pd.ExcelFile):
+            df = self._libro.parse(hoja, header=None, dtype=object)
+            for fila in df.itertuples(index=False, name=None):
+                yield tuple(None if pd.isna(v) else v for v in fila)
+        else:
+            hoja_openpyxl = self._libro.worksheets[hoja] if isinstance(hoja, int) else self._libro[hoja]
+            yield from hoja_openpyxl.iter_rows(values_only=True)
+
+    def close(self):
+        if self.motor != 'calamine':
+            self._libro.close()
+        if getattr(self, '_archivo', None) is not None:
+            self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iterar_filas(ruta, hoja=0, motor=None):
+    """
+    Recorre las filas de una hoja como tuplas de valores (None en celdas vacías),
+    sin cargar la hoja completa en memoria.
+    """
+    with LibroExcel(ruta, motor) as libro:
+        yield from libro.filas(hoja)
+
+
+def _encabezados(fila):
+    """Nombres de columna de la fila de encabezado, con el mismo criterio que pandas."""
+    nombres = []
+    vistos = {}
+    for i, valor in enumerate(fila):
+        nombre = str(valor).strip() if valor is not None and str(valor).strip() else f"Unnamed: {i}"
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        vistos.setdefault(nombre, 0)
+        nombres.append(nombre)
+    return nombres
+
+
+def iterar_bloques(ruta, hoja=0, tamanio_bloque=None, motor=None, texto=False):
+    """
+    Recorre una hoja Excel entregando DataFrames de tamaño acotado.
+    La primera fila no vacía se usa como encabezado; los tipos de columna los
+    infiere pandas a partir de los valores de cada bloque. Con texto=True los
+    valores llegan como str (None en las celdas vacías) en columnas object.
+
+    Retorna:
+    - Iterador de DataFrames sin filas completamente vacías
+    """
+    tamanio_bloque = tamanio_bloque or TAMANIO_BLOQUE
+    filas = iterar_filas(ruta, hoja, motor)
+    columnas = None
+    for fila in filas:
+        if any(v is not None for v in fila):
+            columnas = _encabezados(fila)
+            break
+    if columnas is None:
+        return
+
+    ancho = len(columnas)
+    bloque = []
+    for fila in filas:
+        if not any(v is not None for v in fila):
+            continue
+        fila = tuple(fila[:ancho])
+        if len(fila) < ancho:
+            fila += (None,) * (ancho - len(fila))
+        if texto:
+            fila = tuple(None if v is None else str(v) for v in fila)
+        bloque.append(fila)
+        if len(bloque) >= tamanio_bloque:
+            yield pd.DataFrame(bloque, columns=columnas, dtype=object if texto else None)
+            bloque = []
+    if bloque:
+        yield pd.DataFrame(bloque, columns=columnas, dtype=object if texto else None)
+
+
+def resumir_hoja(ruta, hoja=0, filas_preview=100, tamanio_bloque=None):
+    """
+    Recorre la hoja una sola vez para obtener la vista previa y el conteo
+    total de filas sin retener más de un bloque en memoria.
+
+    Retorna:
+    - Tupla (DataFrame con las primeras filas, total de filas)
+    """
+    preview = None
+    total = 0
+    for bloque in iterar_bloques(ruta, hoja, tamanio_bloque):
+        if preview is None:
+            preview = bloque.head(filas_preview).reset_index(drop=True)
+        elif len(preview) < filas_preview:
+            faltan = filas_preview - len(preview)
+            preview = pd.concat([preview, bloque.head(faltan)], ignore_index=True)
+        total += len(bloque)
+
+    if preview is None:
+        preview = pd.DataFrame()
+    return preview, total
@@ -0,0 +1,185 @@
+"""
+Ingesta por bloques de archivos CSV/TXT
+
+Este módulo permite leer archivos de texto delimitado de cualquier tamaño sin
+cargarlos completos en memoria:
+  - El dialecto (separador y codificación) se detecta UNA sola vez a partir de
+    una muestra acotada del inicio del archivo.
+  - Los datos se entregan como un iterador de DataFrames de tamaño configurable,
+    que consumen la vista previa, el conteo de filas y la carga masiva.
+"""
+import csv
+import logging
+import os
+
+import pandas as pd
+from django.conf import settings
+
+from .bulk_loader import cargar_dataframe
+
+logger = logging.getLogger(__name__)
+
+# Filas por bloque cuando el llamador no indica otro valor
+TAMANIO_BLOQUE = getattr(settings, 'INGESTA_TAMANIO_BLOQUE', 50000)
+
+# Bytes leídos del inicio del archivo para detectar el dialecto
+TAMANIO_MUESTRA = getattr(settings, 'INGESTA_TAMANIO_MUESTRA', 64 * 1024)
+
+# Orden de preferencia de separadores según el tipo de archivo
+SEPARADORES = {
+    'csv': [',', ';', '\t', '|'],
+    'txt': ['\t', ';', '|', ','],
+}
+
+CODIFICACIONES = ['utf-8-sig', 'latin-1']
+
+
+def _leer_muestra(ruta):
+    """Lee una muestra acotada del inicio del archivo y la decodifica."""
+    with open(ruta, 'rb') as f:
+        crudo = f.read(TAMANIO_MUESTRA)
+
+    for codificacion in CODIFICACIONES:
+        try:
+            texto = crudo.decode(codificacion)
+            break
+        except UnicodeDecodeError as e:
+            # Un corte a mitad de un carácter multibyte al final de la muestra no cuenta
+            if e.start >= len(crudo) - 3:
+                texto = crudo[:e.start].decode(codificacion)
+                break
+    else:
+        codificacion, texto = 'latin-1', crudo.decode('latin-1')
+
+    # Descartar la última línea si la muestra la cortó a la mitad
+    if len(crudo) == TAMANIO_MUESTRA and '\n' in texto:
+        texto = texto[:texto.rfind('\n')]
+    return texto, codificacion
+
+
+def detectar_dialecto(ruta, tipo='csv'):
+    """
+    Detecta separador y codificación de un archivo delimitado leyendo solo
+    una muestra del inicio.
+
+    Parámetros:
+    - ruta: Ruta del archivo
+    - tipo: 'csv' o 'txt' (define el orden de preferencia de separadores)
+
+    Retorna:
+    - Dict con 'sep' y 'encoding'; 'sep' es None solo en un .txt de texto
+      plano sin columnas (un .csv sin separador es un CSV de una columna)
+    """
+    texto, codificacion = _leer_muestra(ruta)
+    candidatos = SEPARADORES.get(tipo, SEPARADORES['csv'])
+    lineas = [l for l in texto.splitlines() if l.strip()][:50]
+
+    sep = None
+    if lineas:
+        try:
+            sep = csv.Sniffer().sniff('\n'.join(lineas), delimiters=''.join(candidatos)).delimiter
+        except csv.Error:
+            # El sniffer falla con muestras muy cortas: elegir el separador que
+            # aparezca de forma consistente en todas las líneas de la muestra
+            for candidato in candidatos:
+                conteos = {l.count(candidato) for l in lineas}
+                if len(conteos) == 1 and conteos.pop() > 0:
+                    sep = candidato
+                    break
+
+    if sep is None and tipo == 'csv':
+        # Una sola columna: se conserva el encabezado
+        sep = ','
+    return {'sep': sep, 'encoding': codificacion}
+
+
+def iterar_bloques(ruta, tipo='csv', tamanio_bloque=None, dialecto=None, **opciones_lectura):
+    """
+    Recorre un archivo CSV/TXT entregando DataFrames de tamaño acotado.
+
+    Parámetros:
+    - ruta: Ruta del archivo
+    - tipo: 'csv' o 'txt'
+    - tamanio_bloque: Filas por bloque (por defecto INGESTA_TAMANIO_BLOQUE)
+    - dialecto: Resultado de detectar_dialecto (se detecta si no se indica)
+    - opciones_lectura: Parámetros adicionales para pd.read_csv (p.e. dtype)
+
+    Retorna:
+    - Iterador de DataFrames sin filas completamente vacías
+    """
+    tamanio_bloque = tamanio_bloque or TAMANIO_BLOQUE
+    dialecto = dialecto or detectar_dialecto(ruta, tipo)
+
+    if dialecto['sep'] is None:
+        # Texto plano: una columna 'contenido' por línea
+        yield from _iterar_texto_plano(ruta, dialecto['encoding'], tamanio_bloque)
+        return
+
+    lector = pd.read_csv(
+        ruta,
+        sep=dialecto['sep'],
+        encoding=dialecto['encoding'],
+        chunksize=tamanio_bloque,
+        **opciones_lectura
+    )
+    with lector:
+        for bloque in lector:
+            bloque = bloque.dropna(how='all')
+            if not bloque.empty:
+                yield bloque
+
+
+def _iterar_texto_plano(ruta, codificacion, tamanio_bloque):
+    lineas = []
+    with open(ruta, 'r', encoding=codificacion, errors='ignore') as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea:
+                continue
+            lineas.append(linea)
+            if len(lineas) >= tamanio_bloque:
+                yield pd.DataFrame({'contenido': lineas})
+                lineas = []
+    if lineas:
+        yield pd.DataFrame({'contenido': lineas})
+
+
+def resumir_archivo(ruta, tipo='csv', filas_preview=100, tamanio_bloque=None):
+    """
+    Recorre el archivo una sola vez para obtener la vista previa y el conteo
+    total de filas sin retener más de un bloque en memoria.
+
+    Retorna:
+    - Tupla (DataFrame con las primeras filas, total de filas, dialecto)
+    """
+    dialecto = detectar_dialecto(ruta, tipo)
+    preview = None
+    total = 0
+    for bloque in iterar_bloques(ruta, tipo, tamanio_bloque, dialecto):
+        if preview is None:
+            preview = bloque.head(filas_preview).reset_index(drop=True)
+        elif len(preview) < filas_preview:
+            faltan = filas_preview - len(preview)
+            preview = pd.concat([preview, bloque.head(faltan)], ignore_index=True)
+        total += len(bloque)
+
+    if preview is None:
+        preview = pd.DataFrame()
+    return preview, total, dialecto
+
+
+def cargar_por_bloques(ruta, tipo, tabla, engine, if_exists='replace', tamanio_bloque=None, **opciones_lectura):
+    """
+    Carga un archivo CSV/TXT en una tabla de base de datos bloque a bloque.
+    El primer bloque aplica if_exists y los siguientes se anexan.
+
+    Retorna:
+    - Número total de filas cargadas
+    """
+    total = 0
+    modo = if_exists
+    for bloque in iterar_bloques(ruta, tipo, tamanio_bloque, **opciones_lectura):
+        total += cargar_dataframe(bloque, tabla, engine, if_exists=modo)
+        modo = 'append'
+    logger.info(f"Carga por bloques de {os.path.basename(ruta)} en {tabla}: {total} filas")
+    return total
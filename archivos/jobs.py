@@ -0,0 +1,295 @@
+"""
+Cola local de trabajos en segundo plano, sin broker externo
+
+Los trabajos se guardan en la tabla TrabajoCola y los ejecuta el comando
+
+    python manage.py procesar_cola
+
+con un pool de hilos o de procesos. Un worker toma un trabajo con un UPDATE
+condicional (estado='pendiente' -> 'en_proceso'), de modo que varios workers
+pueden compartir la misma cola sin ejecutar dos veces el mismo trabajo.
+
+Mientras se ejecuta, el avance (sentencias, filas) se guarda como mucho una
+vez por INTERVALO_PROGRESO segundos; la vista progreso_trabajo lo expone en
+JSON. El resultado final (dict devuelto por la función de archivos/procesos.py)
+queda en TrabajoCola.resultado.
+
+Con COLA_TRABAJOS_ASINCRONA = False (por defecto) enviar() ejecuta el trabajo
+en la misma petición, como hasta ahora, pero igualmente queda registrado.
+
+Los parámetros no llevan la URL de la base de datos (incluye la contraseña):
+llevan 'conexion', el nombre de una conexión configurada, y la URL se arma
+al ejecutar el trabajo (url_conexion).
+"""
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import procesos
+from .models import TrabajoCola
+
+logger = logging.getLogger(__name__)
+
+ASINCRONA = getattr(settings, 'COLA_TRABAJOS_ASINCRONA', False)
+WORKERS = getattr(settings, 'COLA_TRABAJOS_WORKERS', 2)
+TIMEOUT_SEGUNDOS = getattr(settings, 'COLA_TRABAJOS_TIMEOUT_SEGUNDOS', 3600)
+INTERVALO_PROGRESO = 1.0
+
+MANEJADORES = {
+    'importar_sql': procesos.importar_script_sql,
+    'script_seleccion': procesos.ejecutar_script_seleccion,
+    'ejecutar_proceso': procesos.ejecutar_proceso_guardado,
+}
+
+
+class Progreso:
+    """
+    Callback progreso(sentencias, filas) para las funciones de procesos.py.
+    Guarda el avance en el trabajo sin escribir en la BD en cada sentencia.
+    """
+
+    def __init__(self, trabajo_id):
+        self.trabajo_id = trabajo_id
+        self.sentencias = 0
+        self.filas = 0
+        self._ultimo = 0.0
+
+    def __call__(self, sentencias=None, filas=None):
+        if sentencias is not None:
+            self.sentencias = sentencias
+        if filas is not None:
+            self.filas = filas
+        if time.monotonic() - self._ultimo >= INTERVALO_PROGRESO:
+            self.guardar()
+
+    def guardar(self):
+        self._ultimo = time.monotonic()
+        TrabajoCola.objects.filter(pk=self.trabajo_id).update(
+            sentencias_ejecutadas=self.sentencias,
+            filas_cargadas=self.filas,
+            actualizado=timezone.now()
+        )
+
+
+def url_conexion(nombre):
+    """URL de SQLAlchemy de una conexión referenciada en los parámetros de un trabajo."""
+    if nombre == 'sqlserver':
+        # La base SQL Server configurada en settings.DATABASES
+        from .sqlserver_utils import get_sqlserver_connection_string
+        return get_sqlserver_connection_string()
+    raise ValueError(f"Conexión desconocida: {nombre}")
+
+
+def nombre_worker():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def encolar(tipo, parametros, sentencias_total=None, process_automation_id=None, run_log=None):
+    """
+    Crea un trabajo pendiente.
+
+    Parámetros:
+    - tipo: Clave de MANEJADORES
+    - parametros: Dict JSON con los argumentos de la función del manejador
+    - sentencias_total: Total estimado de sentencias, si se conoce
+    - process_automation_id / run_log: Registros de negocio asociados
+
+    Retorna:
+    - TrabajoCola creado
+    """
+    if tipo not in MANEJADORES:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+    return TrabajoCola.objects.create(
+        tipo=tipo,
+        parametros=parametros,
+        sentencias_total=sentencias_total,
+        process_automation_id=process_automation_id,
+        run_log=run_log,
+    )
+
+
+def enviar(tipo, parametros, **kwargs):
+    """
+    Encola un trabajo y, si la cola no es asíncrona, lo ejecuta enseguida.
+
+    Retorna:
+    - TrabajoCola (en estado 'pendiente' si quedó en cola)
+    """
+    trabajo = encolar(tipo, parametros, **kwargs)
+    if not ASINCRONA and reclamar(trabajo.pk, nombre_worker()):
+        trabajo.refresh_from_db()
+        ejecutar(trabajo)
+        trabajo.refresh_from_db()
+    return trabajo
+
+
+def reclamar(trabajo_id, worker):
+    """Marca el trabajo como tomado por `worker`. Retorna False si otro se adelantó."""
+    return TrabajoCola.objects.filter(pk=trabajo_id, estado='pendiente').update(
+        estado='en_proceso', worker=worker[:120], iniciado=timezone.now()
+    ) == 1
+
+
+def reclamar_siguiente(worker):
+    """Toma el trabajo pendiente más antiguo. Retorna su id o None si la cola está vacía."""
+    candidatos = TrabajoCola.objects.filter(estado='pendiente').order_by('creado').values_list('pk', flat=True)[:10]
+    for trabajo_id in candidatos:
+        if reclamar(trabajo_id, worker):
+            return trabajo_id
+    return None
+
+
+def ejecutar(trabajo):
+    """
+    Ejecuta un trabajo ya reclamado y guarda su estado final.
+
+    Retorna:
+    - True si terminó sin errores
+    """
+    progreso = Progreso(trabajo.pk)
+    inicio = time.monotonic()
+    try:
+        parametros = dict(trabajo.parametros)
+        if 'conexion' in parametros:
+            parametros['engine_url'] = url_conexion(parametros.pop('conexion'))
+        resultado = MANEJADORES[trabajo.tipo](progreso=progreso, **parametros)
+        estado, mensaje = 'completado', ''
+    except Exception as e:
+        logger.exception(f"Trabajo #{trabajo.pk} ({trabajo.tipo}) falló")
+        resultado, estado, mensaje = None, 'error', str(e)
+
+    duracion = time.monotonic() - inicio
+    TrabajoCola.objects.filter(pk=trabajo.pk).update(
+        estado=estado,
+        resultado=resultado,
+        mensaje=mensaje,
+        sentencias_ejecutadas=progreso.sentencias,
+        filas_cargadas=progreso.filas,
+        finalizado=timezone.now(),
+        actualizado=timezone.now(),
+    )
+    logger.info(
+        f"Trabajo #{trabajo.pk} ({trabajo.tipo}) {estado} en {duracion:.1f}s: "
+        f"{progreso.sentencias} sentencias, {progreso.filas} filas"
+    )
+    return estado == 'completado'
+
+
+def ejecutar_por_id(trabajo_id):
+    """Punto de entrada de los workers del pool: carga y ejecuta un trabajo reclamado."""
+    close_old_connections()
+    try:
+        return ejecutar(TrabajoCola.objects.get(pk=trabajo_id))
+    finally:
+        close_old_connections()
+
+
+def recuperar_colgados(segundos=None):
+    """
+    Marca como error los trabajos 'en_proceso' sin avance durante `segundos`
+    (worker caído o reiniciado). No se reintentan: el script pudo aplicarse
+    en parte.
+
+    Retorna:
+    - Número de trabajos marcados
+    """
+    limite = timezone.now() - timedelta(seconds=segundos or TIMEOUT_SEGUNDOS)
+    marcados = TrabajoCola.objects.filter(estado='en_proceso', actualizado__lt=limite).update(
+        estado='error',
+        mensaje='Trabajo interrumpido: el worker dejó de informar avance.',
+        finalizado=timezone.now(),
+    )
+    if marcados:
+        logger.warning(f"Cola: {marcados} trabajo(s) colgado(s) marcados como error")
+    return marcados
+
+
+def crear_pool(workers, tipo='hilos'):
+    """
+    Pool para procesar_pendientes. Los procesos se crean con 'spawn' para no
+    heredar las conexiones abiertas (BD y engines) del proceso padre; cada uno
+    inicializa Django antes de recibir su primer trabajo.
+    """
+    if tipo == 'procesos':
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cola')
+
+
+def procesar_pendientes(pool, workers, worker=None, activos=None):
+    """
+    Reclama trabajos pendientes hasta ocupar `workers` huecos del pool.
+
+    Parámetros:
+    - pool: Executor devuelto por crear_pool
+    - workers: Número máximo de trabajos simultáneos
+    - activos: Set de futures en curso (se actualiza en el lugar)
+
+    Retorna:
+    - Set de futures en curso
+    """
+    activos = set() if activos is None else activos
+    worker = worker or nombre_worker()
+    terminados = {f for f in activos if f.done()}
+    for futuro in terminados:
+        if futuro.exception() is not None:
+            logger.error(f"Worker de la cola terminó con error: {futuro.exception()}")
+    activos -= terminados
+
+    while len(activos) < workers:
+        trabajo_id = reclamar_siguiente(worker)
+        if trabajo_id is None:
+            break
+        activos.add(pool.submit(ejecutar_por_id, trabajo_id))
+    return activos
+
+
+def esperar(activos, timeout):
+    """Espera a que termine algún trabajo en curso o pase `timeout` segundos."""
+    if activos:
+        wait(activos, timeout=timeout, return_when=FIRST_COMPLETED)
+    else:
+        time.sleep(timeout)
+
+
+def resumen(trabajo):
+    """
+    Estado del trabajo para el endpoint JSON de progreso: avance, tiempo
+    transcurrido y rendimiento (sentencias y filas por segundo).
+    """
+    segundos = trabajo.duracion_segundos()
+    rendimiento = {}
+    if segundos:
+        rendimiento = {
+            'sentencias_por_segundo': round(trabajo.sentencias_ejecutadas / segundos, 1),
+            'filas_por_segundo': round(trabajo.filas_cargadas / segundos, 1),
+        }
+    porcentaje = None
+    if trabajo.sentencias_total:
+        porcentaje = min(100, round(100 * trabajo.sentencias_ejecutadas / trabajo.sentencias_total, 1))
+    return {
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'terminado': trabajo.estado in ('completado', 'error'),
+        'sentencias_ejecutadas': trabajo.sentencias_ejecutadas,
+        'sentencias_total': trabajo.sentencias_total,
+        'porcentaje': porcentaje,
+        'filas_cargadas': trabajo.filas_cargadas,
+        'segundos': round(segundos, 1) if segundos is not None else None,
+        **rendimiento,
+        'mensaje': trabajo.mensaje,
+        'resultado': trabajo.resultado if trabajo.estado in ('completado', 'error') else None,
+    }
@@ -0,0 +1,76 @@
+"""
+Lectura de consultas SQL por bloques
+
+pd.read_sql trae el resultado completo a memoria antes de construir el
+DataFrame, y con chunksize el driver igualmente puede descargar todas las
+filas al ejecutar la consulta. iterar_consulta ejecuta la consulta con
+stream_results (cursor del lado del servidor en los motores que lo admiten;
+en pyodbc, lectura incremental con fetchmany) y entrega DataFrames de
+tamaño acotado: copiar una tabla de 10M filas no necesita 10M filas en
+memoria.
+
+LECTURA_SQL_ARRAYSIZE en settings fija cuántas filas pide el driver al
+servidor en cada viaje; LECTURA_SQL_TAMANIO_BLOQUE, las filas por DataFrame.
+"""
+import pandas as pd
+from django.conf import settings
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+ARRAYSIZE = getattr(settings, 'LECTURA_SQL_ARRAYSIZE', 5000)
+TAMANIO_BLOQUE = getattr(settings, 'LECTURA_SQL_TAMANIO_BLOQUE', 50000)
+
+
+def iterar_consulta(engine, consulta, params=None, tamanio_bloque=None, arraysize=None):
+    """
+    Ejecuta una consulta y recorre su resultado en bloques de DataFrame.
+
+    Parámetros:
+    - engine: Engine (o conexión) de SQLAlchemy
+    - consulta: SQL como string u objeto text()/select()
+    - params: Parámetros de la consulta
+    - tamanio_bloque: Filas por DataFrame (por defecto LECTURA_SQL_TAMANIO_BLOQUE)
+    - arraysize: Filas por viaje al servidor (por defecto LECTURA_SQL_ARRAYSIZE)
+
+    Retorna:
+    - Iterador de DataFrames; si la consulta no devuelve filas entrega un único
+      DataFrame vacío con las columnas, para conservar la estructura. La
+      conexión queda abierta hasta agotar o cerrar el iterador.
+    """
+    tamanio_bloque = tamanio_bloque or TAMANIO_BLOQUE
+    arraysize = arraysize or ARRAYSIZE
+    if isinstance(consulta, str):
+        consulta = text(consulta)
+
+    conexion = engine.connect() if isinstance(engine, Engine) else None
+    conn = conexion or engine
+    try:
+        resultado = conn.execution_options(stream_results=True, max_row_buffer=arraysize).execute(
+            consulta, params or {}
+        )
+        cursor = getattr(resultado, 'cursor', None)
+        if cursor is not None and hasattr(cursor, 'arraysize'):
+            try:
+                cursor.arraysize = arraysize
+            except Exception:
+                pass
+        columnas = list(resultado.keys())
+
+        vacio = True
+        for filas in resultado.partitions(tamanio_bloque):
+            vacio = False
+            # coerce_float: Decimal -> float, igual que pd.read_sql
+            yield pd.DataFrame.from_records([tuple(f) for f in filas], columns=columnas, coerce_float=True)
+        if vacio:
+            yield pd.DataFrame(columns=columnas)
+    finally:
+        if conexion is not None:
+            conexion.close()
+
+
+def leer_consulta(engine, consulta, params=None, arraysize=None):
+    """Resultado completo de la consulta en un DataFrame, leído por bloques (para resultados acotados)."""
+    bloques = list(iterar_consulta(engine, consulta, params, arraysize=arraysize))
+    if len(bloques) == 1:
+        return bloques[0]
+    return pd.concat(bloques, ignore_index=True)
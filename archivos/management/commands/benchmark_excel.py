@@ -0,0 +1,150 @@
+"""
+Comparación de los motores de lectura de Excel (archivos/excel_reader.py)
+
+    python manage.py benchmark_excel --filas 200000 --columnas 20 --hojas 3
+    python manage.py benchmark_excel --archivo D:/datos/ventas.xlsx --memoria
+
+Genera un libro grande (o usa uno existente) y mide, para cada motor
+disponible, la enumeración de hojas y la lectura completa de la primera hoja
+con pd.read_excel y en streaming por bloques. Con --dividir mide además la
+separación de todas las hojas en archivos sueltos (read_excel + to_excel por
+hoja frente a division_hojas.dividir_hojas).
+
+El libro generado se escribe en modo write_only, que no incluye la dimensión
+de las hojas: openpyxl recorre entonces cada hoja al abrir el libro, como
+ocurre con muchos archivos exportados por otros sistemas.
+"""
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from archivos import excel_reader
+from archivos.division_hojas import dividir_hojas
+
+
+def generar_libro(ruta, filas, columnas, hojas):
+    """Escribe un libro con datos mixtos (enteros, decimales, texto y fechas)."""
+    from openpyxl import Workbook
+    libro = Workbook(write_only=True)
+    inicio = date(2020, 1, 1)
+    for h in range(hojas):
+        hoja = libro.create_sheet(f"Hoja{h + 1}")
+        hoja.append([f"col_{c + 1}" for c in range(columnas)])
+        for i in range(filas):
+            fila = []
+            for c in range(columnas):
+                resto = c % 4
+                if resto == 0:
+                    fila.append(i)
+                elif resto == 1:
+                    fila.append(i * 1.5)
+                elif resto == 2:
+                    fila.append(f"texto {i % 1000}")
+                else:
+                    fila.append(inicio + timedelta(days=i % 3650))
+            hoja.append(fila)
+    libro.save(ruta)
+
+
+class Command(BaseCommand):
+    help = 'Compara los motores de lectura de Excel sobre un libro grande'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archivo', help='Libro existente a medir (si no, se genera uno)')
+        parser.add_argument('--filas', type=int, default=100000, help='Filas por hoja del libro generado')
+        parser.add_argument('--columnas', type=int, default=10, help='Columnas del libro generado')
+        parser.add_argument('--hojas', type=int, default=3, help='Hojas del libro generado')
+        parser.add_argument('--memoria', action='store_true',
+                            help='Medir también el pico de memoria (tracemalloc; hace más lenta cada prueba)')
+        parser.add_argument('--dividir', action='store_true',
+                            help='Medir también la división del libro en un archivo por hoja')
+
+    def medir(self, nombre, funcion, memoria):
+        if memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        pico = None
+        if memoria:
+            pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+
+        linea = f"{nombre:<42} {segundos:>9.3f}s"
+        if isinstance(resultado, int):
+            # Las pruebas de lectura devuelven las filas leídas
+            linea += f" {resultado / segundos if segundos else 0:>12,.0f} filas/s"
+        else:
+            linea += " " * 20
+        if pico is not None:
+            linea += f" {pico:>9.1f} MB"
+        self.stdout.write(linea)
+
+    def handle(self, *args, **opciones):
+        ruta = opciones['archivo']
+        temporal = None
+        if not ruta:
+            temporal = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+            temporal.close()
+            ruta = temporal.name
+            self.stdout.write(f"Generando libro de {opciones['hojas']} hoja(s) x {opciones['filas']:,} filas "
+                              f"x {opciones['columnas']} columnas...")
+            generar_libro(ruta, opciones['filas'], opciones['columnas'], opciones['hojas'])
+        self.stdout.write(f"Libro: {ruta} ({os.path.getsize(ruta) / 1024 / 1024:.1f} MB)")
+
+        motores = ['openpyxl']
+        if excel_reader.calamine_disponible():
+            motores.append('calamine')
+        else:
+            self.stdout.write(self.style.WARNING('python-calamine no está instalado: solo se mide openpyxl'))
+
+        memoria = opciones['memoria']
+        try:
+            self.medir('hojas: pd.ExcelFile', lambda: pd.ExcelFile(ruta).sheet_names, memoria)
+            self.medir('hojas: manifiesto (workbook.xml)', lambda: excel_reader.nombres_hojas(ruta), memoria)
+            for motor in motores:
+                self.medir(f'preview 25 filas: {motor}',
+                           lambda: len(excel_reader.leer_excel(ruta, 0, nrows=25, motor=motor)), memoria)
+                self.medir(f'hoja completa pd.read_excel: {motor}',
+                           lambda: len(excel_reader.leer_excel(ruta, 0, motor=motor)), memoria)
+                self.medir(f'hoja completa streaming: {motor}',
+                           lambda: sum(len(b) for b in excel_reader.iterar_bloques(ruta, 0, motor=motor)), memoria)
+            if opciones['dividir']:
+                self.medir_division(ruta, memoria)
+        finally:
+            if temporal:
+                os.remove(ruta)
+
+    def medir_division(self, ruta, memoria):
+        carpeta = tempfile.mkdtemp()
+        try:
+            hojas = excel_reader.nombres_hojas(ruta)
+            destinos = [(hoja, os.path.join(carpeta, f"{hoja}.xlsx")) for hoja in hojas]
+
+            def por_hoja():
+                filas = 0
+                for hoja, destino in destinos:
+                    df = excel_reader.leer_excel(ruta, hoja, motor='openpyxl')
+                    df.to_excel(destino, index=False)
+                    filas += len(df)
+                return filas
+
+            def dividir(workers):
+                estadisticas, pico = dividir_hojas(ruta, destinos, workers=workers, medir_memoria=memoria)
+                if pico is not None:
+                    self.stdout.write(f"  pico por proceso: {pico} MB")
+                return sum(e['filas'] for e in estadisticas)
+
+            self.medir(f'dividir {len(hojas)} hojas: read_excel + to_excel', por_hoja, memoria)
+            self.medir('dividir: libro abierto una vez, 1 proceso', lambda: dividir(1), False)
+            workers = min(len(hojas), os.cpu_count() or 1)
+            if workers > 1:
+                self.medir(f'dividir: libro abierto una vez, {workers} procesos', lambda: dividir(workers), False)
+        finally:
+            shutil.rmtree(carpeta, ignore_errors=True)
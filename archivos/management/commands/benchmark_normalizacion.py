@@ -0,0 +1,93 @@
+"""
+Comparación de la normalización celda a celda con la vectorizada (archivos/normalizacion.py)
+
+    python manage.py benchmark_normalizacion --filas 200000 --columnas 30
+
+Genera un DataFrame de texto (dtype object, como lo lee el asistente) con
+enteros con sufijo (también con dígitos no ASCII y de más de 64 bits),
+nulos escritos de varias formas y texto libre, mide
+`df[c].apply(normalizar_celda)` frente a normalizar_dataframe y verifica que
+ambos den los mismos valores.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from archivos.normalizacion import normalizar_celda, normalizar_dataframe
+
+# Incluye dígitos no ASCII ('٣ x' -> 3) y un entero de más de 64 bits
+VALORES = ['15 días', ' 20kg', '-7', 'n/a', '', 'NULL', '  7 items', 'texto libre', 'None', '42',
+           '٣ x', '99999999999999999999 u']
+
+
+def generar_datos(filas, columnas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    datos = {}
+    for c in range(columnas):
+        if c % 3 == 0:
+            # Columna que queda solo con enteros y nulos (Int64 en la vectorizada)
+            valores = np.array([f"{n} u" for n in range(100)] + ['na', ' '], dtype=object)
+        elif c == 1:
+            # Solo enteros, uno de ellos de más de 64 bits (queda object)
+            valores = np.array([f"{n} u" for n in range(100)] + ['99999999999999999999'], dtype=object)
+        else:
+            valores = np.array(VALORES, dtype=object)
+        datos[f"col_{c + 1}"] = valores[rng.integers(0, len(valores), filas)]
+    return pd.DataFrame(datos)
+
+
+def iguales(a, b):
+    """Compara dos Series celda a celda tratando None/NaN/NA como nulo."""
+    for x, y in zip(a.tolist(), b.tolist()):
+        if pd.isna(x) and pd.isna(y):
+            continue
+        if pd.isna(x) or pd.isna(y) or x != y:
+            return False
+    return True
+
+
+class Command(BaseCommand):
+    help = 'Compara la normalización celda a celda con la vectorizada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=100000)
+        parser.add_argument('--columnas', type=int, default=20)
+        parser.add_argument('--repeticiones', type=int, default=3,
+                            help='Se informa el mejor tiempo de N repeticiones')
+
+    def medir(self, funcion, repeticiones):
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            segundos = time.perf_counter() - inicio
+            mejor = segundos if mejor is None else min(mejor, segundos)
+        return resultado, mejor
+
+    def handle(self, *args, **opciones):
+        df = generar_datos(opciones['filas'], opciones['columnas'])
+        celdas = df.size
+        self.stdout.write(f"DataFrame: {len(df):,} filas x {len(df.columns)} columnas ({celdas:,} celdas)")
+
+        def por_celda():
+            copia = df.copy()
+            for c in copia.columns:
+                copia[c] = copia[c].apply(normalizar_celda)
+            return copia
+
+        referencia, t_celda = self.medir(por_celda, opciones['repeticiones'])
+        vectorizado, t_vector = self.medir(lambda: normalizar_dataframe(df), opciones['repeticiones'])
+
+        for nombre, segundos in (('apply(normalizar_celda)', t_celda), ('normalizar_dataframe', t_vector)):
+            self.stdout.write(f"{nombre:<26} {segundos:>8.3f}s {celdas / segundos:>14,.0f} celdas/s")
+        self.stdout.write(f"Aceleración: x{t_celda / t_vector:.1f}")
+
+        distintas = [c for c in df.columns if not iguales(referencia[c], vectorizado[c])]
+        enteras = [c for c in vectorizado.columns if str(vectorizado[c].dtype) == 'Int64']
+        self.stdout.write(f"Columnas Int64: {len(enteras)} de {len(df.columns)}")
+        if distintas:
+            self.stdout.write(self.style.ERROR(f"Valores distintos en: {', '.join(distintas)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Mismos valores en todas las columnas'))
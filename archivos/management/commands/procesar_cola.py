@@ -0,0 +1,63 @@
+"""
+Worker de la cola local de trabajos (archivos/jobs.py)
+
+    python manage.py procesar_cola --workers 2 --pool hilos
+
+Toma los trabajos pendientes de TrabajoCola (importaciones SQL y ejecuciones
+de procesos enviadas por las vistas con COLA_TRABAJOS_ASINCRONA = True) y los
+ejecuta en un pool de hilos o de procesos. Se pueden lanzar varios workers,
+incluso en máquinas distintas que compartan la base de datos: cada trabajo lo
+reclama uno solo.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from archivos import jobs
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se buscan trabajos colgados de workers caídos
+REVISION_COLGADOS_SEGUNDOS = 300
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos pendientes de la cola local (importaciones SQL y procesos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=jobs.WORKERS,
+                            help='Trabajos simultáneos')
+        parser.add_argument('--pool', choices=['hilos', 'procesos'], default='hilos',
+                            help='Ejecutar los trabajos en hilos o en procesos separados')
+        parser.add_argument('--intervalo', type=float, default=2,
+                            help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesar los trabajos pendientes y terminar')
+
+    def handle(self, *args, **opciones):
+        workers = max(1, opciones['workers'])
+        intervalo = opciones['intervalo']
+        worker = jobs.nombre_worker()
+
+        jobs.recuperar_colgados()
+        ultima_revision = time.monotonic()
+        self.stdout.write(f"Worker {worker}: {workers} {opciones['pool']}")
+
+        pool = jobs.crear_pool(workers, opciones['pool'])
+        activos = set()
+        try:
+            while True:
+                activos = jobs.procesar_pendientes(pool, workers, worker, activos)
+                if opciones['una_vez'] and not activos:
+                    break
+
+                if time.monotonic() - ultima_revision >= REVISION_COLGADOS_SEGUNDOS:
+                    jobs.recuperar_colgados()
+                    ultima_revision = time.monotonic()
+
+                jobs.esperar(activos, intervalo)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Deteniendo: se esperan los trabajos en curso'))
+        finally:
+            pool.shutdown(wait=True)
@@ -0,0 +1,53 @@
+"""
+Programador de procesos guardados (archivos/programador.py)
+
+    python manage.py programar_procesos --workers 4 --pool procesos
+
+Revisa periódicamente los ProcessConfig activos con 'programacion' en su
+json_config y lanza las ejecuciones vencidas en un pool acotado, sin
+solapar ejecuciones del mismo proceso y respetando el límite de ejecuciones
+simultáneas por base de datos destino.
+"""
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from archivos import jobs
+from archivos.programador import WORKERS, Programador
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los procesos guardados según su programación (cron o intervalo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=WORKERS,
+                            help='Ejecuciones simultáneas como máximo')
+        parser.add_argument('--pool', choices=['hilos', 'procesos'], default='procesos',
+                            help='Ejecutar los procesos en hilos o en procesos separados')
+        parser.add_argument('--intervalo', type=float,
+                            default=getattr(settings, 'PROGRAMADOR_INTERVALO', 15),
+                            help='Segundos entre revisiones de la programación')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Lanzar las ejecuciones vencidas (sin jitter), esperar a que terminen y salir')
+
+    def handle(self, *args, **opciones):
+        workers = max(1, opciones['workers'])
+        pool = jobs.crear_pool(workers, opciones['pool'])
+        programador = Programador(pool, workers, usar_jitter=not opciones['una_vez'])
+        self.stdout.write(f"Programador: {workers} {opciones['pool']}, revisión cada {opciones['intervalo']}s")
+
+        try:
+            while True:
+                lanzadas = programador.ciclo()
+                if lanzadas:
+                    self.stdout.write(f"{lanzadas} ejecución(es) lanzada(s)")
+                if opciones['una_vez'] and not programador.en_curso:
+                    break
+                programador.esperar(opciones['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Deteniendo: se esperan las ejecuciones en curso'))
+        finally:
+            pool.shutdown(wait=True)
@@ -0,0 +1,172 @@
+"""
+Vigilante en segundo plano de las carpetas compartidas
+
+Mantiene ArchivoDetectado (incluida la lista de hojas de los Excel) al día sin
+que las vistas tengan que recorrer las carpetas:
+
+    python manage.py vigilar_carpetas
+
+- En carpetas locales usa notificaciones del sistema de archivos (inotify en
+  Linux, ReadDirectoryChangesW en Windows) a través de `watchdog`, si está
+  instalado.
+- En recursos de red (rutas UNC) o sin watchdog se consulta periódicamente,
+  duplicando el intervalo mientras no haya cambios (o haya errores) hasta
+  VIGILANTE_INTERVALO_MAX, y volviendo al intervalo base al detectar cambios.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from archivos.escaner import actualizar_hojas, sincronizar_carpeta
+from archivos.models import CarpetaCompartida
+
+logger = logging.getLogger(__name__)
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - watchdog es opcional
+    FileSystemEventHandler = object
+    Observer = None
+
+# Cada cuánto se vuelve a leer la lista de carpetas activas
+RECARGA_CARPETAS_SEGUNDOS = 60
+
+
+def es_ruta_de_red(ruta):
+    return ruta.startswith('\\\\') or ruta.startswith('//')
+
+
+class _MarcarCarpeta(FileSystemEventHandler):
+    """Marca la carpeta como pendiente de escaneo ante cualquier evento."""
+
+    def __init__(self, carpeta_id, pendientes, lock):
+        super().__init__()
+        self.carpeta_id = carpeta_id
+        self.pendientes = pendientes
+        self.lock = lock
+
+    def on_any_event(self, event):
+        with self.lock:
+            self.pendientes.add(self.carpeta_id)
+
+
+class Command(BaseCommand):
+    help = 'Vigila las carpetas compartidas activas y mantiene ArchivoDetectado actualizado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float,
+                            default=getattr(settings, 'VIGILANTE_INTERVALO', 30),
+                            help='Intervalo base de consulta en segundos')
+        parser.add_argument('--intervalo-max', type=float,
+                            default=getattr(settings, 'VIGILANTE_INTERVALO_MAX', 600),
+                            help='Intervalo máximo de consulta tras el backoff')
+        parser.add_argument('--sin-eventos', action='store_true',
+                            help='No usar notificaciones del sistema de archivos, solo consulta periódica')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Escanear todas las carpetas una vez y terminar')
+
+    def handle(self, *args, **opciones):
+        self.intervalo_base = opciones['intervalo']
+        self.intervalo_max = opciones['intervalo_max']
+        usar_eventos = Observer is not None and not opciones['sin_eventos']
+
+        if opciones['una_vez']:
+            for carpeta in CarpetaCompartida.objects.filter(activa=True):
+                self._escanear(carpeta)
+            return
+
+        self.pendientes = set()
+        self.lock = threading.Lock()
+        self.observador = Observer() if usar_eventos else None
+        self.vigiladas = {}     # carpeta_id -> watch de watchdog
+        self.agenda = {}        # carpeta_id -> (próxima consulta, intervalo actual)
+        self.carpetas = {}
+
+        if self.observador:
+            self.observador.start()
+        elif not opciones['sin_eventos']:
+            self.stdout.write(self.style.WARNING('watchdog no está instalado: se usará consulta periódica'))
+
+        ultima_recarga = 0
+        try:
+            while True:
+                ahora = time.monotonic()
+                if ahora - ultima_recarga >= RECARGA_CARPETAS_SEGUNDOS:
+                    self._recargar_carpetas()
+                    ultima_recarga = ahora
+
+                with self.lock:
+                    marcadas = set(self.pendientes)
+                    self.pendientes.clear()
+                for carpeta_id in marcadas:
+                    if carpeta_id in self.carpetas:
+                        self._escanear(self.carpetas[carpeta_id], forzar=True)
+
+                for carpeta_id, (proxima, intervalo) in list(self.agenda.items()):
+                    if ahora < proxima or carpeta_id not in self.carpetas:
+                        continue
+                    hubo_cambios = self._escanear(self.carpetas[carpeta_id])
+                    if hubo_cambios:
+                        intervalo = self.intervalo_base
+                    else:
+                        intervalo = min(intervalo * 2, self.intervalo_max)
+                    self.agenda[carpeta_id] = (time.monotonic() + intervalo, intervalo)
+
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.observador:
+                self.observador.stop()
+                self.observador.join()
+
+    def _recargar_carpetas(self):
+        activas = {c.id: c for c in CarpetaCompartida.objects.filter(activa=True)}
+
+        for carpeta_id in set(self.carpetas) - set(activas):
+            watch = self.vigiladas.pop(carpeta_id, None)
+            if watch is not None:
+                self.observador.unschedule(watch)
+            self.agenda.pop(carpeta_id, None)
+
+        for carpeta_id, carpeta in activas.items():
+            if carpeta_id in self.carpetas:
+                continue
+            watch = None
+            if self.observador and not es_ruta_de_red(carpeta.ruta):
+                try:
+                    watch = self.observador.schedule(
+                        _MarcarCarpeta(carpeta_id, self.pendientes, self.lock), carpeta.ruta, recursive=False
+                    )
+                except Exception as e:
+                    logger.warning(f"No se pueden recibir eventos de {carpeta.ruta}, se consultará: {e}")
+            if watch is not None:
+                self.vigiladas[carpeta_id] = watch
+                with self.lock:
+                    self.pendientes.add(carpeta_id)  # Escaneo inicial
+            else:
+                self.agenda[carpeta_id] = (0, self.intervalo_base)
+
+        self.carpetas = activas
+
+    def _escanear(self, carpeta, forzar=False):
+        """Sincroniza una carpeta y sus hojas Excel. Devuelve True si hubo cambios."""
+        try:
+            cambios = sincronizar_carpeta(carpeta, forzar=forzar)
+            if cambios is None:
+                logger.warning(f"Carpeta no accesible: {carpeta.ruta}")
+                return False
+            hojas = actualizar_hojas(carpeta)
+            if any(cambios.values()) or hojas:
+                self.stdout.write(
+                    f"{carpeta.nombre}: {cambios['nuevos']} nuevos, {cambios['modificados']} modificados, "
+                    f"{cambios['eliminados']} eliminados, {hojas} con hojas actualizadas"
+                )
+                return True
+        except Exception as e:
+            logger.error(f"Error escaneando {carpeta.ruta}: {e}")
+        return False
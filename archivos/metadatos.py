@@ -0,0 +1,255 @@
+"""
+Consultas de metadatos de tablas en lote
+
+Verificar la existencia de N tablas con una consulta a INFORMATION_SCHEMA por
+tabla, y contarlas con un SELECT COUNT(*) por tabla, cuesta N idas y vueltas
+(y un recorrido completo de cada tabla). Aquí:
+  - La existencia de todas las tablas se resuelve con una sola consulta
+    (TABLE_NAME IN (...) en SQL Server, sqlite_master en SQLite, el
+    inspector de SQLAlchemy en otros motores).
+  - Las filas se leen de los metadatos de particiones de SQL Server
+    (sys.dm_db_partition_stats, o sys.partitions sin permiso VIEW DATABASE
+    STATE) en una sola consulta; en otros motores, y para las vistas, se
+    cuentan con un único SELECT ... UNION ALL.
+
+Los resultados se guardan por engine durante METADATOS_TTL_SEGUNDOS; tras
+ejecutar DDL o cargar datos se debe llamar a invalidar(engine) o consultar
+con usar_cache=False.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from sqlalchemy import bindparam, inspect, text
+
+from .engines import normalizar_url
+
+logger = logging.getLogger(__name__)
+
+TTL = getattr(settings, 'METADATOS_TTL_SEGUNDOS', 30)
+
+# SQL Server admite hasta 2100 parámetros por sentencia
+_LOTE = 1000
+
+# {(url, 'existe'|'filas'|'estructura', tabla en minúsculas): (expira, valor)}
+_cache = {}
+_lock = threading.Lock()
+
+
+def _clave_engine(engine):
+    return normalizar_url(engine.url)
+
+
+def _leer_cache(clave, tipo, tablas):
+    """Valores vigentes en caché: dict {tabla: valor} solo con las tablas encontradas."""
+    ahora = time.monotonic()
+    encontrados = {}
+    with _lock:
+        for tabla in tablas:
+            entrada = _cache.get((clave, tipo, tabla.lower()))
+            if entrada and entrada[0] > ahora:
+                encontrados[tabla] = entrada[1]
+    return encontrados
+
+
+def _guardar_cache(clave, tipo, valores):
+    if TTL <= 0:
+        return
+    expira = time.monotonic() + TTL
+    with _lock:
+        for tabla, valor in valores.items():
+            _cache[(clave, tipo, tabla.lower())] = (expira, valor)
+
+
+def invalidar(engine=None):
+    """Descarta los metadatos en caché de un engine (o de todos si es None)."""
+    with _lock:
+        if engine is None:
+            _cache.clear()
+            return
+        clave = _clave_engine(engine)
+        for k in [k for k in _cache if k[0] == clave]:
+            del _cache[k]
+
+
+def _lotes(valores):
+    for i in range(0, len(valores), _LOTE):
+        yield valores[i:i + _LOTE]
+
+
+def _nombres_existentes(conn, dialecto, tablas):
+    """
+    Tablas o vistas existentes entre 'tablas'.
+
+    Retorna:
+    - Dict {nombre en minúsculas: nombre real en la base}
+    """
+    if dialecto == 'mssql':
+        consulta = text(
+            "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES "
+            "WHERE TABLE_NAME IN :nombres AND TABLE_CATALOG = DB_NAME()"
+        ).bindparams(bindparam('nombres', expanding=True))
+        existentes = {}
+        for lote in _lotes(tablas):
+            existentes.update((r[0].lower(), r[0]) for r in conn.execute(consulta, {'nombres': lote}))
+        return existentes
+    if dialecto == 'sqlite':
+        # lower() de SQLite solo convierte ASCII: se compara en Python ('Año' -> 'año')
+        nombres = [r[0] for r in conn.execute(text("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')"))]
+    else:
+        inspector = inspect(conn)
+        nombres = inspector.get_table_names() + inspector.get_view_names()
+    buscadas = {t.lower() for t in tablas}
+    return {n.lower(): n for n in nombres if n.lower() in buscadas}
+
+
+def tablas_existentes(engine, tablas, usar_cache=True):
+    """
+    Verifica con una sola consulta cuáles de las tablas existen.
+
+    Parámetros:
+    - engine: Engine de SQLAlchemy
+    - tablas: Nombres de tabla (la comparación no distingue mayúsculas)
+    - usar_cache: Aprovechar resultados de menos de METADATOS_TTL_SEGUNDOS
+
+    Retorna:
+    - Conjunto con los nombres de 'tablas' (tal como se pasaron) que existen
+    """
+    tablas = list(dict.fromkeys(tablas))
+    if not tablas:
+        return set()
+    clave = _clave_engine(engine)
+    conocidas = _leer_cache(clave, 'existe', tablas) if usar_cache else {}
+    pendientes = [t for t in tablas if t not in conocidas]
+
+    if pendientes:
+        with engine.connect() as conn:
+            nombres = _nombres_existentes(conn, engine.dialect.name, pendientes)
+        nuevas = {t: t.lower() in nombres for t in pendientes}
+        _guardar_cache(clave, 'existe', nuevas)
+        conocidas.update(nuevas)
+
+    return {t for t in tablas if conocidas[t]}
+
+
+def tabla_existe(engine, tabla, usar_cache=True):
+    """Verifica si una tabla existe (ver tablas_existentes)."""
+    return tabla in tablas_existentes(engine, [tabla], usar_cache)
+
+
+def _filas_particiones(conn, tablas):
+    """Filas por tabla del esquema por defecto según los metadatos de SQL Server."""
+    filas = {}
+    for vista in ('sys.dm_db_partition_stats', 'sys.partitions'):
+        columna = 'row_count' if vista == 'sys.dm_db_partition_stats' else 'rows'
+        consulta = text(
+            f"SELECT t.name, SUM(p.{columna}) FROM sys.tables t "
+            f"JOIN {vista} p ON p.object_id = t.object_id AND p.index_id IN (0, 1) "
+            "WHERE t.name IN :nombres AND t.schema_id = SCHEMA_ID() "
+            "GROUP BY t.name"
+        ).bindparams(bindparam('nombres', expanding=True))
+        try:
+            for lote in _lotes(tablas):
+                filas.update((r[0].lower(), int(r[1] or 0)) for r in conn.execute(consulta, {'nombres': lote}))
+            return filas
+        except Exception as e:
+            # dm_db_partition_stats requiere VIEW DATABASE STATE
+            logger.debug(f"No se pudo leer {vista}: {e}")
+            filas.clear()
+    return filas
+
+
+def _filas_contando(conn, tablas):
+    """Un solo SELECT COUNT(*) ... UNION ALL para todas las tablas."""
+    quote = conn.dialect.identifier_preparer.quote
+    filas = {}
+    for lote in _lotes(tablas):
+        partes = [
+            f"SELECT :t{i} AS tabla, COUNT(*) AS filas FROM {quote(tabla)}"
+            for i, tabla in enumerate(lote)
+        ]
+        parametros = {f"t{i}": tabla.lower() for i, tabla in enumerate(lote)}
+        filas.update((r[0], int(r[1] or 0)) for r in conn.execute(text(" UNION ALL ".join(partes)), parametros))
+    return filas
+
+
+def conteo_filas(engine, tablas, usar_cache=True):
+    """
+    Filas de cada tabla con el mínimo de consultas.
+
+    En SQL Server el número sale de los metadatos de particiones (no recorre
+    las tablas); las vistas y los demás motores se cuentan con COUNT(*) en una
+    sola sentencia.
+
+    Parámetros:
+    - engine: Engine de SQLAlchemy
+    - tablas: Nombres de tabla
+    - usar_cache: Aprovechar resultados de menos de METADATOS_TTL_SEGUNDOS
+
+    Retorna:
+    - Dict {tabla: filas}; las tablas inexistentes quedan con None
+    """
+    tablas = list(dict.fromkeys(tablas))
+    if not tablas:
+        return {}
+    clave = _clave_engine(engine)
+    conocidas = _leer_cache(clave, 'filas', tablas) if usar_cache else {}
+    pendientes = [t for t in tablas if t not in conocidas]
+
+    if pendientes:
+        existentes = tablas_existentes(engine, pendientes, usar_cache)
+        filas = {}
+        with engine.connect() as conn:
+            if engine.dialect.name == 'mssql':
+                filas = _filas_particiones(conn, [t for t in pendientes if t in existentes])
+            sin_metadatos = [t for t in pendientes if t in existentes and t.lower() not in filas]
+            if sin_metadatos:
+                filas.update(_filas_contando(conn, sin_metadatos))
+        nuevas = {t: filas.get(t.lower()) for t in pendientes}
+        _guardar_cache(clave, 'filas', {t: n for t, n in nuevas.items() if n is not None})
+        conocidas.update(nuevas)
+
+    return {t: conocidas[t] for t in tablas}
+
+
+def estructura_tabla(engine, tabla, usar_cache=True):
+    """
+    Columnas y clave primaria de una tabla (reflejadas una vez y guardadas en caché).
+
+    Parámetros:
+    - engine: Engine de SQLAlchemy
+    - tabla: Nombre de la tabla
+    - usar_cache: Aprovechar resultados de menos de METADATOS_TTL_SEGUNDOS
+
+    Retorna:
+    - Dict con 'nombre' (nombre real de la tabla; 'tabla' se compara sin
+      distinguir mayúsculas), 'columnas' (lista de {'nombre', 'tipo',
+      'nulable'}) y 'clave' (columnas de la clave primaria, vacía si no
+      tiene), o None si la tabla no existe
+    """
+    clave = _clave_engine(engine)
+    if usar_cache:
+        conocida = _leer_cache(clave, 'estructura', [tabla])
+        if tabla in conocida:
+            return conocida[tabla]
+
+    if not tabla_existe(engine, tabla, usar_cache):
+        return None
+    with engine.connect() as conn:
+        nombre = _nombres_existentes(conn, engine.dialect.name, [tabla]).get(tabla.lower())
+    if nombre is None:
+        return None
+    inspector = inspect(engine)
+    columnas = [
+        {'nombre': c['name'], 'tipo': str(c['type']), 'nulable': bool(c.get('nullable', True))}
+        for c in inspector.get_columns(nombre)
+    ]
+    try:
+        pk = inspector.get_pk_constraint(nombre).get('constrained_columns') or []
+    except NotImplementedError:
+        # Las vistas no tienen clave primaria
+        pk = []
+    estructura = {'nombre': nombre, 'columnas': columnas, 'clave': list(pk)}
+    _guardar_cache(clave, 'estructura', {tabla: estructura})
+    return estructura
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archivos', '0003_processconfig_processrunlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carpetacompartida',
+            name='mtime_escaneo',
+            field=models.FloatField(blank=True, null=True, verbose_name='mtime del directorio al escanear'),
+        ),
+        migrations.AddField(
+            model_name='carpetacompartida',
+            name='ultimo_escaneo',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último escaneo'),
+        ),
+    ]
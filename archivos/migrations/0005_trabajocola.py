@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archivos', '0004_carpetacompartida_marca_escaneo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoCola',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('importar_sql', 'Importación de script SQL'), ('script_seleccion', 'Script SQL del asistente de selección'), ('ejecutar_proceso', 'Ejecución de proceso guardado')], max_length=40)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('error', 'Error')], db_index=True, default='pendiente', max_length=20)),
+                ('parametros', models.JSONField(default=dict)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('mensaje', models.TextField(blank=True)),
+                ('sentencias_ejecutadas', models.IntegerField(default=0)),
+                ('sentencias_total', models.IntegerField(blank=True, null=True)),
+                ('filas_cargadas', models.BigIntegerField(default=0)),
+                ('process_automation_id', models.IntegerField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=120)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('finalizado', models.DateTimeField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('run_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos', to='archivos.processrunlog')),
+            ],
+            options={
+                'verbose_name': 'Trabajo en cola',
+                'verbose_name_plural': 'Trabajos en cola',
+                'ordering': ['creado'],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Estado de los modelos no gestionados (managed=False): no crea tablas."""
+
+    dependencies = [
+        ('archivos', '0005_trabajocola'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessAutomation',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=255)),
+                ('tipo_proceso', models.CharField(max_length=50)),
+                ('fecha_ejecucion', models.DateTimeField(auto_now_add=True)),
+                ('estado', models.CharField(max_length=20)),
+                ('tiempo_ejecucion', models.IntegerField()),
+                ('usuario', models.CharField(max_length=100)),
+                ('parametros', models.TextField(blank=True, null=True)),
+                ('resultado', models.TextField(blank=True, null=True)),
+                ('filas_afectadas', models.IntegerField(default=0)),
+                ('error_mensaje', models.TextField(blank=True, null=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'ProcessAutomation',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SqlFileUpload',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('tamanio_bytes', models.BigIntegerField()),
+                ('fecha_subida', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.CharField(max_length=100)),
+                ('tablas_creadas', models.TextField(blank=True, null=True)),
+                ('sentencias_total', models.IntegerField(default=0)),
+                ('sentencias_exito', models.IntegerField(default=0)),
+                ('conversion_mysql', models.BooleanField(default=False)),
+                ('errores', models.TextField(blank=True, null=True)),
+                ('estado', models.CharField(max_length=20)),
+                ('ruta_temporal', models.CharField(blank=True, max_length=255, null=True)),
+                ('version_convertida', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'SqlFileUpload',
+                'managed': False,
+            },
+        ),
+    ]
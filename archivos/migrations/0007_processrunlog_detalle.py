@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('archivos', '0006_modelos_no_gestionados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processrunlog',
+            name='detalle',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import os
 from .db_models import ProcessAutomation, SqlFileUpload
 
@@ -9,6 +10,10 @@ class CarpetaCompartida(models.Model):
     activa = models.BooleanField(default=True, verbose_name="Activa")
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
+    # Marca del último escaneo incremental (ver escaner.escanear_carpeta)
+    ultimo_escaneo = models.DateTimeField(blank=True, null=True, verbose_name="Último escaneo")
+    mtime_escaneo = models.FloatField(blank=True, null=True, verbose_name="mtime del directorio al escanear")
+    
     class Meta:
         verbose_name = "Carpeta Compartida"
         verbose_name_plural = "Carpetas Compartidas"
@@ -100,8 +105,63 @@ class ProcessRunLog(models.Model):
     filas_totales = models.IntegerField(default=0)
     mensaje = models.TextField(blank=True)
     errores = models.JSONField(null=True, blank=True)
+    # Estadísticas de la ejecución (filas y segundos por hoja, archivo o tabla copiada)
+    detalle = models.JSONField(null=True, blank=True)
 
     def duracion_segundos(self):
         if self.fin and self.inicio:
             return (self.fin - self.inicio).total_seconds()
-        return None
\ No newline at end of file
+        return None
+
+
+class TrabajoCola(models.Model):
+    """
+    Trabajo de la cola local en segundo plano (ver archivos/jobs.py).
+    Lo ejecuta el comando procesar_cola; el avance se consulta en
+    api/trabajos/<id>/progreso/.
+    """
+    TIPOS = [
+        ('importar_sql', 'Importación de script SQL'),
+        ('script_seleccion', 'Script SQL del asistente de selección'),
+        ('ejecutar_proceso', 'Ejecución de proceso guardado'),
+    ]
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=40, choices=TIPOS)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', db_index=True)
+    parametros = models.JSONField(default=dict)
+    resultado = models.JSONField(null=True, blank=True)
+    mensaje = models.TextField(blank=True)
+
+    # Avance, actualizado por el worker mientras se ejecuta
+    sentencias_ejecutadas = models.IntegerField(default=0)
+    sentencias_total = models.IntegerField(null=True, blank=True)
+    filas_cargadas = models.BigIntegerField(default=0)
+
+    # Registros de negocio asociados
+    process_automation_id = models.IntegerField(null=True, blank=True)
+    run_log = models.ForeignKey(ProcessRunLog, on_delete=models.SET_NULL, null=True, blank=True, related_name='trabajos')
+
+    worker = models.CharField(max_length=120, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    finalizado = models.DateTimeField(null=True, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Trabajo en cola"
+        verbose_name_plural = "Trabajos en cola"
+        ordering = ['creado']
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_tipo_display()} ({self.estado})"
+
+    def duracion_segundos(self):
+        if not self.iniciado:
+            return None
+        return ((self.finalizado or timezone.now()) - self.iniciado).total_seconds()
@@ -3,12 +3,324 @@ Utilidad para convertir scripts SQL de MySQL a SQL Server
 
 Este módulo proporciona funciones para transformar sentencias SQL escritas para MySQL
 para que sean compatibles con SQL Server, facilitando la migración entre sistemas.
+
+La conversión trabaja sobre los tokens de archivos/sql_lexer.py: el script se
+recorre una sola vez y las reglas nunca modifican el contenido de cadenas ni
+comentarios. iter_convert_mysql_to_sqlserver entrega las sentencias a medida
+que se convierten, con memoria acotada a la sentencia en curso.
+
+Las tuplas de INSERT ... VALUES (casi todo el texto de un volcado) no se
+tokenizan valor por valor: el analizador las entrega enteras en tokens
+'tuplas' y aquí solo se convierten sus cadenas con expresiones regulares.
 """
 import re
 import logging
 
+from .sql_lexer import PATRON_CADENA, Token, es_significativo, iter_sentencias, separar_tuplas
+
 logger = logging.getLogger(__name__)
 
+_TIPOS_ENTEROS = {'INT', 'INTEGER', 'TINYINT', 'SMALLINT', 'MEDIUMINT', 'BIGINT'}
+_TIPOS_TEXTO = {'TEXT', 'TINYTEXT', 'MEDIUMTEXT', 'LONGTEXT'}
+_ESCAPES_MYSQL = {'0': '', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+_CADENAS_TUPLA = re.compile(PATRON_CADENA, re.S)
+# Escape \x o comilla duplicada dentro de un literal, según su comilla
+_ESCAPES_CADENA = {c: re.compile(r'\\(.)|' + c * 2, re.S) for c in '\'"'}
+
+
+def _resolver_escape(m):
+    siguiente = m.group(1)
+    if siguiente is None:
+        return m.group()[0]  # Comilla duplicada
+    if siguiente in '%_':
+        # \% y \_ conservan la barra (comodines escapados de LIKE)
+        return m.group()
+    return _ESCAPES_MYSQL.get(siguiente, siguiente)
+
+
+def _cadena_tsql(literal):
+    """Convierte un literal MySQL ('...' o "..." con escapes \\) a uno de T-SQL."""
+    comilla = literal[0]
+    cuerpo = literal[1:-1] if len(literal) > 1 and literal[-1] == comilla else literal[1:]
+    if comilla == "'" and '\\' not in cuerpo:
+        return literal
+    cuerpo = _ESCAPES_CADENA[comilla].sub(_resolver_escape, cuerpo)
+    return "'" + cuerpo.replace("'", "''") + "'"
+
+
+def _escape_tupla(m):
+    siguiente = m.group(1)
+    if siguiente is None or siguiente == "'":
+        return "''"
+    return _resolver_escape(m)
+
+
+def _tuplas_tsql(tuplas):
+    """Convierte las cadenas de tuplas de VALUES; el resto del texto no cambia."""
+    if '"' in tuplas:
+        return _CADENAS_TUPLA.sub(lambda m: _cadena_tsql(m.group()), tuplas)
+    if '\\' not in tuplas:
+        return tuplas
+    # Solo hay cadenas entre comillas simples y fuera de ellas no hay '\'
+    # (sql_lexer no lo admite en una tupla): basta resolver los escapes
+    return _ESCAPES_CADENA["'"].sub(_escape_tupla, tuplas)
+
+
+def _ident_tsql(ident):
+    """`nombre` -> [nombre]; los identificadores entre corchetes se dejan igual."""
+    if ident[0] != '`':
+        return ident
+    nombre = ident[1:-1].replace('``', '`')
+    return '[' + nombre.replace(']', ']]') + ']'
+
+
+def _siguiente(tokens, i):
+    """Índice del siguiente token significativo a partir de i (o len(tokens))."""
+    while i < len(tokens) and not es_significativo(tokens[i]):
+        i += 1
+    return i
+
+
+def _cierre_parentesis(tokens, i):
+    """Índice del ')' que cierra el '(' en tokens[i]."""
+    profundidad = 0
+    for j in range(i, len(tokens)):
+        t = tokens[j]
+        if t.tipo == 'simbolo':
+            if t.valor == '(':
+                profundidad += 1
+            elif t.valor == ')':
+                profundidad -= 1
+                if profundidad == 0:
+                    return j
+    return len(tokens) - 1
+
+
+def _convertir_ddl(tokens, crear_tabla):
+    """Tipos, AUTO_INCREMENT, claves y opciones de tabla en CREATE/ALTER TABLE."""
+    salida = []
+    i = 0
+    fin_columnas = None
+    if crear_tabla:
+        for j, t in enumerate(tokens):
+            if t.tipo == 'simbolo' and t.valor == '(':
+                fin_columnas = _cierre_parentesis(tokens, j)
+                break
+
+    while i < len(tokens):
+        t = tokens[i]
+        if fin_columnas is not None and i > fin_columnas:
+            # Opciones de tabla de MySQL (ENGINE, CHARSET, COLLATE, AUTO_INCREMENT=n, ...)
+            break
+        if t.tipo != 'palabra':
+            salida.append(t)
+            i += 1
+            continue
+
+        palabra = t.valor.upper()
+        j = _siguiente(tokens, i + 1)
+        siguiente = tokens[j] if j < len(tokens) else None
+        sig_palabra = siguiente.valor.upper() if siguiente and siguiente.tipo == 'palabra' else None
+
+        if palabra in _TIPOS_ENTEROS:
+            valor = 'INT' if palabra == 'MEDIUMINT' else t.valor
+            if palabra == 'MEDIUMINT' and t.valor.islower():
+                valor = 'int'
+            salida.append(Token('palabra', valor))
+            if siguiente and siguiente.tipo == 'simbolo' and siguiente.valor == '(':
+                i = _cierre_parentesis(tokens, j) + 1
+            else:
+                i += 1
+            continue
+
+        if palabra == 'VARCHAR':
+            salida.append(Token('palabra', 'NVARCHAR' if t.valor.isupper() else 'nvarchar'))
+            i += 1
+            continue
+
+        if palabra in _TIPOS_TEXTO:
+            salida.append(Token('palabra', 'NVARCHAR(MAX)' if t.valor.isupper() else 'nvarchar(max)'))
+            i += 1
+            continue
+
+        if palabra in ('UNSIGNED', 'ZEROFILL'):
+            i += 1
+            continue
+
+        if palabra == 'AUTO_INCREMENT':
+            if siguiente and siguiente.valor == '=':
+                # Opción de tabla AUTO_INCREMENT=n (ALTER TABLE): no aplica
+                while salida and not es_significativo(salida[-1]):
+                    salida.pop()
+                if salida and salida[-1].valor == ',':
+                    salida.pop()
+                i = _siguiente(tokens, j + 1) + 1
+                continue
+            salida.append(Token('palabra', 'IDENTITY(1,1)'))
+            i += 1
+            continue
+
+        if palabra in ('CHARACTER', 'CHARSET', 'COLLATE'):
+            # CHARACTER SET x / CHARSET x / COLLATE x a nivel de columna
+            k = j
+            if palabra == 'CHARACTER' and sig_palabra == 'SET':
+                k = _siguiente(tokens, j + 1)
+            if k < len(tokens) and tokens[k].valor == '=':
+                k = _siguiente(tokens, k + 1)
+            i = k + 1
+            continue
+
+        if palabra == 'COMMENT' and siguiente and siguiente.tipo == 'cadena':
+            i = j + 1
+            continue
+
+        if palabra == 'USING' and sig_palabra in ('BTREE', 'HASH'):
+            i = j + 1
+            continue
+
+        if palabra == 'UNIQUE' and sig_palabra in ('KEY', 'INDEX'):
+            # UNIQUE KEY nombre (cols) -> CONSTRAINT nombre UNIQUE (cols)
+            k = _siguiente(tokens, j + 1)
+            if k < len(tokens) and tokens[k].tipo in ('ident', 'palabra'):
+                salida.extend([Token('palabra', 'CONSTRAINT'), Token('espacio', ' '),
+                               Token('ident', _ident_tsql(tokens[k].valor)), Token('espacio', ' '),
+                               Token('palabra', 'UNIQUE')])
+                i = k + 1
+            else:
+                salida.append(Token('palabra', 'UNIQUE'))
+                i = j + 1
+            continue
+
+        if palabra == 'KEY' and crear_tabla and _ultima_palabra(salida) not in ('PRIMARY', 'FOREIGN'):
+            salida.append(Token('palabra', 'INDEX'))
+            i += 1
+            continue
+
+        salida.append(t)
+        i += 1
+    return salida
+
+
+def _ultima_palabra(tokens):
+    for t in reversed(tokens):
+        if es_significativo(t):
+            return t.valor.upper() if t.tipo == 'palabra' else None
+    return None
+
+
+def _texto(tokens):
+    """Texto de una sentencia; las cadenas de las tuplas se convierten aquí."""
+    return ''.join(_tuplas_tsql(t.valor) if t.tipo == 'tuplas' else t.valor for t in tokens).strip()
+
+
+def _dividir_insert(tokens):
+    """
+    INSERT ... VALUES (...),(...) -> una lista de sentencias de una fila.
+    Devuelve [texto] si no es un INSERT multifila simple.
+    """
+    inicio_valores = None
+    for i, t in enumerate(tokens):
+        if t.tipo == 'palabra' and t.valor.upper() == 'VALUES':
+            inicio_valores = i + 1
+            break
+    if inicio_valores is None:
+        return [_texto(tokens)]
+
+    filas = []
+    i = _siguiente(tokens, inicio_valores)
+    while i < len(tokens):
+        if tokens[i].tipo == 'tuplas':
+            fin = i
+            filas.extend(_tuplas_tsql(t) for t in separar_tuplas(tokens[i].valor))
+        elif tokens[i].valor == '(':
+            fin = _cierre_parentesis(tokens, i)
+            filas.append(_texto(tokens[i:fin + 1]))
+        else:
+            return [_texto(tokens)]  # ON DUPLICATE KEY UPDATE, SELECT, etc.: no se divide
+        i = _siguiente(tokens, fin + 1)
+        if i < len(tokens):
+            if tokens[i].valor != ',':
+                return [_texto(tokens)]
+            i = _siguiente(tokens, i + 1)
+    if len(filas) <= 1:
+        return [_texto(tokens)]
+    # El encabezado (INSERT INTO ... VALUES) se arma una sola vez
+    prefijo = _texto(tokens[:inicio_valores]) + ' '
+    return [prefijo + fila for fila in filas]
+
+
+def _convertir_sentencia(tokens):
+    """
+    Aplica las transformaciones a una sentencia tokenizada.
+
+    Retorna:
+    - Lista de sentencias T-SQL (strings); vacía si la sentencia se descarta
+    """
+    # Quitar espacios y comentarios iniciales
+    inicio = _siguiente(tokens, 0)
+    tokens = tokens[inicio:]
+    while tokens and not es_significativo(tokens[-1]):
+        tokens.pop()
+    if not tokens:
+        return []
+
+    palabras = [t.valor.upper() for t in tokens if t.tipo == 'palabra'][:4]
+    primera = palabras[0] if palabras else ''
+    segunda = palabras[1] if len(palabras) > 1 else ''
+
+    # Configuraciones específicas de MySQL
+    if primera == 'SET' and segunda == 'SQL_MODE':
+        return ['-- SQL_MODE no es compatible con SQL Server']
+    if primera == 'SET' and segunda == 'TIME_ZONE':
+        return ['-- time_zone se maneja diferente en SQL Server']
+    if (primera, segunda) in (('LOCK', 'TABLES'), ('UNLOCK', 'TABLES')):
+        return []
+
+    # Transformaciones a nivel de token (cadenas, identificadores, comentarios #)
+    convertidos = []
+    for t in tokens:
+        if t.tipo == 'ident':
+            t = Token('ident', _ident_tsql(t.valor))
+        elif t.tipo == 'cadena':
+            t = Token('cadena', _cadena_tsql(t.valor))
+        elif t.tipo == 'comentario' and t.valor.startswith('#'):
+            t = Token('comentario', '--' + t.valor[1:])
+        convertidos.append(t)
+    tokens = convertidos
+
+    if primera == 'START' and segunda == 'TRANSACTION':
+        return ['BEGIN TRANSACTION;']
+
+    es_rutina = primera == 'CREATE' and any(p in ('PROCEDURE', 'FUNCTION', 'TRIGGER') for p in palabras)
+    if es_rutina:
+        # SQL Server no admite ';' dentro de CREATE PROCEDURE/FUNCTION
+        tokens = [t for t in tokens if not (t.tipo == 'simbolo' and t.valor == ';')]
+    elif primera == 'CREATE' and 'TABLE' in palabras[1:3]:
+        tokens = _convertir_ddl(tokens, crear_tabla=True)
+    elif primera == 'ALTER' and segunda == 'TABLE':
+        tokens = _convertir_ddl(tokens, crear_tabla=False)
+
+    if primera in ('INSERT', 'REPLACE'):
+        sentencias = _dividir_insert(tokens)
+    else:
+        sentencias = [_texto(tokens)]
+    return [texto + ';' for texto in sentencias if texto]
+
+
+def iter_convert_mysql_to_sqlserver(fuente):
+    """
+    Convierte un script de MySQL a SQL Server sentencia por sentencia.
+
+    Parámetros:
+    - fuente: String, archivo de texto abierto o iterable de fragmentos
+
+    Retorna:
+    - Iterador de sentencias T-SQL (cada una terminada en ';')
+    """
+    for tokens in iter_sentencias(fuente, tuplas=True):
+        yield from _convertir_sentencia(tokens)
+
+
 def convert_mysql_to_sqlserver(mysql_script):
     """
     Convierte un script SQL de MySQL a SQL Server.
@@ -19,215 +331,337 @@ def convert_mysql_to_sqlserver(mysql_script):
     Retorna:
     - String con el script convertido para SQL Server
     """
-    script = mysql_script
-    
-    # Eliminar/comentar configuraciones específicas de MySQL
-    script = re.sub(r'SET\s+SQL_MODE\s*=.*?;', '-- SQL_MODE no es compatible con SQL Server\n', script)
-    script = re.sub(r'SET\s+time_zone\s*=.*?;', '-- time_zone se maneja diferente en SQL Server\n', script)
-    
-    # Transformar START TRANSACTION a BEGIN TRANSACTION
-    script = re.sub(r'START\s+TRANSACTION', 'BEGIN TRANSACTION', script)
-    
-    # Reemplazar backticks (`) por corchetes ([])
-    script = re.sub(r'`([^`]+)`', r'[\1]', script)
-    
-    # Eliminar ENGINE, CHARSET y COLLATE en CREATE TABLE
-    script = re.sub(r'ENGINE\s*=\s*\w+', '', script)
-    script = re.sub(r'DEFAULT\s+CHARSET\s*=\s*\w+', '', script)
-    script = re.sub(r'COLLATE\s*=\s*[\w_]+', '', script)
-    
-    # Arreglar tipos de datos
-    script = re.sub(r'int\(\d+\)', 'int', script)
-    script = re.sub(r'varchar\((\d+)\)', r'nvarchar(\1)', script)
-    script = re.sub(r'text', 'nvarchar(max)', script)
-    
-    # AUTO_INCREMENT a IDENTITY
-    script = re.sub(r'AUTO_INCREMENT', 'IDENTITY(1,1)', script)
-    
-    # Arreglar UNIQUE KEY y PRIMARY KEY en CREATE TABLE
-    def fix_keys(match):
-        key_def = match.group(1)
-        if 'PRIMARY KEY' in key_def:
-            return key_def  # Mantener PRIMARY KEY como está
-        return key_def.replace('KEY', 'INDEX')
-    
-    script = re.sub(r'((?:UNIQUE|PRIMARY)\s+KEY\s+[^,\)]+)', fix_keys, script)
-    
-    # Arreglar sintaxis de INSERT INTO con varios valores
-    def fix_insert(match):
-        into_part = match.group(1)
-        values_part = match.group(2)
-        values_list = values_part.split('),(')
-        
-        if len(values_list) <= 1:
-            return f"{into_part} VALUES ({values_part})"
-        
-        result = []
-        for i, values in enumerate(values_list):
-            # Limpiar los paréntesis extras del primer y último elemento
-            if i == 0:
-                values = values.rstrip(')')
-            elif i == len(values_list) - 1:
-                values = values.lstrip('(')
-            else:
-                values = values
-                
-            if i == 0:
-                result.append(f"{into_part} VALUES ({values})")
+    return '\n\n'.join(iter_convert_mysql_to_sqlserver(mysql_script))
+
+
+# Ejecución por lotes (execute_sqlserver_script con modo='lotes')
+_INSERT_SIMPLE = re.compile(
+    r'^INSERT\s+INTO\s+((?:\[[^\]]+\]\.)?\[[^\]]+\])\s*(\([^)]*\))?\s*VALUES\s*\((.*)\)\s*;?\s*$',
+    re.IGNORECASE | re.DOTALL
+)
+_DML = re.compile(r'^\s*(INSERT|UPDATE|DELETE|MERGE)\b', re.IGNORECASE)
+_ENTERO = re.compile(r'^[+-]?\d+$')
+_DECIMAL = re.compile(r'^[+-]?(?:\d+\.\d*|\.\d+)$')
+_FLOTANTE = re.compile(r'^[+-]?(?:\d+\.?\d*|\.\d+)[eE][+-]?\d+$')
+
+
+def _valores_literales(valores):
+    """
+    Convierte el contenido de VALUES (...) de una sola fila en una lista de
+    valores Python. Devuelve None si alguno no es un literal simple
+    (funciones, expresiones, varias filas, etc.).
+    """
+    from decimal import Decimal
+
+    resultado = []
+    i, n = 0, len(valores)
+    while True:
+        while i < n and valores[i].isspace():
+            i += 1
+        if i < n and valores[i] in 'Nn' and i + 1 < n and valores[i + 1] == "'":
+            i += 1
+        if i < n and valores[i] == "'":
+            partes = []
+            i += 1
+            while True:
+                fin = valores.find("'", i)
+                if fin == -1:
+                    return None
+                partes.append(valores[i:fin])
+                if fin + 1 < n and valores[fin + 1] == "'":
+                    partes.append("'")
+                    i = fin + 2
+                    continue
+                i = fin + 1
+                break
+            resultado.append(''.join(partes))
+        else:
+            fin = valores.find(',', i)
+            fin = n if fin == -1 else fin
+            token = valores[i:fin].strip()
+            if token.upper() == 'NULL':
+                resultado.append(None)
+            elif _ENTERO.match(token):
+                resultado.append(int(token))
+            elif _DECIMAL.match(token):
+                resultado.append(Decimal(token))
+            elif _FLOTANTE.match(token):
+                resultado.append(float(token))
             else:
-                columns = re.search(r'INSERT\s+INTO\s+\[\w+\]\s*\(([^\)]+)\)', into_part)
-                if columns:
-                    result.append(f"INSERT INTO {into_part.split('(')[0]}({columns.group(1)}) VALUES ({values})")
-                else:
-                    result.append(f"{into_part} VALUES ({values})")
-        
-        return ";\n".join(result)
-    
-    script = re.sub(r'(INSERT\s+INTO\s+\[\w+\](?:\s*\([^\)]+\))?\s*VALUES\s*)\(([^\;]+)\)', fix_insert, script)
-    
-    # Eliminar ; dentro de CREATE PROCEDURE o FUNCTION (SQL Server no lo permite)
-    def fix_stored_procedure(match):
-        proc_content = match.group(2)
-        proc_content = proc_content.replace(';', '')
-        return f"{match.group(1)}\n{proc_content}\nEND"
-    
-    script = re.sub(r'(CREATE\s+(?:PROCEDURE|FUNCTION)\s+[\w\.\[\]]+\s*\([^\)]*\)\s*.*?BEGIN)(.*?)(END)', 
-                   fix_stored_procedure, script, flags=re.DOTALL)
-    
-    # Eliminar DELIMITER (SQL Server no usa este concepto)
-    script = re.sub(r'DELIMITER\s+.*?;', '', script)
-    
-    # Limpiar cierres de procedimientos múltiples
-    script = script.replace('END$$', 'END')
-    script = script.replace('END ;', 'END;')
-    
-    # Dividir el script en sentencias individuales
-    statements = []
-    lines = script.split('\n')
-    current_statement = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith('--'):  # Línea vacía o comentario
-            if current_statement:
-                current_statement.append(line)
+                return None
+            i = fin
+        while i < n and valores[i].isspace():
+            i += 1
+        if i >= n:
+            return resultado
+        if valores[i] != ',':
+            return None
+        i += 1
+
+
+def _clasificar(stmt):
+    """
+    Devuelve (tipo, clave, parametros):
+    - ('insert', (tabla, columnas, n), valores) para INSERT de una fila con literales
+    - ('dml', None, None) para otras sentencias DML que pueden agruparse
+    - ('otra', None, None) para DDL, control de transacciones, procedimientos, etc.
+    """
+    match = _INSERT_SIMPLE.match(stmt.strip())
+    if match:
+        valores = _valores_literales(match.group(3))
+        if valores is not None:
+            return 'insert', (match.group(1), match.group(2) or '', len(valores)), valores
+    if _DML.match(stmt):
+        return 'dml', None, None
+    return 'otra', None, None
+
+
+def _armar_unidades(statements, max_bytes, max_sentencias):
+    """
+    Agrupa sentencias consecutivas compatibles.
+
+    Retorna:
+    - Iterador de unidades; cada unidad es una lista de tuplas
+      (indice, sentencia, tipo, clave, parametros) del mismo tipo (y misma
+      clave si son INSERT plegables)
+    """
+    actual = []
+    bytes_actual = 0
+    for i, stmt in enumerate(statements):
+        stmt = stmt.strip()
+        if not stmt:
             continue
-        
-        current_statement.append(line)
-        if line.endswith(';'):
-            statements.append('\n'.join(current_statement))
-            current_statement = []
-    
-    # Agregar la última declaración si existe
-    if current_statement:
-        statements.append('\n'.join(current_statement))
-    
-    # Volver a unir las sentencias
-    clean_script = '\n\n'.join(statements)
-    
-    return clean_script
+        tipo, clave, params = _clasificar(stmt)
+        entrada = (i, stmt, tipo, clave, params)
+        compatible = (
+            actual
+            and tipo != 'otra'
+            and actual[0][2] == tipo
+            and actual[0][3] == clave
+            and len(actual) < max_sentencias
+            and bytes_actual + len(stmt) <= max_bytes
+        )
+        if compatible:
+            actual.append(entrada)
+            bytes_actual += len(stmt)
+        else:
+            if actual:
+                yield actual
+            actual = [entrada]
+            bytes_actual = len(stmt)
+    if actual:
+        yield actual
+
+
+def _ejecutar_unidad(conn, unidad):
+    """Ejecuta una unidad en un solo viaje a la base de datos y devuelve filas afectadas."""
+    from sqlalchemy import text
+
+    if len(unidad) == 1:
+        # Sentencia individual: se ejecuta tal cual, como en modo 'individual'
+        result = conn.execute(text(unidad[0][1]))
+        return max(result.rowcount, 0)
+
+    if unidad[0][2] == 'insert':
+        # INSERT de una fila con literales: un solo INSERT parametrizado con executemany
+        tabla, columnas, n = unidad[0][3]
+        marcadores = ', '.join(f':p{k}' for k in range(n))
+        sql = f"INSERT INTO {tabla} {columnas} VALUES ({marcadores})"
+        conn.execute(text(sql), [{f'p{k}': v for k, v in enumerate(e[4])} for e in unidad])
+        return len(unidad)
+
+    # DML heterogéneo: un único batch de T-SQL. Con pyodbc el error de la
+    # segunda sentencia en adelante solo aparece al avanzar con nextset(), así
+    # que el batch se recorre completo antes de darlo por ejecutado. Con
+    # NOCOUNT ON los conteos parciales no generan resultados; las filas
+    # afectadas se acumulan en @filas y se leen en el último resultado.
+    partes = ['SET NOCOUNT ON;', 'DECLARE @filas BIGINT = 0;']
+    for e in unidad:
+        partes.append(e[1].rstrip().rstrip(';') + ';')
+        partes.append('SET @filas += @@ROWCOUNT;')
+    partes.append('SELECT @filas;')
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute('\n'.join(partes))
+        filas = 0
+        while True:
+            if cursor.description:
+                resultado = cursor.fetchall()
+                if resultado:
+                    filas = resultado[-1][0]
+            if not cursor.nextset():
+                break
+    finally:
+        cursor.close()
+    return max(int(filas or 0), 0)
+
+
+def _ejecutar_con_biseccion(conn, unidad, results, registrar_error):
+    """
+    Ejecuta la unidad dentro de un savepoint. Si falla, la parte en dos y
+    reintenta cada mitad hasta aislar las sentencias con error, que se
+    registran con su índice original.
+    """
+    if len(unidad) == 1:
+        i, stmt = unidad[0][0], unidad[0][1]
+        try:
+            results['rows_affected'] += _ejecutar_unidad(conn, unidad)
+            results['success'] += 1
+            _registrar_creacion(stmt, results)
+        except Exception as e:
+            registrar_error(i, stmt, e)
+        return
+
+    savepoint = conn.begin_nested()
+    try:
+        filas = _ejecutar_unidad(conn, unidad)
+    except Exception as e:
+        savepoint.rollback()
+        logger.debug(f"Lote de {len(unidad)} sentencias falló, dividiendo: {e}")
+        mitad = len(unidad) // 2
+        _ejecutar_con_biseccion(conn, unidad[:mitad], results, registrar_error)
+        _ejecutar_con_biseccion(conn, unidad[mitad:], results, registrar_error)
+        return
+    savepoint.commit()
+    results['rows_affected'] += filas
+    results['success'] += len(unidad)
+
+
+def _registrar_creacion(stmt, results):
+    table_match = re.search(r'CREATE\s+TABLE\s+\[([^\]]+)\]', stmt, re.IGNORECASE)
+    if table_match:
+        results['tables_created'].append(table_match.group(1))
+
 
-def execute_sqlserver_script(engine, script):
+def execute_sqlserver_script(engine, script, modo=None, max_bytes=None, max_sentencias=None, progreso=None):
     """
     Ejecuta un script SQL en SQL Server, dividiendo las sentencias y manejando errores.
     
     Parámetros:
     - engine: Objeto engine de SQLAlchemy
-    - script: String con el script SQL
+    - script: String con el script SQL, o iterable de sentencias ya separadas
+      (p.e. iter_convert_mysql_to_sqlserver) que se ejecutan a medida que llegan
+    - modo: 'individual' (un viaje por sentencia) o 'lotes' (agrupa sentencias
+      DML consecutivas y pliega los INSERT de una fila en executemany).
+      Por defecto settings.SQL_EJECUCION_MODO
+    - max_bytes: Tamaño máximo de un lote en modo 'lotes' (SQL_LOTE_MAX_BYTES)
+    - max_sentencias: Sentencias máximas por lote en modo 'lotes' (SQL_LOTE_MAX_SENTENCIAS)
+    - progreso: Función opcional progreso(sentencias_leidas, filas_afectadas) llamada
+      tras cada lote o sentencia
     
     Retorna:
     - Diccionario con resultados de la ejecución
     """
+    from django.conf import settings
     from sqlalchemy import text
     from .sql_error_utils import get_sql_error_details
     
-    # Dividir el script en sentencias individuales
-    statements = []
-    current_statement = []
+    modo = modo or getattr(settings, 'SQL_EJECUCION_MODO', 'lotes')
+    max_bytes = max_bytes or getattr(settings, 'SQL_LOTE_MAX_BYTES', 256 * 1024)
+    max_sentencias = max_sentencias or getattr(settings, 'SQL_LOTE_MAX_SENTENCIAS', 1000)
     
-    for line in script.split('\n'):
-        line_stripped = line.strip()
+    if isinstance(script, str):
+        # Dividir el script en sentencias individuales
+        statements = []
+        current_statement = []
         
-        # Ignorar líneas vacías y comentarios como sentencias independientes
-        if not line_stripped or line_stripped.startswith('--'):
-            continue
-        
-        current_statement.append(line)
+        for line in script.split('\n'):
+            line_stripped = line.strip()
+            
+            # Ignorar líneas vacías y comentarios como sentencias independientes
+            if not line_stripped or line_stripped.startswith('--'):
+                continue
+            
+            current_statement.append(line)
+            
+            if line_stripped.endswith(';'):
+                statements.append('\n'.join(current_statement))
+                current_statement = []
         
-        if line_stripped.endswith(';'):
+        # Agregar última sentencia si existe
+        if current_statement:
             statements.append('\n'.join(current_statement))
-            current_statement = []
-    
-    # Agregar última sentencia si existe
-    if current_statement:
-        statements.append('\n'.join(current_statement))
+    else:
+        statements = script
     
     # Ejecutar cada sentencia
     results = {
-        'total': len(statements),
+        'total': 0,
         'success': 0,
         'errors': [],
         'tables_created': [],
-        'warnings': []
+        'warnings': [],
+        'rows_affected': 0,
+        'modo': modo
     }
     
+    def registrar_error(i, stmt, e):
+        # Analizar el error para dar información más detallada
+        error_message = str(e)
+        error_details = get_sql_error_details(error_message)
+        
+        error_info = {
+            'statement': stmt[:100] + '...' if len(stmt) > 100 else stmt,
+            'error': error_message,
+            'index': i,
+            'tipo': error_details['tipo'],
+            'sugerencia': error_details['sugerencia']
+        }
+        results['errors'].append(error_info)
+        
+        logger.error(f"Error ejecutando sentencia SQL #{i}: {error_message}")
+        logger.debug(f"Sentencia con error: {stmt}")
+        
+        # Agregar advertencias relevantes basadas en el tipo de error
+        if error_details['tipo'] == 'syntax_error':
+            results['warnings'].append(
+                "Se detectaron errores de sintaxis. Revise si hay construcciones específicas de MySQL no soportadas en SQL Server."
+            )
+        elif error_details['tipo'] == 'conversion_tipos':
+            results['warnings'].append(
+                "Error de conversión de tipos. SQL Server maneja tipos de datos de forma más estricta que MySQL."
+            )
+    
+    def contar(sentencias):
+        # El total se conoce al terminar de recorrer el iterador
+        for stmt in sentencias:
+            results['total'] += 1
+            yield stmt
+    
+    statements = contar(statements)
+    
     with engine.begin() as conn:
-        for i, stmt in enumerate(statements):
-            stmt = stmt.strip()
-            if not stmt:
-                continue
-                
-            try:
-                # Detectar tipo de sentencia para procesamiento especializado
-                stmt_type = 'unknown'
-                affected_object = None
-                
-                # Detectar CREATE TABLE
-                table_match = re.search(r'CREATE\s+TABLE\s+\[([^\]]+)\]', stmt, re.IGNORECASE)
-                if table_match:
-                    stmt_type = 'create_table'
-                    affected_object = table_match.group(1)
-                
-                # Detectar INSERT INTO
-                insert_match = re.search(r'INSERT\s+INTO\s+\[([^\]]+)\]', stmt, re.IGNORECASE)
-                if insert_match:
-                    stmt_type = 'insert'
-                    affected_object = insert_match.group(1)
-                
-                # Ejecutar la sentencia
-                conn.execute(text(stmt))
-                results['success'] += 1
-                
-                # Registrar tablas creadas
-                if stmt_type == 'create_table':
-                    results['tables_created'].append(affected_object)
-                
-            except Exception as e:
-                # Analizar el error para dar información más detallada
-                error_message = str(e)
-                error_details = get_sql_error_details(error_message)
-                
-                error_info = {
-                    'statement': stmt[:100] + '...' if len(stmt) > 100 else stmt,
-                    'error': error_message,
-                    'index': i,
-                    'tipo': error_details['tipo'],
-                    'sugerencia': error_details['sugerencia']
-                }
-                results['errors'].append(error_info)
-                
-                logger.error(f"Error ejecutando sentencia SQL #{i}: {error_message}")
-                logger.debug(f"Sentencia con error: {stmt}")
+        if modo == 'lotes':
+            # SQLite no admite varias sentencias por llamada: solo se pliegan los INSERT
+            unidades = _armar_unidades(statements, max_bytes, max_sentencias)
+            if conn.dialect.name == 'sqlite':
+                unidades = (u for unidad in unidades for u in (
+                    [unidad] if unidad[0][2] == 'insert' else [[e] for e in unidad]
+                ))
+            for unidad in unidades:
+                _ejecutar_con_biseccion(conn, unidad, results, registrar_error)
+                if progreso:
+                    progreso(results['total'], results['rows_affected'])
+        else:
+            for i, stmt in enumerate(statements):
+                stmt = stmt.strip()
+                if not stmt:
+                    continue
+                    
+                try:
+                    # Ejecutar la sentencia
+                    result = conn.execute(text(stmt))
+                    results['success'] += 1
+                    results['rows_affected'] += max(result.rowcount, 0)
+                    
+                    # Registrar tablas creadas
+                    _registrar_creacion(stmt, results)
+                    
+                except Exception as e:
+                    registrar_error(i, stmt, e)
                 
-                # Agregar advertencias relevantes basadas en el tipo de error
-                if error_details['tipo'] == 'syntax_error':
-                    results['warnings'].append(
-                        "Se detectaron errores de sintaxis. Revise si hay construcciones específicas de MySQL no soportadas en SQL Server."
-                    )
-                elif error_details['tipo'] == 'conversion_tipos':
-                    results['warnings'].append(
-                        "Error de conversión de tipos. SQL Server maneja tipos de datos de forma más estricta que MySQL."
-                    )
+                if progreso:
+                    progreso(results['total'], results['rows_affected'])
     
     # Eliminar advertencias duplicadas
     if 'warnings' in results:
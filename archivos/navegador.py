@@ -0,0 +1,256 @@
+"""
+Navegación paginada de tablas cargadas
+
+preview_tabla solo muestra las primeras 25 filas. pagina_tabla recorre una
+tabla completa página a página con latencia constante:
+  - Paginación por clave (keyset): si la tabla tiene clave primaria y las
+    columnas de orden no admiten NULL, cada página se pide con
+    WHERE (clave) > (última clave vista) ORDER BY clave y el servidor usa el
+    índice para saltar directo; la página 10.000 cuesta lo mismo que la 1.
+  - En otro caso se usa OFFSET/FETCH (LIMIT/OFFSET fuera de SQL Server),
+    cuyo costo crece con el desplazamiento.
+Las columnas (proyección), los filtros y el orden se aplican en el servidor.
+Los nombres de tabla y columna se buscan sin distinguir mayúsculas entre los
+reflejados de la base (se admiten nombres no ASCII como 'año'); cualquier otro
+se rechaza.
+
+El resultado es compacto y por columnas: nombres y tipos una sola vez y una
+lista de valores por columna. El cursor 'siguiente' es opaco para el cliente
+y solo vale para la misma combinación de columnas de orden.
+"""
+import base64
+import datetime
+import decimal
+import json
+import time
+
+from django.conf import settings
+from sqlalchemy import and_, column, func, literal_column, or_, select, table
+
+from . import metadatos
+
+FILAS_PAGINA = getattr(settings, 'NAVEGADOR_FILAS_PAGINA', 100)
+MAX_FILAS_PAGINA = getattr(settings, 'NAVEGADOR_MAX_FILAS_PAGINA', 1000)
+
+# Operadores de filtro admitidos: nombre -> función(columna, valor)
+OPERADORES = {
+    'eq': lambda c, v: c == v,
+    'ne': lambda c, v: c != v,
+    'lt': lambda c, v: c < v,
+    'le': lambda c, v: c <= v,
+    'gt': lambda c, v: c > v,
+    'ge': lambda c, v: c >= v,
+    'contiene': lambda c, v: c.contains(v, autoescape=True),
+    'empieza': lambda c, v: c.startswith(v, autoescape=True),
+    'en': lambda c, v: c.in_(v.split(',')),
+    'nulo': lambda c, v: c.is_(None),
+    'no_nulo': lambda c, v: c.is_not(None),
+}
+
+
+def parsear_filtro(expresion):
+    """
+    Convierte 'columna:operador:valor' en una tupla (columna, operador, valor).
+
+    El valor puede contener ':'; en 'nulo' y 'no_nulo' se omite.
+    """
+    partes = expresion.split(':', 2)
+    if len(partes) < 2:
+        raise ValueError(f"Filtro inválido: {expresion} (formato columna:operador:valor)")
+    return partes[0], partes[1], partes[2] if len(partes) > 2 else ''
+
+
+def parsear_orden(expresion):
+    """Convierte 'col1,-col2' en [('col1', False), ('col2', True)] (True = descendente)."""
+    orden = []
+    for parte in (expresion or '').split(','):
+        parte = parte.strip()
+        if parte:
+            orden.append((parte[1:], True) if parte.startswith('-') else (parte, False))
+    return orden
+
+
+def _codificar_cursor(datos):
+    crudo = json.dumps(datos, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def _decodificar_cursor(cursor):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+
+
+# Tipos que el cursor guarda con marca para volver a enlazarlos con su tipo
+_TIPOS_CURSOR = {
+    'dt': (datetime.datetime, datetime.datetime.fromisoformat),
+    'd': (datetime.date, datetime.date.fromisoformat),
+    't': (datetime.time, datetime.time.fromisoformat),
+    'n': (decimal.Decimal, decimal.Decimal),
+}
+
+
+def _a_cursor(valor):
+    for marca, (tipo, _) in _TIPOS_CURSOR.items():
+        if isinstance(valor, tipo):
+            return [marca, str(valor) if marca == 'n' else valor.isoformat()]
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return ['b', bytes(valor).hex()]
+    return valor
+
+
+def _desde_cursor(valor):
+    if isinstance(valor, list):
+        marca, texto = valor
+        if marca == 'b':
+            return bytes.fromhex(texto)
+        return _TIPOS_CURSOR[marca][1](texto)
+    return valor
+
+
+def _valor_json(valor):
+    """Valor serializable en JSON conservando la precisión de fechas y decimales."""
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return bytes(valor).hex()
+    return str(valor)
+
+
+def _resolver(nombre, por_minuscula):
+    """Nombre real de una columna de la tabla (sin distinguir mayúsculas); las demás se rechazan."""
+    real = por_minuscula.get(str(nombre).strip().lower())
+    if real is None:
+        raise ValueError(f"Columna desconocida: {nombre}")
+    return real
+
+
+def _predicado_keyset(claves, valores):
+    """(k1, k2, ...) posterior a (v1, v2, ...) respetando la dirección de cada columna."""
+    alternativas = []
+    for i, (col, descendente) in enumerate(claves):
+        iguales = [claves[j][0] == valores[j] for j in range(i)]
+        siguiente = col < valores[i] if descendente else col > valores[i]
+        alternativas.append(and_(*iguales, siguiente))
+    return or_(*alternativas)
+
+
+def pagina_tabla(engine, tabla, columnas=None, filtros=None, orden=None, cursor=None, tamanio=None,
+                 contar=False):
+    """
+    Una página de filas de una tabla, en formato por columnas.
+
+    Parámetros:
+    - engine: Engine de SQLAlchemy
+    - tabla: Nombre de la tabla
+    - columnas: Columnas a devolver (todas si es None)
+    - filtros: Lista de (columna, operador, valor); operadores en OPERADORES
+    - orden: Lista de (columna, descendente); por defecto la clave primaria
+    - cursor: Valor 'siguiente' de la página anterior (None para la primera)
+    - tamanio: Filas por página (máximo NAVEGADOR_MAX_FILAS_PAGINA)
+    - contar: Contar las filas que cumplen los filtros (sin filtros el total
+      sale de los metadatos y siempre se informa)
+
+    Retorna:
+    - Dict con 'tabla', 'columnas', 'tipos', 'valores' (una lista por columna),
+      'filas', 'siguiente' (cursor o None en la última página), 'plan'
+      ('keyset' u 'offset'), 'total' (o None) y 'ms'
+    """
+    inicio = time.perf_counter()
+    tabla = (tabla or '').strip()
+    estructura = metadatos.estructura_tabla(engine, tabla) if tabla else None
+    if estructura is None:
+        raise ValueError(f"La tabla [{tabla}] no existe en la base de datos.")
+    # Nombre real tal como está en la base; SQLAlchemy se encarga de citarlo
+    tabla = estructura['nombre']
+    tamanio = max(1, min(int(tamanio or FILAS_PAGINA), MAX_FILAS_PAGINA))
+
+    por_minuscula = {c['nombre'].lower(): c['nombre'] for c in estructura['columnas']}
+    # SQLite informa las columnas de la clave como nulables; en la práctica no admiten NULL
+    nulables = {c['nombre'] for c in estructura['columnas'] if c['nulable']} - set(estructura['clave'])
+    tipos = {c['nombre']: c['tipo'] for c in estructura['columnas']}
+    seleccion = [_resolver(c, por_minuscula) for c in columnas] if columnas else list(por_minuscula.values())
+    seleccion = list(dict.fromkeys(seleccion))
+
+    t = table(tabla, *[column(c) for c in por_minuscula.values()])
+
+    filtrado = []
+    for nombre, operador, valor in filtros or []:
+        if operador not in OPERADORES:
+            raise ValueError(f"Operador de filtro desconocido: {operador}")
+        filtrado.append(OPERADORES[operador](t.c[_resolver(nombre, por_minuscula)], valor))
+
+    # Orden pedido + clave primaria como desempate: el orden queda total y estable
+    orden = [(_resolver(c, por_minuscula), bool(d)) for c, d in orden or []]
+    vistas = {c for c, _ in orden}
+    desempate = [(c, orden[-1][1] if orden else False) for c in estructura['clave'] if c not in vistas]
+    claves = orden + desempate
+    keyset = bool(estructura['clave']) and not any(c in nulables for c, _ in claves)
+    nombres_orden = [c for c, _ in claves]
+
+    condiciones = list(filtrado)
+    desplazamiento = 0
+    if cursor:
+        datos = _decodificar_cursor(cursor)
+        if datos.get('orden') != nombres_orden:
+            raise ValueError("El cursor no corresponde al orden pedido; vuelva a la primera página")
+        if keyset and 'k' in datos:
+            valores_clave = [_desde_cursor(v) for v in datos['k']]
+            condiciones.append(_predicado_keyset([(t.c[c], d) for c, d in claves], valores_clave))
+        else:
+            desplazamiento = int(datos.get('o', 0))
+
+    # Las columnas de orden se leen aunque no se proyecten (hacen falta para el cursor)
+    leidas = seleccion + [c for c in nombres_orden if c not in seleccion] if keyset else seleccion
+    consulta = select(*[t.c[c] for c in leidas]).select_from(t)
+    if condiciones:
+        consulta = consulta.where(and_(*condiciones))
+    if claves:
+        consulta = consulta.order_by(*[t.c[c].desc() if d else t.c[c].asc() for c, d in claves])
+    elif engine.dialect.name == 'mssql':
+        # OFFSET/FETCH exige ORDER BY; sin clave ni orden el recorrido no es estable
+        consulta = consulta.order_by(literal_column('(SELECT NULL)'))
+    # Una fila extra indica si hay página siguiente
+    consulta = consulta.limit(tamanio + 1)
+    if desplazamiento:
+        consulta = consulta.offset(desplazamiento)
+
+    with engine.connect() as conn:
+        filas = conn.execute(consulta).fetchall()
+        total = None
+        if contar and filtrado:
+            total = conn.execute(select(func.count()).select_from(t).where(and_(*filtrado))).scalar()
+
+    hay_mas = len(filas) > tamanio
+    filas = filas[:tamanio]
+    siguiente = None
+    if hay_mas:
+        if keyset:
+            ultima = filas[-1]
+            posiciones = [leidas.index(c) for c in nombres_orden]
+            siguiente = _codificar_cursor({'orden': nombres_orden,
+                                           'k': [_a_cursor(ultima[i]) for i in posiciones]})
+        else:
+            siguiente = _codificar_cursor({'orden': nombres_orden, 'o': desplazamiento + tamanio})
+
+    if not filtrado:
+        total = metadatos.conteo_filas(engine, [tabla]).get(tabla)
+
+    valores = [[_valor_json(f[i]) for f in filas] for i in range(len(seleccion))]
+    return {
+        'tabla': tabla,
+        'columnas': seleccion,
+        'tipos': [tipos[c] for c in seleccion],
+        'valores': valores,
+        'filas': len(filas),
+        'siguiente': siguiente,
+        'plan': 'keyset' if keyset else 'offset',
+        'total': total,
+        'ms': round((time.perf_counter() - inicio) * 1000, 1),
+    }
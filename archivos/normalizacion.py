@@ -0,0 +1,175 @@
+"""
+Normalización vectorizada de celdas
+
+Sustituye a la normalización celda a celda (`df[c].apply(_normalizar_celda)`)
+del asistente de carga: las reglas se aplican columna a columna con los
+accesores .str de pandas, sin una llamada a Python ni un re.match por celda.
+
+Reglas de la normalización básica (las mismas de siempre):
+  - Cadenas vacías o equivalentes a nulo ('n/a', 'na', 'none', 'null') -> None
+  - Si la cadena inicia con un número entero ('15 días', '20kg', '  7 items')
+    se reemplaza por ese entero
+  - Los valores que no son texto no se modifican
+Además, una columna cuyos valores quedan todos enteros (o nulos) se devuelve
+como Int64 (entero con nulos) en lugar de object/float; si alguno no cabe en
+64 bits la columna queda como object.
+
+Un juego de reglas es un dict; NORMALIZACION_REGLAS en settings agrega juegos
+o redefine los existentes, partiendo siempre de REGLAS_BASICAS:
+    NORMALIZACION_REGLAS = {'estricta': {'nulos': ['', '-', 'sin dato'], 'recortar': True}}
+"""
+import importlib.util
+import re
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+REGLAS_BASICAS = {
+    # Textos (sin espacios y en minúsculas) que se convierten en nulo
+    'nulos': ('', 'n/a', 'na', 'none', 'null'),
+    # Reemplazar el texto por el entero con el que comienza
+    'entero_inicial': True,
+    # Devolver el texto sin espacios al inicio y al final (si no, se deja el original)
+    'recortar': False,
+    # Convertir a Int64 las columnas que quedan solo con enteros
+    'tipar_enteros': True,
+}
+
+REGLAS = {
+    'basica': REGLAS_BASICAS,
+    'solo_nulos': {**REGLAS_BASICAS, 'entero_inicial': False, 'recortar': True},
+}
+for _nombre, _reglas in getattr(settings, 'NORMALIZACION_REGLAS', {}).items():
+    REGLAS[_nombre] = {**REGLAS_BASICAS, **_reglas}
+
+# Con pyarrow las operaciones .str se ejecutan en Arrow (C++) y no celda a
+# celda en Python; sin pyarrow se usa el tipo string de pandas con re
+_PYARROW = importlib.util.find_spec('pyarrow') is not None
+_TIPO_TEXTO = 'string[pyarrow]' if _PYARROW else 'string[python]'
+
+# En RE2 (pyarrow) '\d' solo reconoce dígitos ASCII; '\p{Nd}' equivale al '\d'
+# de re, que también acepta otros dígitos Unicode ('٣ x' -> 3)
+_PATRON_ENTERO = r'^(-?\p{Nd}+)' if _PYARROW else r'^(-?\d+)'
+
+
+def obtener_reglas(reglas=None):
+    """Resuelve un juego de reglas a partir de su nombre, un dict parcial o None (básica)."""
+    if reglas is None:
+        return REGLAS_BASICAS
+    if isinstance(reglas, str):
+        if reglas not in REGLAS:
+            raise ValueError(f"Juego de reglas de normalización desconocido: {reglas}")
+        return REGLAS[reglas]
+    return {**REGLAS_BASICAS, **reglas}
+
+
+def _a_enteros(digitos):
+    """Convierte una Serie de textos de dígitos a enteros de Python."""
+    try:
+        return digitos.astype('int64').tolist()
+    except (OverflowError, ValueError):
+        pass
+    # Enteros de más de 64 bits o dígitos no ASCII: int() sí los admite, pero
+    # solo se usa en esos valores (hasta 18 dígitos ASCII siempre caben en int64)
+    rapidos = digitos.str.match(r'^-?[0-9]{1,18}$').to_numpy(dtype=bool)
+    enteros = np.empty(len(digitos), dtype=object)
+    enteros[rapidos] = digitos[rapidos].astype('int64').tolist()
+    enteros[~rapidos] = [int(d) for d in digitos[~rapidos].to_numpy(dtype=object)]
+    return enteros
+
+
+def _tipar_enteros(serie):
+    """Serie como Int64, o sin cambios si algún entero no cabe en 64 bits."""
+    try:
+        return serie.astype('Int64')
+    except OverflowError:
+        return serie
+
+
+def normalizar_serie(serie, reglas=None):
+    """
+    Normaliza una columna aplicando las reglas sobre toda la Serie a la vez.
+
+    Parámetros:
+    - serie: Serie de pandas (las columnas no textuales se devuelven sin cambios)
+    - reglas: Nombre del juego de reglas, dict con reglas a modificar o None
+
+    Retorna:
+    - Serie normalizada (Int64 si todos sus valores quedaron enteros de 64 bits)
+    """
+    reglas = obtener_reglas(reglas)
+    tipo = pd.api.types.infer_dtype(serie, skipna=True)
+    if tipo not in ('string', 'mixed', 'mixed-integer'):
+        # Sin textos que normalizar
+        if reglas['tipar_enteros'] and tipo == 'integer' and serie.dtype == object:
+            return _tipar_enteros(serie)
+        return serie
+
+    # Se trabaja por posición sobre un arreglo object con los valores originales
+    valores = serie.to_numpy(dtype=object, copy=True)
+    if tipo == 'string':
+        es_texto = pd.notna(valores)
+    else:
+        es_texto = np.fromiter((isinstance(v, str) for v in valores), dtype=bool, count=len(valores))
+    posiciones_texto = np.flatnonzero(es_texto)
+    texto = pd.Series(valores[es_texto], index=posiciones_texto, dtype=_TIPO_TEXTO).str.strip()
+
+    nulos = [str(n).strip().lower() for n in reglas['nulos']]
+    es_nulo = texto.str.lower().isin(nulos).to_numpy(dtype=bool)
+    valores[posiciones_texto[es_nulo]] = None
+    texto = texto[~es_nulo]
+
+    if reglas['entero_inicial'] and len(texto):
+        # match/replace sí están vectorizados en Arrow (extract no)
+        con_numero = texto.str.match(_PATRON_ENTERO).to_numpy(dtype=bool)
+        if con_numero.any():
+            digitos = texto[con_numero].str.replace(_PATRON_ENTERO + r'(?s:.*)$', r'\1', regex=True)
+            valores[digitos.index.to_numpy()] = _a_enteros(digitos)
+            texto = texto[~con_numero]
+
+    if reglas['recortar'] and len(texto):
+        valores[texto.index.to_numpy()] = texto.to_numpy(dtype=object)
+
+    resultado = pd.Series(valores, index=serie.index, name=serie.name, dtype=object)
+    if reglas['tipar_enteros'] and pd.api.types.infer_dtype(resultado, skipna=True) == 'integer':
+        return _tipar_enteros(resultado)
+    return resultado
+
+
+def normalizar_dataframe(df, reglas=None):
+    """Normaliza todas las columnas de texto de un DataFrame. Retorna un DataFrame nuevo."""
+    reglas = obtener_reglas(reglas)
+    return pd.DataFrame(
+        {columna: normalizar_serie(df[columna], reglas) for columna in df.columns},
+        index=df.index,
+    )
+
+
+def normalizar_celda(valor):
+    """
+    Normaliza una celda según reglas simples:
+      - Cadenas vacías o equivalentes a nulo ('n/a', 'na', 'none', 'null') -> None
+      - Si la cadena inicia con un número entero (ej: '15 días', '20kg', '  7 items') devuelve ese entero
+      - En cualquier otro caso devuelve el valor original
+    No altera tipos que no sean str.
+
+    Implementación celda a celda original; se conserva como referencia para
+    benchmark_normalizacion.
+    """
+    if isinstance(valor, str):
+        texto = valor.strip()
+        if not texto or texto.lower() in ('n/a', 'na', 'none', 'null'):
+            return None
+
+        # Captura un entero inicial (positivo o negativo) al comienzo de la cadena
+        coincidencia = re.match(r'^(-?\d+)', texto)
+        if coincidencia:
+            numero_str = coincidencia.group(1)
+            try:
+                return int(numero_str)
+            except Exception:
+                # Si falla la conversión, se deja el valor original
+                pass
+
+    return valor
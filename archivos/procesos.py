@@ -0,0 +1,547 @@
+"""
+Importaciones y ejecuciones de procesos, independientes de la petición HTTP
+
+Aquí vive la parte pesada de subir_sql, del paso .sql de seleccionar_datos y
+de ejecutar_proceso. Las funciones reciben solo valores serializables (rutas,
+URLs, ids) para poder ejecutarse tanto en la vista como en un worker de la
+cola (archivos/jobs.py), registran el resultado en SqlFileUpload /
+ProcessAutomation / ProcessRunLog y devuelven un dict JSON con el resumen.
+
+`progreso`, si se indica, se llama como progreso(sentencias, filas) a medida
+que avanza la ejecución. Ante un fallo global se registra el error y se
+relanza la excepción.
+"""
+import itertools
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import traceback
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from sqlalchemy import text
+
+from . import metadatos
+from .carga_paralela import cargar_en_paralelo
+from .copia import copiar_tabla
+from .db_models import ProcessAutomation, SqlFileUpload
+from .engines import get_engine
+from .excel_reader import nombres_hojas
+from .models import ProcessConfig, ProcessRunLog
+from .sql_lexer import iter_sentencias_texto, leer_sentencias
+
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = Path(getattr(settings, 'PROCESOS_SCRIPTS_DIR', Path(settings.BASE_DIR) / 'procesos_scripts'))
+
+
+def _registro(modelo, pk):
+    return modelo.objects.filter(pk=pk).first() if pk else None
+
+
+def _eliminar(ruta):
+    try:
+        if ruta and os.path.exists(ruta):
+            os.remove(ruta)
+    except OSError:
+        pass
+
+
+def guardar_script(ruta, nombre):
+    """
+    Deja una copia del script .sql en PROCESOS_SCRIPTS_DIR para un proceso guardado.
+
+    El script no pasa por memoria ni se guarda en la configuración del
+    proceso: ejecutar_proceso_guardado lo vuelve a leer por fragmentos desde
+    'ruta_base'/'archivo'. En el mismo disco se usa un enlace duro en lugar
+    de copiar el archivo.
+
+    Parámetros:
+    - ruta: Script en disco (p.e. el temporal del asistente)
+    - nombre: Nombre del proceso, usado en el nombre del archivo
+
+    Retorna:
+    - Dict {'ruta_base', 'archivo'} para el origen 'sql_script'
+    """
+    SCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+    base = re.sub(r'[^\w-]+', '_', nombre).strip('_')[:80] or 'proceso'
+    archivo = f"{base}_{uuid.uuid4().hex[:8]}.sql"
+    destino = SCRIPTS_DIR / archivo
+    try:
+        os.link(ruta, destino)
+    except OSError:
+        shutil.copyfile(ruta, destino)
+    return {'ruta_base': str(SCRIPTS_DIR), 'archivo': archivo}
+
+
+def importar_script_sql(ruta_temporal, engine_url, sql_upload_id=None, process_id=None, progreso=None):
+    """
+    Convierte a T-SQL y ejecuta un script subido desde subir_sql.
+
+    Parámetros:
+    - ruta_temporal: Script en disco; se elimina al terminar
+    - engine_url: URL de la base de datos destino
+    - sql_upload_id / process_id: Registros SqlFileUpload y ProcessAutomation a actualizar
+
+    Retorna:
+    - Dict con 'total', 'success', 'rows_affected', 'warnings', 'errors' (los 10
+      primeros, con 'error', 'statement' y 'sugerencia') y 'sql_convertido'
+    """
+    from .mysql_to_sqlserver import iter_convert_mysql_to_sqlserver, execute_sqlserver_script
+
+    sql_upload = _registro(SqlFileUpload, sql_upload_id)
+    process_record = _registro(ProcessAutomation, process_id)
+    tiempo_inicio = time.time()
+
+    try:
+        engine = get_engine(engine_url)
+        with open(ruta_temporal, 'r', encoding='utf-8', errors='ignore') as archivo_script:
+            # Convertir SQL de MySQL a formato compatible con SQL Server, sentencia a sentencia
+            sentencias = iter_convert_mysql_to_sqlserver(archivo_script)
+
+            # Anticipar las primeras sentencias convertidas para el registro
+            inicio_convertido = []
+            largo_convertido = 0
+            for sentencia in sentencias:
+                inicio_convertido.append(sentencia)
+                largo_convertido += len(sentencia) + 2
+                if largo_convertido >= 10000:
+                    break
+            sql_texto_convertido = '\n\n'.join(inicio_convertido)
+
+            if sql_upload:
+                sql_upload.version_convertida = sql_texto_convertido[:10000]
+                sql_upload.save()
+
+            # Ejecutar el script convertido a medida que se lee
+            resultados = execute_sqlserver_script(
+                engine, itertools.chain(inicio_convertido, sentencias), progreso=progreso
+            )
+            metadatos.invalidar(engine)
+    except Exception as e:
+        logger.exception("Error importando script SQL")
+        if sql_upload:
+            sql_upload.estado = 'Error'
+            sql_upload.errores = json.dumps({
+                'error': str(e),
+                'detalle': traceback.format_exc()[:1000]  # Limitamos para no guardar trazas enormes
+            })
+            sql_upload.save()
+        if process_record:
+            process_record.estado = 'Error'
+            process_record.tiempo_ejecucion = int(time.time() - tiempo_inicio)
+            process_record.error_mensaje = f"Error inesperado: {str(e)}"
+            process_record.resultado = json.dumps({
+                'error': str(e),
+                'tipo_error': e.__class__.__name__
+            })
+            process_record.save()
+        raise
+    finally:
+        _eliminar(ruta_temporal)
+
+    tiempo_ejecucion = int(time.time() - tiempo_inicio)
+    errores = resultados['errors']
+
+    if errores:
+        logger.error(f"Errores en ejecución SQL: {len(errores)} de {resultados['total']} sentencias fallaron.")
+        for i, error in enumerate(errores[:5]):
+            logger.error(f"Error #{i+1}: {error['error']} en sentencia: {error['statement']}")
+            if error.get('sugerencia'):
+                logger.error(f"  Sugerencia: {error['sugerencia']}")
+
+    if sql_upload:
+        sql_upload.estado = 'Error' if errores else 'Completado'
+        sql_upload.sentencias_total = resultados['total']
+        sql_upload.sentencias_exito = resultados['success']
+        if errores:
+            sql_upload.errores = json.dumps([
+                {'error': e['error'], 'statement': e['statement'][:200]} for e in errores[:20]
+            ])
+        sql_upload.save()
+
+    if process_record:
+        process_record.estado = 'Error' if errores else 'Completado'
+        process_record.tiempo_ejecucion = tiempo_ejecucion
+        process_record.filas_afectadas = resultados.get('rows_affected', 0)
+        process_record.resultado = json.dumps({
+            'sentencias_total': resultados['total'],
+            'sentencias_exito': resultados['success'],
+            'errores': len(errores)
+        })
+        process_record.save()
+
+    return {
+        'total': resultados['total'],
+        'success': resultados['success'],
+        'rows_affected': resultados.get('rows_affected', 0),
+        'warnings': resultados.get('warnings', []),
+        'errors': [
+            {'error': e['error'], 'statement': e['statement'], 'sugerencia': e.get('sugerencia', '')}
+            for e in errores[:10]
+        ],
+        'sql_convertido': sql_texto_convertido[:5000],
+    }
+
+
+def _tablas_existentes(engine, tablas):
+    try:
+        return metadatos.tablas_existentes(engine, tablas, usar_cache=False)
+    except Exception:
+        logger.exception("No se pudo verificar la existencia de las tablas del script")
+        return set()
+
+
+def ejecutar_script_seleccion(archivo_path, engine_url, tablas, sql_upload_id=None, process_id=None,
+                              run_id=None, progreso=None):
+    """
+    Ejecuta el script .sql cargado en el paso 1 de seleccionar_datos.
+
+    Si todas las tablas que crea el script ya existen no se ejecuta nada
+    ('Guardado_sin_cambios'). Los errores de existencia previa se cuentan como
+    omisiones y el resto como errores reales ('Parcial').
+
+    Parámetros:
+    - archivo_path: Script en disco
+    - engine_url: URL de la base de datos destino
+    - tablas: Tablas detectadas en el script
+    - sql_upload_id / process_id: Registros SqlFileUpload y ProcessAutomation a actualizar
+    - run_id: ProcessRunLog a completar si el script se guardó como proceso
+
+    Retorna:
+    - Dict con 'estado_final', 'sin_cambios' (no se ejecutó nada), 'tablas',
+      'total_filas', 'total_sentencias', 'skips' y 'errores' (lista de
+      {'stmt', 'error'} sin las omisiones)
+    """
+    sql_upload = _registro(SqlFileUpload, sql_upload_id)
+    process_record = _registro(ProcessAutomation, process_id)
+    run = _registro(ProcessRunLog, run_id)
+
+    errores = []
+    total_filas = 0
+    total_sentencias = 0
+    sin_cambios = False
+    try:
+        engine = get_engine(engine_url)
+        # Pre-scan tablas existentes para poder decidir si habrá cambios
+        tablas_existentes = _tablas_existentes(engine, tablas) if tablas else set()
+
+        if tablas and len(tablas_existentes) == len(tablas):
+            estado_final = 'Guardado_sin_cambios'
+            sin_cambios = True
+            skips = 0
+            reales = []
+            if sql_upload:
+                sql_upload.estado = estado_final
+                sql_upload.sentencias_exito = 0
+                sql_upload.save()
+            if process_record:
+                process_record.estado = 'Guardado sin cambios'
+                process_record.resultado = json.dumps({'tablas': tablas, 'sin_cambios': True})
+                process_record.save()
+        else:
+            # Las sentencias se leen del archivo por fragmentos y se ejecutan a medida
+            # que se completan (respeta comillas, comentarios y DELIMITER)
+            with engine.begin() as conn:
+                for stmt in leer_sentencias(archivo_path):
+                    total_sentencias += 1
+                    try:
+                        conn.execute(text(stmt))
+                    except Exception as e:
+                        # Detectar error benigno de existencia y tratarlo como skip
+                        msg_err = str(e)
+                        if 'already exists' in msg_err.lower() or 'ya existe' in msg_err.lower():
+                            errores.append({'stmt': stmt[:60], 'error': 'EXISTS_SKIP'})
+                        else:
+                            errores.append({'stmt': stmt[:60], 'error': msg_err})
+                    if progreso:
+                        progreso(total_sentencias, 0)
+            # El script pudo crear o modificar tablas: los metadatos en caché ya no valen
+            metadatos.invalidar(engine)
+            if tablas:
+                try:
+                    total_filas = sum(n or 0 for n in metadatos.conteo_filas(engine, tablas).values())
+                except Exception:
+                    logger.exception("No se pudieron contar las filas de las tablas del script")
+                if progreso:
+                    progreso(total_sentencias, total_filas)
+
+            skips = sum(1 for e in errores if e['error'] == 'EXISTS_SKIP')
+            reales = [e for e in errores if e['error'] != 'EXISTS_SKIP']
+            if skips and not reales:
+                estado_final = 'Guardado_sin_cambios'
+            elif reales:
+                estado_final = 'Parcial'
+            else:
+                estado_final = 'Completado'
+
+            if sql_upload:
+                sql_upload.sentencias_total = total_sentencias
+                sql_upload.sentencias_exito = total_sentencias - len(reales)
+                sql_upload.estado = estado_final
+                sql_upload.errores = json.dumps(reales[:50]) if reales else 'Sin errores'
+                sql_upload.save()
+            if process_record:
+                process_record.estado = estado_final.replace('_', ' ')
+                process_record.filas_afectadas = total_filas
+                if reales:
+                    process_record.resultado = json.dumps({
+                        'tablas': tablas,
+                        'errores_reales': reales[:20],
+                        'skips_existencia': skips,
+                        'filas_totales': total_filas,
+                        'sentencias_totales': total_sentencias,
+                        'sentencias_exito': total_sentencias - len(reales)
+                    })
+                else:
+                    process_record.resultado = 'Sin errores'
+                process_record.save()
+    except Exception as e:
+        logger.exception("Error global ejecutando script")
+        if sql_upload:
+            sql_upload.estado = 'Error'
+            sql_upload.errores = json.dumps({'error': str(e)})
+            sql_upload.save()
+        if process_record:
+            process_record.estado = 'Error'
+            process_record.error_mensaje = str(e)
+            process_record.save()
+        if run:
+            run.exito = False
+            run.mensaje = f"Fallo: {e}"
+            run.errores = errores + [{'stack': traceback.format_exc()}]
+            run.fin = timezone.now()
+            run.save()
+        raise
+
+    if run:
+        run.exito = True
+        run.filas_totales = total_filas
+        run.mensaje = f"OK. Filas procesadas: {total_filas}"
+        run.errores = errores or None
+        run.fin = timezone.now()
+        run.save()
+
+    return {
+        'estado_final': estado_final,
+        'sin_cambios': sin_cambios,
+        'tablas': tablas,
+        'total_filas': total_filas,
+        'total_sentencias': total_sentencias,
+        'skips': skips,
+        'errores': reales[:50],
+    }
+
+
+def url_destino(destino):
+    """
+    URL de SQLAlchemy para el bloque 'destino' de la configuración de un proceso.
+
+    Retorna:
+    - (url, avisos): avisos es una lista de textos para mostrar al usuario
+    """
+    avisos = []
+    motor = destino['motor']
+    conn = destino['conexion']
+    # Validación específica: usuario indicó SQL Server pero motor mal configurado (p.e. 'mysql')
+    # Detectamos patrón de instancia '\\' o puerto 1433 combinado con motor mysql y lo corregimos.
+    if motor == 'mysql' and (('\\' in str(conn.get('host',''))) or str(conn.get('puerto')) == '1433'):
+        avisos.append("Configuración detectada como SQL Server; ajustando motor a mssql automáticamente.")
+        motor = 'mssql'
+    if motor == 'mysql':
+        return f"mysql+pymysql://{conn['usuario']}:{conn['password']}@{conn['host']}:{conn['puerto']}/{conn['base']}", avisos
+    if motor == 'postgres':
+        return f"postgresql://{conn['usuario']}:{conn['password']}@{conn['host']}:{conn['puerto']}/{conn['base']}", avisos
+    if motor == 'mssql':
+        # Soportar host con instancia (host\INSTANCIA) sin puerto explícito
+        host_val = conn['host']
+        puerto_val = conn.get('puerto')
+        if '\\' in host_val:
+            # Si hay instancia y además puerto (posible conflicto), preferimos host\INSTANCIA y omitimos puerto
+            return f"mssql+pyodbc://{conn['usuario']}:{conn['password']}@{host_val}/{conn['base']}?driver=ODBC+Driver+17+for+SQL+Server", avisos
+        return f"mssql+pyodbc://{conn['usuario']}:{conn['password']}@{host_val},{puerto_val}/{conn['base']}?driver=ODBC+Driver+17+for+SQL+Server", avisos
+    raise ValueError("Motor destino no soportado")
+
+
+def tareas_de_archivos(origen, engine_url):
+    """
+    Tareas de carga (ver carga_paralela) para un origen 'excel' o 'csv':
+
+        "origen": {
+            "tipo": "excel",
+            "ruta_base": "D:/datos/ventas",       # opcional
+            "archivo": "ventas.xlsx",              # o "archivos": [...]
+            "hojas": ["Enero", {"hoja": "Febrero", "tabla": "ventas_feb", "modo": "append"}],
+            "tabla": "ventas",                     # opcional
+            "modo": "replace"
+        }
+
+    Sin 'hojas' se cargan todas las hojas del libro. La tabla por defecto es
+    'tabla' si se indicó, o el nombre de la hoja (Excel) o del archivo (CSV).
+    """
+    ruta_base = origen.get('ruta_base') or ''
+    archivos = origen.get('archivos') or ([origen['archivo']] if origen.get('archivo') else [])
+    if not archivos:
+        raise ValueError("Archivo de origen no definido en configuración.")
+
+    tareas = []
+    for archivo in archivos:
+        ruta = os.path.join(ruta_base, archivo) if ruta_base else archivo
+        if not os.path.isfile(ruta):
+            raise FileNotFoundError(f"No se encuentra el archivo: {ruta}")
+        base = {'ruta': ruta, 'engine_url': engine_url, 'modo': origen.get('modo', 'replace')}
+
+        if origen['tipo'] == 'excel':
+            hojas = origen.get('hojas') or nombres_hojas(ruta)
+            for hoja in hojas:
+                hoja = {'hoja': hoja} if isinstance(hoja, str) else dict(hoja)
+                tareas.append({
+                    **base,
+                    'tipo': 'excel',
+                    'hoja': hoja['hoja'],
+                    'tabla': hoja.get('tabla') or origen.get('tabla') or hoja['hoja'],
+                    'modo': hoja.get('modo', base['modo']),
+                })
+        else:
+            extension = os.path.splitext(ruta)[1].lower()
+            tareas.append({
+                **base,
+                'tipo': 'txt' if extension == '.txt' else 'csv',
+                'hoja': None,
+                'tabla': origen.get('tabla') or os.path.splitext(os.path.basename(ruta))[0],
+            })
+    return tareas
+
+
+def ejecutar_proceso_guardado(proceso_id, run_id, progreso=None):
+    """
+    Ejecuta un ProcessConfig y completa su ProcessRunLog.
+
+    Parámetros:
+    - proceso_id: ProcessConfig a ejecutar
+    - run_id: ProcessRunLog ya creado para esta ejecución
+
+    Retorna:
+    - Dict con 'filas_totales', 'mensaje' y 'avisos'; si el proceso falla, el
+      fallo queda en el ProcessRunLog y se relanza la excepción. En los
+      orígenes excel/csv, ProcessRunLog.detalle guarda por cada hoja o archivo
+      sus filas y segundos de carga (las que fallaron van además a errores);
+      en sql_script guarda las estadísticas de cada tabla copiada
+    """
+    proceso = ProcessConfig.objects.get(pk=proceso_id)
+    run = ProcessRunLog.objects.get(pk=run_id)
+    cfg = proceso.json_config
+    errores = []
+    detalle = []
+    avisos = []
+    total_filas = 0
+    sentencias = 0
+    detalle_carga = ''
+    fallo = None
+    try:
+        engine_url, avisos = url_destino(cfg['destino'])
+        for aviso in avisos:
+            logger.warning(f"Proceso {proceso.nombre}: {aviso}")
+        engine = get_engine(engine_url)
+
+        origen = cfg['origen']
+        if origen['tipo'] in ('excel','csv'):
+            # Cada hoja/archivo se carga en su tabla desde un proceso del pool
+            inicio = time.perf_counter()
+            tareas = tareas_de_archivos(origen, engine_url)
+            cargadas = 0
+            fallidas = 0
+            for estadisticas in cargar_en_paralelo(tareas):
+                for estadistica in estadisticas:
+                    detalle.append(estadistica)
+                    if 'error' in estadistica:
+                        errores.append(estadistica)
+                    cargadas += 1
+                    fallidas += 'error' in estadistica
+                    total_filas += estadistica['filas']
+                if progreso:
+                    progreso(cargadas, total_filas)
+            if fallidas and cfg.get('ejecucion', {}).get('on_error') == 'stop':
+                raise RuntimeError(f"{fallidas} de {cargadas} hoja(s)/archivo(s) con error")
+            detalle_carga = (
+                f" ({cargadas} hoja(s)/archivo(s) en {time.perf_counter() - inicio:.1f}s"
+                + (f", {fallidas} con error" if fallidas else "") + ")"
+            )
+        elif origen['tipo'] == 'sql_script':
+            # Cargar script inline o desde archivo definido en configuracion
+            sql_text = origen.get('contenido')
+            if sql_text:
+                bloques = iter_sentencias_texto(sql_text)
+            else:
+                ruta_base = origen.get('ruta_base') or ''
+                archivo_script = origen.get('archivo')
+                if not archivo_script:
+                    raise ValueError("Script SQL no definido en configuración.")
+                script_path = os.path.join(ruta_base, archivo_script) if ruta_base else archivo_script
+                bloques = leer_sentencias(script_path)
+            with engine.begin() as conn:
+                for stmt in bloques:
+                    sentencias += 1
+                    try:
+                        conn.execute(text(stmt))
+                    except Exception as e:
+                        errores.append({'stmt': stmt[:60], 'error': str(e)})
+                        if cfg.get('ejecucion', {}).get('on_error') == 'stop':
+                            raise
+                    if progreso:
+                        progreso(sentencias, total_filas)
+            # 2. Opcional: post_copia tablas (si quieres mapear a otros nombres)
+            for m in origen.get('tablas_resultantes', []):
+                # m puede ser string (mismo nombre) o dict {'origen':'t1','destino':'t2','modo':'replace'}
+                # y, para copiar a otra base, 'base_destino': {'motor': ..., 'conexion': {...}}
+                engine_copia = engine
+                if isinstance(m, str):
+                    tabla_origen = tabla_destino = m
+                    modo = 'replace'
+                else:
+                    tabla_origen = m.get('origen')
+                    tabla_destino = m.get('destino', tabla_origen)
+                    modo = m.get('modo', 'replace')
+                    if m.get('base_destino'):
+                        url_copia, avisos_copia = url_destino(m['base_destino'])
+                        avisos.extend(avisos_copia)
+                        engine_copia = get_engine(url_copia)
+                if not tabla_origen:
+                    continue
+                base = total_filas
+                # En la misma base la copia es un SELECT INTO / INSERT ... SELECT en el servidor
+                estadistica = copiar_tabla(
+                    engine, tabla_origen, engine_copia, tabla_destino,
+                    modo='replace' if modo == 'replace' else 'append',
+                    progreso=(lambda copiadas: progreso(sentencias, base + copiadas)) if progreso else None
+                )
+                detalle.append(estadistica)
+                total_filas += estadistica['filas']
+        else:
+            raise ValueError("Origen no implementado aún")
+        # Las cargas de los workers no pasan por la caché de este proceso
+        metadatos.invalidar(engine)
+
+        run.exito = True
+        run.filas_totales = total_filas
+        run.mensaje = f"OK. Filas procesadas: {total_filas}{detalle_carga}"
+    except Exception as e:
+        fallo = e
+        run.exito = False
+        run.mensaje = f"Fallo: {e}"
+        errores.append({'stack': traceback.format_exc()})
+    run.fin = timezone.now()
+    if errores:
+        run.errores = errores
+    if detalle:
+        run.detalle = detalle
+    run.save()
+
+    if fallo is not None:
+        raise fallo
+    return {'filas_totales': total_filas, 'mensaje': run.mensaje, 'avisos': avisos}
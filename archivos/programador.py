@@ -0,0 +1,294 @@
+"""
+Programación periódica de procesos guardados (ProcessConfig)
+
+Un proceso se programa con la clave 'programacion' de su json_config:
+
+    "programacion": {"cron": "30 2 * * 1-5"}            # 02:30 de lunes a viernes
+    "programacion": {"cada_minutos": 15}                # cada 15 minutos
+    "programacion": {"cron": "@daily", "jitter_segundos": 120, "activa": true}
+
+- cron: expresión de 5 campos (minuto hora día mes día_semana) con *, listas,
+  rangos y pasos, o los alias @hourly, @daily, @weekly, @monthly. Se evalúa
+  en la zona horaria de settings.TIME_ZONE.
+- cada_minutos / cada_segundos: intervalo desde el inicio de la última ejecución.
+- jitter_segundos: retraso aleatorio en [0, jitter] para que los procesos
+  programados a la misma hora no arranquen todos a la vez (por defecto
+  PROGRAMADOR_JITTER_SEGUNDOS).
+
+El comando programar_procesos usa Programador para lanzar las ejecuciones
+vencidas como trabajos de la cola (archivos/jobs.py) en un pool acotado:
+nunca dos ejecuciones del mismo proceso a la vez, y como mucho
+PROGRAMADOR_MAX_POR_DESTINO simultáneas contra una misma base de datos destino.
+Cada ejecución queda en ProcessRunLog.
+"""
+import logging
+import random
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from . import jobs
+from .models import ProcessConfig, ProcessRunLog
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, 'PROGRAMADOR_WORKERS', 4)
+MAX_POR_DESTINO = getattr(settings, 'PROGRAMADOR_MAX_POR_DESTINO', 2)
+LIMITES_DESTINO = getattr(settings, 'PROGRAMADOR_LIMITES_DESTINO', {})
+JITTER_SEGUNDOS = getattr(settings, 'PROGRAMADOR_JITTER_SEGUNDOS', 30)
+# Una ejecución sin 'fin' más antigua que esto se considera abandonada
+TIMEOUT_SEGUNDOS = getattr(settings, 'COLA_TRABAJOS_TIMEOUT_SEGUNDOS', 3600)
+
+_ALIAS = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+# Límite de búsqueda de la próxima coincidencia (p.e. '0 0 30 2 *' nunca coincide)
+_MAX_ANIOS_BUSQUEDA = 5
+
+
+def _campo(expresion, minimo, maximo):
+    """Valores de un campo cron: '*', '5', '1-5', '*/15', '10-40/10', '1,3,5'."""
+    valores = set()
+    for parte in expresion.split(','):
+        rango, _, paso = parte.partition('/')
+        paso = int(paso) if paso else 1
+        if paso < 1:
+            raise ValueError(f"Paso inválido en '{expresion}'")
+        if rango == '*':
+            inicio, fin = minimo, maximo
+        elif '-' in rango:
+            inicio, fin = (int(v) for v in rango.split('-', 1))
+        else:
+            inicio = int(rango)
+            fin = maximo if paso > 1 else inicio
+        if inicio < minimo or fin > maximo or inicio > fin:
+            raise ValueError(f"Valor fuera de rango en '{expresion}' ({minimo}-{maximo})")
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
+
+
+class Cron:
+    """Expresión cron de 5 campos."""
+
+    def __init__(self, expresion):
+        self.expresion = expresion.strip()
+        campos = _ALIAS.get(self.expresion.lower(), self.expresion).split()
+        if len(campos) != 5:
+            raise ValueError(f"La expresión cron debe tener 5 campos: '{expresion}'")
+        self.minutos = _campo(campos[0], 0, 59)
+        self.horas = _campo(campos[1], 0, 23)
+        self.dias = _campo(campos[2], 1, 31)
+        self.meses = _campo(campos[3], 1, 12)
+        # 0 y 7 son domingo; se pasa a la numeración de Python (lunes=0)
+        self.dias_semana = {(d - 1) % 7 for d in _campo(campos[4], 0, 7)}
+        self._dia_libre = campos[2] == '*'
+        self._semana_libre = campos[4] == '*'
+
+    def _coincide_dia(self, fecha):
+        en_dia = fecha.day in self.dias
+        en_semana = fecha.weekday() in self.dias_semana
+        # Como en cron: si ambos campos están restringidos basta con cumplir uno
+        if not self._dia_libre and not self._semana_libre:
+            return en_dia or en_semana
+        return en_dia and en_semana
+
+    def siguiente(self, desde):
+        """
+        Primer instante estrictamente posterior a `desde` que cumple la expresión.
+
+        Parámetros:
+        - desde: datetime aware
+
+        Retorna:
+        - datetime aware en la zona horaria actual
+        """
+        local = timezone.localtime(desde).replace(tzinfo=None, second=0, microsecond=0)
+        fecha = local + timedelta(minutes=1)
+        limite = local + timedelta(days=366 * _MAX_ANIOS_BUSQUEDA)
+        while fecha <= limite:
+            if fecha.month not in self.meses:
+                anio, mes = (fecha.year + 1, 1) if fecha.month == 12 else (fecha.year, fecha.month + 1)
+                fecha = datetime(anio, mes, 1)
+            elif not self._coincide_dia(fecha):
+                fecha = datetime(fecha.year, fecha.month, fecha.day) + timedelta(days=1)
+            elif fecha.hour not in self.horas:
+                fecha = fecha.replace(minute=0) + timedelta(hours=1)
+            elif fecha.minute not in self.minutos:
+                fecha += timedelta(minutes=1)
+            else:
+                return timezone.make_aware(fecha)
+        raise ValueError(f"La expresión cron '{self.expresion}' no tiene próximas ejecuciones")
+
+
+def programacion_de(cfg):
+    """
+    Programación válida del json_config de un proceso, o None si no tiene o
+    está desactivada. Lanza ValueError si está mal definida.
+
+    Retorna:
+    - Dict con 'cron' (Cron) o 'intervalo' (timedelta), y 'jitter' (segundos)
+    """
+    prog = (cfg or {}).get('programacion')
+    if not prog or not prog.get('activa', True):
+        return None
+    resultado = {'jitter': float(prog.get('jitter_segundos', JITTER_SEGUNDOS))}
+    if prog.get('cron'):
+        resultado['cron'] = Cron(prog['cron'])
+    elif prog.get('cada_minutos') or prog.get('cada_segundos'):
+        segundos = float(prog.get('cada_segundos') or 0) + 60 * float(prog.get('cada_minutos') or 0)
+        if segundos <= 0:
+            raise ValueError("El intervalo de programación debe ser positivo")
+        resultado['intervalo'] = timedelta(seconds=segundos)
+    else:
+        raise ValueError("La programación necesita 'cron', 'cada_minutos' o 'cada_segundos'")
+    return resultado
+
+
+def proxima_ejecucion(programacion, ultima, referencia):
+    """
+    Momento en que toca ejecutar el proceso.
+
+    Parámetros:
+    - programacion: Resultado de programacion_de
+    - ultima: Inicio de la última ejecución (None si nunca se ejecutó)
+    - referencia: Desde cuándo cuenta la programación si nunca se ejecutó
+      (p.e. la última modificación del proceso)
+    """
+    if 'cron' in programacion:
+        return programacion['cron'].siguiente(ultima or referencia)
+    if ultima is None:
+        return referencia
+    return ultima + programacion['intervalo']
+
+
+def clave_destino(cfg):
+    """
+    Identifica la base de datos destino ('motor://host:puerto/base') para
+    limitar la concurrencia; es la clave de PROGRAMADOR_LIMITES_DESTINO.
+    """
+    try:
+        destino = cfg['destino']
+        conn = destino['conexion']
+        return f"{destino['motor']}://{conn.get('host', '')}:{conn.get('puerto') or ''}/{conn.get('base', '')}".lower()
+    except (KeyError, TypeError):
+        return 'desconocido'
+
+
+def limite_destino(clave):
+    return LIMITES_DESTINO.get(clave, MAX_POR_DESTINO)
+
+
+class Programador:
+    """
+    Estado del despachador: qué ejecuciones están en curso en este proceso y
+    cuándo arranca cada ejecución vencida (con su jitter ya sorteado).
+    """
+
+    def __init__(self, pool, workers, usar_jitter=True):
+        self.pool = pool
+        self.workers = workers
+        self.usar_jitter = usar_jitter
+        self.en_curso = {}      # future -> (proceso_id, clave_destino)
+        self.lanzamientos = {}  # proceso_id -> (momento con jitter, vencimiento)
+
+    def _limpiar_terminados(self):
+        for futuro in [f for f in self.en_curso if f.done()]:
+            proceso_id, _ = self.en_curso.pop(futuro)
+            if futuro.exception() is not None:
+                logger.error(f"Ejecución programada del proceso {proceso_id} terminó con error: {futuro.exception()}")
+
+    def _ejecutando_en_bd(self, ahora):
+        """Procesos con una ejecución abierta (de este u otro worker, o manual)."""
+        limite = ahora - timedelta(seconds=TIMEOUT_SEGUNDOS)
+        return set(
+            ProcessRunLog.objects.filter(fin__isnull=True, inicio__gte=limite)
+            .values_list('proceso_id', flat=True)
+        )
+
+    def vencidos(self, ahora):
+        """
+        Procesos activos con programación cuya próxima ejecución ya pasó.
+
+        Retorna:
+        - Lista de (ProcessConfig, vencimiento, jitter) ordenada por vencimiento
+        """
+        vencidos = []
+        procesos = ProcessConfig.objects.filter(activo=True).annotate(ultima=Max('runs__inicio'))
+        for proceso in procesos:
+            try:
+                programacion = programacion_de(proceso.json_config)
+                if programacion is None:
+                    continue
+                vencimiento = proxima_ejecucion(programacion, proceso.ultima, proceso.actualizado)
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Programación inválida en el proceso '{proceso.nombre}': {e}")
+                continue
+            if vencimiento <= ahora:
+                vencidos.append((proceso, vencimiento, programacion['jitter']))
+        vencidos.sort(key=lambda v: v[1])
+        return vencidos
+
+    def ciclo(self, ahora=None):
+        """
+        Lanza las ejecuciones vencidas que caben en el pool y en los límites
+        por destino.
+
+        Retorna:
+        - Número de ejecuciones lanzadas
+        """
+        ahora = ahora or timezone.now()
+        self._limpiar_terminados()
+        ocupados = self._ejecutando_en_bd(ahora) | {p for p, _ in self.en_curso.values()}
+        por_destino = {}
+        for proceso_id, clave in self.en_curso.values():
+            por_destino[clave] = por_destino.get(clave, 0) + 1
+
+        lanzadas = 0
+        vigentes = set()
+        for proceso, vencimiento, jitter in self.vencidos(ahora):
+            vigentes.add(proceso.id)
+            momento, vencimiento_sorteado = self.lanzamientos.get(proceso.id, (None, None))
+            if vencimiento_sorteado != vencimiento:
+                retraso = random.uniform(0, jitter) if self.usar_jitter else 0
+                momento = vencimiento + timedelta(seconds=retraso)
+                self.lanzamientos[proceso.id] = (momento, vencimiento)
+            if momento > ahora or proceso.id in ocupados:
+                continue
+            if len(self.en_curso) >= self.workers:
+                break
+            clave = clave_destino(proceso.json_config)
+            if por_destino.get(clave, 0) >= limite_destino(clave):
+                continue
+
+            futuro = self._lanzar(proceso)
+            if futuro is None:
+                continue
+            self.en_curso[futuro] = (proceso.id, clave)
+            por_destino[clave] = por_destino.get(clave, 0) + 1
+            ocupados.add(proceso.id)
+            self.lanzamientos.pop(proceso.id, None)
+            lanzadas += 1
+
+        # Olvidar sorteos de procesos que ya no están vencidos (ejecutados por otro worker)
+        for proceso_id in set(self.lanzamientos) - vigentes:
+            del self.lanzamientos[proceso_id]
+        return lanzadas
+
+    def _lanzar(self, proceso):
+        """Registra la ejecución y la envía al pool como trabajo de la cola."""
+        run = ProcessRunLog.objects.create(proceso=proceso, mensaje="Ejecución programada")
+        trabajo = jobs.encolar('ejecutar_proceso', {'proceso_id': proceso.id, 'run_id': run.id}, run_log=run)
+        if not jobs.reclamar(trabajo.pk, jobs.nombre_worker()):
+            return None
+        logger.info(f"Proceso '{proceso.nombre}' lanzado (trabajo #{trabajo.pk})")
+        return self.pool.submit(jobs.ejecutar_por_id, trabajo.pk)
+
+    def esperar(self, timeout):
+        jobs.esperar(set(self.en_curso), timeout)
@@ -0,0 +1,399 @@
+"""
+Analizador léxico incremental para scripts SQL de MySQL
+
+Recorre el script una sola vez, por fragmentos, y entrega tokens que ya
+distinguen cadenas, comentarios e identificadores entre comillas, de modo que
+las transformaciones posteriores nunca tocan el contenido de un literal.
+
+- tokenizar(fuente): iterador de Token(tipo, valor)
+- iter_sentencias(fuente): iterador de listas de tokens, una por sentencia
+- iter_sentencias_texto(fuente) / leer_sentencias(ruta): sentencias como texto
+
+Tipos de token: 'espacio', 'comentario', 'cadena', 'ident' (`x` o [x]),
+'palabra', 'simbolo', 'fin' (delimitador personalizado) y 'delimitador'
+(directiva DELIMITER; su valor es el nuevo delimitador). Con tuplas=True las
+tuplas (...) que siguen a VALUES llegan en tokens 'tuplas' (una o más tuplas
+separadas por comas, reconocidas con una expresión regular): en los volcados
+casi todo el texto está en esas tuplas y así no se tokeniza valor por valor;
+separar_tuplas(valor) las divide. Una tupla que la expresión no reconoce
+(comentarios, identificadores o paréntesis anidados en más de un nivel) se
+tokeniza de la forma normal.
+
+`fuente` puede ser un string, un archivo abierto en modo texto o cualquier
+iterable de strings. Solo se mantiene en memoria el fragmento actual y la
+sentencia en curso.
+"""
+import re
+from collections import namedtuple
+
+Token = namedtuple('Token', 'tipo valor')
+
+TAMANIO_FRAGMENTO = 64 * 1024
+
+_ESPACIO = re.compile(r'\s+')
+_PALABRA = re.compile(r'[\w@]+')
+_DIRECTIVA = re.compile(r'DELIMITER\s', re.IGNORECASE)
+# Camino rápido para los tokens más frecuentes (no cubre comentarios ni cadenas)
+_RAPIDO = re.compile(r'(\s+)|([\w@]+)|([(),;=.+*<>!%&|^~:?{}])')
+_TIPOS_RAPIDOS = {1: 'espacio', 2: 'palabra', 3: 'simbolo'}
+
+# Tupla de VALUES con un nivel de paréntesis anidados; las cadenas admiten
+# escapes \ y comillas duplicadas. Fuera de las cadenas no admite ';', '\',
+# comentarios ni identificadores entre comillas. Cada alternativa empieza con
+# un carácter distinto (bucles desenrollados), de modo que una tupla que no
+# coincide falla en tiempo lineal, sin retroceso exponencial
+_TEXTO = r"[^()'\"`\[;#/\\\-]*"
+PATRON_CADENA = r"'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'(?!')|\"[^\"\\]*(?:(?:\\.|\"\")[^\"\\]*)*\"(?!\")"
+_OTRO = r"-(?!-)|/(?!\*)"
+_TUPLA = re.compile(
+    rf"\({_TEXTO}(?:(?:{PATRON_CADENA}|{_OTRO}|\({_TEXTO}(?:(?:{PATRON_CADENA}|{_OTRO}){_TEXTO})*\)){_TEXTO})*\)",
+    re.S,
+)
+_TUPLAS = re.compile(rf"{_TUPLA.pattern}(?:\s*,\s*{_TUPLA.pattern})*", re.S)
+# Una tupla más larga se tokeniza de la forma normal
+_MAX_TUPLA = 1024 * 1024
+
+# Palabras que, en procedimientos/funciones/triggers, abren un bloque cerrado por END
+_ABRE_BLOQUE = {'BEGIN', 'CASE'}
+# END IF / END WHILE / ... cierran construcciones que no cuentan como bloque
+_CIERRES_COMPUESTOS = {'IF', 'WHILE', 'LOOP', 'REPEAT'}
+_RUTINAS = {'PROCEDURE', 'FUNCTION', 'TRIGGER', 'EVENT'}
+
+
+def _fragmentos(fuente):
+    if isinstance(fuente, str):
+        yield fuente
+    elif hasattr(fuente, 'read'):
+        while True:
+            fragmento = fuente.read(TAMANIO_FRAGMENTO)
+            if not fragmento:
+                break
+            yield fragmento
+    else:
+        yield from fuente
+
+
+def _fin_cadena(buf, pos, eof):
+    """Fin de un literal entre comillas simples o dobles con escapes MySQL."""
+    comilla = buf[pos]
+    i = pos + 1
+    n = len(buf)
+    while True:
+        j_comilla = buf.find(comilla, i)
+        j_barra = buf.find('\\', i, j_comilla if j_comilla != -1 else n)
+        if j_barra != -1:
+            if j_barra + 1 >= n and not eof:
+                return None
+            i = j_barra + 2
+            continue
+        if j_comilla == -1:
+            return None if not eof else n
+        if j_comilla + 1 < n and buf[j_comilla + 1] == comilla:
+            i = j_comilla + 2
+            continue
+        if j_comilla + 1 == n and not eof:
+            return None
+        return j_comilla + 1
+
+
+def _fin_delimitado(buf, pos, eof, cierre, duplicable):
+    """Fin de `ident`, [ident] o /* comentario */."""
+    i = pos + 1
+    n = len(buf)
+    while True:
+        j = buf.find(cierre, i)
+        if j == -1:
+            return None if not eof else n
+        fin = j + len(cierre)
+        if duplicable and buf.startswith(cierre, fin):
+            i = fin + len(cierre)
+            continue
+        if duplicable and fin == n and not eof:
+            return None
+        return fin
+
+
+def _escanear(buf, pos, eof, delimitador, inicio_linea):
+    """
+    Reconoce el token que empieza en `pos`.
+
+    Retorna:
+    - (tipo, fin, valor) o None si hace falta leer más texto para decidir
+    """
+    n = len(buf)
+    c = buf[pos]
+
+    if inicio_linea and c in 'dD':
+        if n - pos < 10 and not eof:
+            return None
+        if _DIRECTIVA.match(buf, pos):
+            fin = buf.find('\n', pos)
+            if fin == -1:
+                if not eof:
+                    return None
+                fin = n
+            return 'delimitador', fin, buf[pos + 9:fin].strip() or ';'
+
+    if delimitador != ';':
+        if buf.startswith(delimitador, pos):
+            return 'fin', pos + len(delimitador), delimitador
+        if not eof and n - pos < len(delimitador) and delimitador.startswith(buf[pos:]):
+            return None
+
+    if c.isspace():
+        fin = _ESPACIO.match(buf, pos).end()
+        if fin == n and not eof:
+            return None
+        return 'espacio', fin, None
+
+    if c in '-/' and pos + 1 == n and not eof:
+        return None
+
+    if c == '#' or buf.startswith('--', pos):
+        fin = buf.find('\n', pos)
+        if fin == -1:
+            if not eof:
+                return None
+            fin = n
+        return 'comentario', fin, None
+
+    if buf.startswith('/*', pos):
+        fin = _fin_delimitado(buf, pos + 1, eof, '*/', False)
+        return None if fin is None else ('comentario', fin, None)
+
+    if c in '\'"':
+        fin = _fin_cadena(buf, pos, eof)
+        return None if fin is None else ('cadena', fin, None)
+
+    if c == '`':
+        fin = _fin_delimitado(buf, pos, eof, '`', True)
+        return None if fin is None else ('ident', fin, None)
+
+    if c == '[':
+        fin = _fin_delimitado(buf, pos, eof, ']', True)
+        return None if fin is None else ('ident', fin, None)
+
+    m = _PALABRA.match(buf, pos)
+    if m:
+        if m.end() == n and not eof:
+            return None
+        return 'palabra', m.end(), None
+
+    return 'simbolo', pos + 1, None
+
+
+def tokenizar(fuente, tuplas=False):
+    """
+    Divide el script en tokens en una sola pasada.
+
+    Parámetros:
+    - fuente: String, archivo de texto o iterable de strings
+    - tuplas: Entregar las tuplas de VALUES en tokens 'tuplas'
+
+    Retorna:
+    - Iterador de Token(tipo, valor)
+    """
+    fragmentos = _fragmentos(fuente)
+    buf = ''
+    pos = 0
+    eof = False
+    delimitador = ';'
+    primer_caracter = None  # Primer carácter de un delimitador personalizado
+    inicio_linea = True
+    en_valores = False  # Después de VALUES o de tuplas y su ','
+
+    while True:
+        if pos >= len(buf):
+            if eof:
+                return
+            buf, pos = '', 0
+            try:
+                buf = next(fragmentos)
+            except StopIteration:
+                eof = True
+            continue
+
+        c = buf[pos]
+        if en_valores and c == '(':
+            m = _TUPLAS.match(buf, pos)
+            if m is not None:
+                yield Token('tuplas', m.group())
+                pos = m.end()
+                inicio_linea = False
+                continue
+            if not eof and len(buf) - pos < _MAX_TUPLA:
+                # Puede ser una tupla cortada por el borde del fragmento:
+                # se lee hasta duplicar lo pendiente y se vuelve a intentar
+                pendiente = [buf[pos:]]
+                largo = len(pendiente[0])
+                try:
+                    while largo < 2 * (len(buf) - pos):
+                        pendiente.append(next(fragmentos))
+                        largo += len(pendiente[-1])
+                except StopIteration:
+                    eof = True
+                buf, pos = ''.join(pendiente), 0
+                continue
+            en_valores = False
+
+        if c != primer_caracter and not (inicio_linea and c in 'dD'):
+            m = _RAPIDO.match(buf, pos)
+            if m is not None and (m.end() < len(buf) or eof):
+                texto = m.group()
+                tipo = _TIPOS_RAPIDOS[m.lastindex]
+                yield Token(tipo, texto)
+                if tipo == 'espacio':
+                    inicio_linea = inicio_linea or '\n' in texto
+                else:
+                    inicio_linea = False
+                    if tuplas:
+                        en_valores = (texto == ',' and en_valores) or (
+                            tipo == 'palabra' and primer_caracter is None and texto.upper() == 'VALUES')
+                pos = m.end()
+                continue
+
+        resultado = _escanear(buf, pos, eof, delimitador, inicio_linea)
+        if resultado is None:
+            # Token cortado por el borde del fragmento: compactar y leer más
+            try:
+                buf = buf[pos:] + next(fragmentos)
+            except StopIteration:
+                buf = buf[pos:]
+                eof = True
+            pos = 0
+            continue
+
+        tipo, fin, valor = resultado
+        if tuplas and tipo != 'espacio':
+            en_valores = (tipo == 'palabra' and primer_caracter is None
+                          and buf[pos:fin].upper() == 'VALUES')
+        if tipo == 'delimitador':
+            delimitador = valor
+            primer_caracter = delimitador[0] if delimitador != ';' else None
+            yield Token(tipo, valor)
+        else:
+            texto = buf[pos:fin]
+            yield Token(tipo, texto)
+            if tipo == 'espacio':
+                inicio_linea = inicio_linea or '\n' in texto
+            elif tipo != 'comentario':
+                inicio_linea = False
+        pos = fin
+
+
+def separar_tuplas(valor):
+    """Lista con el texto de cada tupla de un token 'tuplas'."""
+    return _TUPLA.findall(valor)
+
+
+def es_significativo(token):
+    return token.tipo not in ('espacio', 'comentario')
+
+
+def iter_sentencias(fuente, tuplas=False):
+    """
+    Agrupa los tokens en sentencias.
+
+    Una sentencia termina en ';' o en el delimitador definido con DELIMITER.
+    Sin DELIMITER, los ';' dentro de BEGIN ... END de un CREATE PROCEDURE,
+    FUNCTION o TRIGGER no cortan la sentencia. Con tuplas=True las tuplas de
+    VALUES llegan en tokens 'tuplas' (ver tokenizar).
+
+    Retorna:
+    - Iterador de listas de tokens (sin el terminador); se omiten las
+      sentencias que solo contienen espacios o comentarios
+    """
+    actual = []
+    palabras = []          # Primeras palabras significativas de la sentencia
+    rutina = False
+    profundidad = 0
+    end_pendiente = False
+    personalizado = False  # DELIMITER distinto de ';' activo
+
+    def _emitir():
+        nonlocal actual, palabras, rutina, profundidad, end_pendiente
+        sentencia = actual
+        actual, palabras = [], []
+        rutina, profundidad, end_pendiente = False, 0, False
+        if any(es_significativo(t) for t in sentencia):
+            return sentencia
+        return None
+
+    for token in tokenizar(fuente, tuplas):
+        if token.tipo == 'delimitador':
+            sentencia = _emitir()
+            if sentencia:
+                yield sentencia
+            personalizado = token.valor != ';'
+            continue
+
+        if token.tipo == 'fin':
+            sentencia = _emitir()
+            if sentencia:
+                yield sentencia
+            continue
+
+        if not es_significativo(token):
+            actual.append(token)
+            continue
+
+        palabra = token.valor.upper() if token.tipo == 'palabra' else None
+
+        if rutina and end_pendiente:
+            end_pendiente = False
+            if palabra in _CIERRES_COMPUESTOS:
+                pass
+            elif palabra == 'CASE':
+                profundidad -= 1
+                actual.append(token)
+                continue
+            else:
+                profundidad -= 1
+
+        if token.tipo == 'simbolo' and token.valor == ';' and not personalizado and profundidad <= 0:
+            sentencia = _emitir()
+            if sentencia:
+                yield sentencia
+            continue
+
+        actual.append(token)
+
+        if palabra is None:
+            continue
+        if len(palabras) < 8:
+            palabras.append(palabra)
+            if palabras[0] == 'CREATE' and palabra in _RUTINAS:
+                rutina = True
+        if rutina:
+            if palabra in _ABRE_BLOQUE:
+                profundidad += 1
+            elif palabra == 'END':
+                end_pendiente = True
+
+    sentencia = _emitir()
+    if sentencia:
+        yield sentencia
+
+
+def iter_sentencias_texto(fuente):
+    """
+    Sentencias del script como texto, sin el terminador y sin los espacios y
+    comentarios que las preceden.
+    """
+    # El texto de una tupla es el mismo que el de sus tokens
+    for tokens in iter_sentencias(fuente, tuplas=True):
+        inicio = 0
+        while not es_significativo(tokens[inicio]):
+            inicio += 1
+        texto = ''.join(t.valor for t in tokens[inicio:]).strip()
+        if texto:
+            yield texto
+
+
+def leer_sentencias(ruta, encoding='utf-8'):
+    """
+    Lee un archivo .sql por fragmentos y entrega sus sentencias a medida que
+    se completan, sin cargar el archivo entero en memoria.
+    """
+    with open(ruta, 'r', encoding=encoding, errors='ignore') as f:
+        yield from iter_sentencias_texto(f)
@@ -0,0 +1,408 @@
+"""
+Vista previa de scripts .sql sin ejecutarlos
+
+Para mostrar las tablas de un volcado (columnas y unas filas de muestra) no
+hace falta importarlo: este módulo recorre el script por fragmentos y
+  - de cada CREATE TABLE toma el nombre, las columnas y sus tipos declarados,
+  - de los INSERT ... VALUES toma solo las primeras N tuplas de cada tabla,
+  - el resto de cada sentencia (y cualquier otra sentencia) se salta con una
+    expresión regular que respeta cadenas y comentarios, sin tokenizarla.
+Con las filas de muestra se infiere además el esquema con el que se crearía
+la tabla al guardarla (archivos/esquema.py). No se usa la base de datos.
+
+Cuando se piden tablas concretas el recorrido termina en cuanto todas tienen
+sus columnas y sus N filas (en los volcados cada tabla va seguida de sus
+INSERT), sin leer el resto del archivo.
+"""
+import re
+
+import pandas as pd
+from django.conf import settings
+
+from .esquema import inferir_esquema
+from .sql_lexer import TAMANIO_FRAGMENTO, es_significativo, tokenizar
+
+FILAS_PREVIEW = getattr(settings, 'SQL_PREVIEW_FILAS', 25)
+
+# Palabras que inician una restricción o índice dentro de CREATE TABLE (no una columna)
+_RESTRICCIONES = {'PRIMARY', 'KEY', 'UNIQUE', 'INDEX', 'CONSTRAINT', 'FOREIGN', 'CHECK', 'FULLTEXT', 'SPATIAL', 'PERIOD'}
+_MODIFICADORES_TIPO = {'UNSIGNED', 'SIGNED', 'ZEROFILL', 'VARYING', 'PRECISION'}
+
+_CADENA_SIMPLE = r"'[^'\\]*(?:\\.[^'\\]*)*'"
+_CADENA_DOBLE = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+
+_ESPACIOS = re.compile(r'(?:\s+|--[^\n]*\n|#[^\n]*\n|/\*(?!!).*?\*/)*', re.S)
+_IDENT = r'(?:`(?:[^`]|``)+`|\[[^\]]+\]|"[^"]+"|[\w$]+)'
+_CABECERA = re.compile(
+    r'(?:(CREATE)\s+(?:OR\s+REPLACE\s+)?(?:TEMPORARY\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?'
+    r'|(INSERT|REPLACE)\s+(?:(?:LOW_PRIORITY|DELAYED|HIGH_PRIORITY|IGNORE)\s+)*(?:INTO\s+)?'
+    r'|(DELIMITER)[ \t]+(\S+))'
+    rf'({_IDENT}(?:\s*\.\s*{_IDENT})?)?',
+    re.I,
+)
+_VALUES = re.compile(r'\s*(?:\(([^()]*)\)\s*)?VALUES?\b', re.I)
+_TUPLA = re.compile(
+    rf"\((?:[^()'\"]+|{_CADENA_SIMPLE}|{_CADENA_DOBLE}|\((?:[^()'\"]+|{_CADENA_SIMPLE}|{_CADENA_DOBLE})*\))*\)",
+    re.S,
+)
+# Una tupla de VALUES más larga se considera mal formada
+_MAX_TUPLA = 16 * 1024 * 1024
+
+_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+
+def _patron_salto(delimitador):
+    """Regex que avanza sobre texto, cadenas y comentarios hasta el delimitador."""
+    primero = re.escape(delimitador[0])
+    # '-' y '/' sueltos no deben consumir el inicio del delimitador (p.e. '//')
+    fin = f"(?!{re.escape(delimitador)})"
+    partes = [
+        rf"[^'\"`#/\-{primero}]+", _CADENA_SIMPLE, _CADENA_DOBLE, r'`[^`]*`',
+        r'--[^\n]*(?=\n)', r'#[^\n]*(?=\n)', r'/\*.*?\*/', rf'{fin}-(?!-)', rf'{fin}/(?!\*)',
+    ]
+    if len(delimitador) > 1 and delimitador[0] not in '-/':
+        partes.append(rf"{primero}(?!{re.escape(delimitador[1:])})")
+    return re.compile('(?:' + '|'.join(partes) + ')*', re.S)
+
+
+def _nombre(ident):
+    """Nombre sin comillas de un identificador; de esquema.tabla se queda con la tabla."""
+    ultimo = re.findall(_IDENT, ident)[-1]
+    if ultimo[0] in '`["':
+        ultimo = ultimo[1:-1].replace('``', '`')
+    return ultimo
+
+
+def _cadena(valor):
+    """Contenido de un literal entre comillas con los escapes de MySQL resueltos."""
+    comilla = valor[0]
+    return re.sub(
+        r'\\(.)|' + comilla * 2,
+        lambda m: _ESCAPES.get(m.group(1), m.group(1)) if m.group(1) is not None else comilla,
+        valor[1:-1],
+        flags=re.S,
+    )
+
+
+def _partes(tokens):
+    """Divide los tokens entre paréntesis (sin incluirlos) por las comas de primer nivel."""
+    partes = [[]]
+    profundidad = 0
+    for token in tokens:
+        if token.tipo == 'simbolo' and token.valor in '()':
+            profundidad += 1 if token.valor == '(' else -1
+        elif token.tipo == 'simbolo' and token.valor == ',' and profundidad == 0:
+            partes.append([])
+            continue
+        partes[-1].append(token)
+    return [p for p in partes if p]
+
+
+def _contenido_parentesis(tokens):
+    """Tokens significativos dentro del primer paréntesis de nivel superior."""
+    dentro = []
+    profundidad = 0
+    for token in tokens:
+        if not es_significativo(token):
+            continue
+        if token.tipo == 'simbolo' and token.valor == '(':
+            profundidad += 1
+            if profundidad == 1:
+                continue
+        elif token.tipo == 'simbolo' and token.valor == ')':
+            profundidad -= 1
+            if profundidad == 0:
+                return dentro
+        if profundidad:
+            dentro.append(token)
+    return None
+
+
+def _columnas_create(sentencia):
+    """
+    Lista de {'nombre', 'tipo'} de un CREATE TABLE a partir de lo que sigue al
+    nombre de la tabla (vacía si es CREATE ... AS SELECT / LIKE).
+    """
+    tokens = [t for t in tokenizar(sentencia) if es_significativo(t)]
+    if not tokens or tokens[0].valor != '(':
+        return []
+    dentro = _contenido_parentesis(tokens)
+    if not dentro:
+        return []
+    columnas = []
+    for parte in _partes(dentro):
+        primero = parte[0]
+        if primero.tipo == 'palabra' and primero.valor.upper() in _RESTRICCIONES:
+            continue
+        nombre = primero.valor[1:-1] if primero.tipo in ('ident', 'cadena') else primero.valor
+        tipo = []
+        resto = parte[1:]
+        if resto and resto[0].tipo == 'palabra':
+            tipo.append(resto[0].valor)
+            i = 1
+            if i < len(resto) and resto[i].valor == '(':
+                profundidad = 0
+                while i < len(resto):
+                    tipo.append(resto[i].valor)
+                    profundidad += {'(': 1, ')': -1}.get(resto[i].valor, 0)
+                    i += 1
+                    if profundidad == 0:
+                        break
+            while i < len(resto) and resto[i].tipo == 'palabra' and resto[i].valor.upper() in _MODIFICADORES_TIPO:
+                tipo.append(' ' + resto[i].valor)
+                i += 1
+        columnas.append({'nombre': nombre, 'tipo': ''.join(tipo).lower()})
+    return columnas
+
+
+def _valores_tupla(tupla):
+    """Valores de una tupla '(...)' de VALUES: textos, números como texto o None para NULL."""
+    valores = []
+    for parte in _partes(_contenido_parentesis(tokenizar(tupla)) or []):
+        if len(parte) == 1 and parte[0].tipo == 'palabra' and parte[0].valor.upper() == 'NULL':
+            valores.append(None)
+        elif parte[-1].tipo == 'cadena' and (len(parte) == 1 or parte[0].valor.startswith('_')):
+            # 'texto' o _utf8mb4'texto' / _binary'...'
+            valores.append(_cadena(parte[-1].valor))
+        else:
+            valores.append(''.join(t.valor for t in parte))
+    return valores
+
+
+class _Lector:
+    """Buffer sobre el script que se rellena por fragmentos a medida que se consume."""
+
+    def __init__(self, fuente):
+        if isinstance(fuente, str):
+            self._fragmentos = iter([fuente])
+        elif hasattr(fuente, 'read'):
+            self._fragmentos = iter(lambda: fuente.read(TAMANIO_FRAGMENTO), '')
+        else:
+            self._fragmentos = iter(fuente)
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.delimitador = ';'
+        self._salto = _patron_salto(';')
+
+    def leer_mas(self):
+        """Agrega el siguiente fragmento descartando lo ya consumido. False si no quedan."""
+        if self.eof:
+            return False
+        try:
+            fragmento = next(self._fragmentos)
+        except StopIteration:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + fragmento
+        self.pos = 0
+        return True
+
+    def asegurar(self, largo):
+        """Intenta tener al menos 'largo' caracteres sin consumir en el buffer."""
+        while len(self.buf) - self.pos < largo and self.leer_mas():
+            pass
+
+    def cambiar_delimitador(self, delimitador):
+        self.delimitador = delimitador
+        self._salto = _patron_salto(delimitador)
+
+    def saltar_espacios(self):
+        while True:
+            self.pos = _ESPACIOS.match(self.buf, self.pos).end()
+            inicio = self.buf[self.pos:self.pos + 3]
+            # Un comentario cortado por el borde del fragmento queda sin saltar
+            cortado = len(inicio) < 3 or inicio.startswith(('--', '#')) or (inicio[:2] == '/*' and inicio != '/*!')
+            if self.eof or not cortado or not self.leer_mas():
+                return
+
+    def saltar_sentencia(self, guardar=False):
+        """
+        Avanza hasta después del delimitador de la sentencia actual.
+        Retorna el texto de la sentencia si 'guardar', si no None.
+        """
+        partes = [] if guardar else None
+        while True:
+            fin = self._salto.match(self.buf, self.pos).end()
+            if fin == len(self.buf) and not self.eof and fin > self.pos and self.buf[fin - 1] in '-/' + self.delimitador[0]:
+                # Puede ser el inicio de un comentario o del delimitador: revisar con más texto
+                fin -= 1
+            if guardar:
+                partes.append(self.buf[self.pos:fin])
+            self.pos = fin
+            if self.buf.startswith(self.delimitador, fin):
+                self.pos = fin + len(self.delimitador)
+                break
+            if not self.leer_mas():
+                # Fin del script (o cadena sin cerrar): la sentencia termina aquí
+                if guardar:
+                    partes.append(self.buf[self.pos:])
+                self.pos = len(self.buf)
+                break
+        return ''.join(partes) if guardar else None
+
+    def leer_tupla(self):
+        """Texto de la siguiente tupla '(...)' o None si no la hay."""
+        if not self.buf.startswith('(', self.pos):
+            return None
+        while True:
+            m = _TUPLA.match(self.buf, self.pos)
+            if m and (m.end() < len(self.buf) or self.eof):
+                self.pos = m.end()
+                return m.group()
+            # Sin tupla completa: leer más salvo que ya sea demasiado larga para una fila
+            if len(self.buf) - self.pos > _MAX_TUPLA or not self.leer_mas():
+                return None
+
+
+class _Tabla:
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.columnas_info = []
+        self.filas = []
+
+    def completa(self, filas):
+        return bool(self.columnas_info) and len(self.filas) >= filas
+
+    def agregar(self, valores, columnas_insert, filas):
+        if columnas_insert and self.columnas_info:
+            # Ordenar los valores según las columnas del CREATE TABLE
+            por_nombre = dict(zip((c.lower() for c in columnas_insert), valores))
+            valores = [por_nombre.get(c['nombre'].lower()) for c in self.columnas_info]
+        elif not self.columnas_info:
+            nombres = columnas_insert or [f"columna_{i + 1}" for i in range(len(valores))]
+            self.columnas_info = [{'nombre': n, 'tipo': ''} for n in nombres]
+        if len(self.filas) < filas:
+            self.filas.append(valores)
+
+    def resultado(self):
+        columnas = [c['nombre'] for c in self.columnas_info]
+        esquema = []
+        if self.filas:
+            ancho = len(columnas)
+            filas = [(f + [None] * ancho)[:ancho] for f in self.filas]
+            try:
+                esquema = inferir_esquema(pd.DataFrame(filas, columns=columnas, dtype=object))
+            except Exception:
+                esquema = []
+        return {
+            'nombre': self.nombre,
+            'columnas': columnas,
+            'columnas_info': self.columnas_info,
+            'preview': self.filas,
+            'esquema': esquema,
+        }
+
+
+def _leer_insert(lector, tabla, filas):
+    """Lee hasta completar las filas de muestra de la tabla y salta el resto del INSERT."""
+    lector.asegurar(4096)
+    m = _VALUES.match(lector.buf, lector.pos)
+    if not m:
+        # INSERT ... SELECT / SET: sin tuplas que leer
+        lector.saltar_sentencia()
+        return
+    lector.pos = m.end()
+    columnas_insert = [_nombre(c.strip()) for c in m.group(1).split(',')] if m.group(1) else None
+
+    while len(tabla.filas) < filas:
+        lector.saltar_espacios()
+        tupla = lector.leer_tupla()
+        if tupla is None:
+            break
+        tabla.agregar(_valores_tupla(tupla), columnas_insert, filas)
+        lector.saltar_espacios()
+        lector.asegurar(len(lector.delimitador))
+        if lector.buf.startswith(',', lector.pos):
+            lector.pos += 1
+            continue
+        break
+    lector.saltar_sentencia()
+
+
+def previsualizar_script(fuente, filas=None, tablas=None):
+    """
+    Columnas, tipos y filas de muestra de las tablas de un script .sql, sin ejecutarlo.
+
+    Parámetros:
+    - fuente: Texto del script, archivo abierto en modo texto o iterable de strings
+    - filas: Filas de muestra por tabla (por defecto SQL_PREVIEW_FILAS)
+    - tablas: Nombres de las tablas de interés (todas si es None); con tablas
+      concretas la lectura se detiene al completarlas
+
+    Retorna:
+    - Lista, en el orden del script, de dicts con 'nombre', 'columnas',
+      'columnas_info' ({'nombre', 'tipo'} con el tipo declarado), 'preview'
+      (filas como listas; los números llegan como texto) y 'esquema' (tipos
+      inferidos de la muestra, ver esquema.tipar_columna)
+    """
+    filas = FILAS_PREVIEW if filas is None else filas
+    buscadas = {t.lower() for t in tablas} if tablas is not None else None
+    encontradas = {}
+    lector = _Lector(fuente)
+
+    while True:
+        lector.saltar_espacios()
+        lector.asegurar(512)
+        if lector.pos >= len(lector.buf):
+            break
+        if lector.buf.startswith(lector.delimitador, lector.pos):
+            lector.pos += len(lector.delimitador)
+            continue
+
+        m = _CABECERA.match(lector.buf, lector.pos)
+        if not m or not (m.group(5) or m.group(3)):
+            lector.saltar_sentencia()
+            continue
+        if m.group(3):
+            # DELIMITER no lleva terminador: la directiva ocupa la línea
+            lector.pos = m.end(4)
+            lector.cambiar_delimitador(m.group(4))
+            continue
+
+        nombre = _nombre(m.group(5))
+        if buscadas is not None and nombre.lower() not in buscadas:
+            lector.saltar_sentencia()
+            continue
+        tabla = encontradas.setdefault(nombre.lower(), _Tabla(nombre))
+
+        if m.group(1):
+            lector.pos = m.end()
+            sentencia = lector.saltar_sentencia(guardar=True)
+            columnas = _columnas_create(sentencia)
+            if columnas:
+                tabla.columnas_info = columnas
+        elif len(tabla.filas) < filas:
+            lector.pos = m.end()
+            _leer_insert(lector, tabla, filas)
+        else:
+            lector.saltar_sentencia()
+
+        if buscadas is not None and len(encontradas) == len(buscadas) and all(
+                t.completa(filas) for t in encontradas.values()):
+            break
+
+    return [tabla.resultado() for tabla in encontradas.values()]
+
+
+def previsualizar_archivo(ruta, filas=None, tablas=None, encoding='utf-8'):
+    """previsualizar_script leyendo el archivo por fragmentos."""
+    with open(ruta, 'r', encoding=encoding, errors='ignore') as f:
+        return previsualizar_script(f, filas, tablas)
+
+
+def previsualizar_tabla(fuente, tabla, filas=None):
+    """
+    Columnas y filas de muestra de una tabla del script como DataFrame.
+
+    Retorna:
+    - DataFrame (vacío si la tabla no aparece en el script)
+    """
+    resultado = previsualizar_script(fuente, filas, [tabla])
+    if not resultado:
+        return pd.DataFrame()
+    tabla = resultado[0]
+    ancho = len(tabla['columnas'])
+    return pd.DataFrame(
+        [(f + [None] * ancho)[:ancho] for f in tabla['preview']], columns=tabla['columnas'], dtype=object
+    )
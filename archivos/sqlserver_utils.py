@@ -6,9 +6,12 @@ y manejar errores comunes.
 import logging
 from django.conf import settings
 from django.db import connections, OperationalError, InterfaceError
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from contextlib import contextmanager
 from .error_handler import handle_sql_exception, get_friendly_error_message
+from .engines import get_engine
+from .lectura_sql import iterar_consulta
+from .metadatos import tabla_existe
 
 logger = logging.getLogger(__name__)
 
@@ -74,9 +77,9 @@ def test_sqlserver_connection():
             cursor.execute("SELECT @@VERSION")
             version = cursor.fetchone()[0]
             
-        # Crear engine de SQLAlchemy
+        # Engine compartido de SQLAlchemy
         engine_url = get_sqlserver_connection_string()
-        engine = create_engine(engine_url)
+        engine = get_engine(engine_url)
         
         # Probar conexión con SQLAlchemy
         with engine.connect() as conn:
@@ -103,12 +106,11 @@ def sqlalchemy_connection():
         # Procesar resultados...
     """
     engine_url = get_sqlserver_connection_string()
-    engine = None
     connection = None
     
     try:
-        engine = create_engine(engine_url)
-        connection = engine.connect()
+        # La conexión sale del pool del engine compartido
+        connection = get_engine(engine_url).connect()
         yield connection
     except Exception as e:
         # Convertir la excepción a un mensaje amigable (no lanzamos
@@ -118,11 +120,9 @@ def sqlalchemy_connection():
         # Re-lanzar para que el caller pueda manejarla
         raise
     finally:
-        # Cerrar recursos incluso si hay error
+        # Devolver la conexión al pool incluso si hay error
         if connection is not None:
             connection.close()
-        if engine is not None:
-            engine.dispose()
         
 def get_tables_list():
     """
@@ -238,6 +238,61 @@ def execute_query_safe(query, params=None, fetch_all=True, connection=None):
         # para que el caller pueda manejarla apropiadamente
         raise
 
+def read_sql_safe(query, engine_or_conn, params=None, chunk_size=None):
+    """
+    Versión segura de pd.read_sql con manejo de errores mejorado.
+    
+    Parámetros:
+    - query: Consulta SQL (string o objeto SQLAlchemy)
+    - engine_or_conn: Conexión o engine SQLAlchemy
+    - params: Parámetros para la consulta (dict o None)
+    - chunk_size: Tamaño de fragmento para lecturas grandes (None para leer todo); con
+      chunk_size se devuelve un iterador de DataFrames (ver lectura_sql.iterar_consulta)
+    
+    Retorno:
+    - DataFrame de pandas con los resultados o DataFrame vacío en caso de error
+    """
+    import pandas as pd
+    
+    # Convertir a objeto text() si es string
+    if isinstance(query, str):
+        query = text(query)
+    
+    try:
+        if chunk_size:
+            # Lectura por fragmentos en streaming (cursor del lado del servidor)
+            return iterar_consulta(engine_or_conn, query, params=params, tamanio_bloque=chunk_size)
+        else:
+            # Lectura normal
+            return pd.read_sql(query, engine_or_conn, params=params)
+            
+    except Exception as e:
+        logger.error(f"Error en read_sql_safe: {str(e)}")
+        # Crear un DataFrame vacío con mensaje de error
+        return pd.DataFrame({'error': [str(e)]})
+
+def table_exists(table_name, engine=None):
+    """
+    Verifica si una tabla existe en la base de datos.
+    
+    Parámetros:
+    - table_name: Nombre de la tabla a verificar
+    - engine: Engine SQLAlchemy o None (se usa el engine compartido de settings)
+    
+    Retorno:
+    - True si la tabla existe, False en caso contrario
+    
+    El resultado se guarda unos segundos (ver archivos/metadatos.py); para
+    varias tablas usar metadatos.tablas_existentes, que hace una sola consulta.
+    """
+    try:
+        if engine is None:
+            engine = get_engine(get_sqlserver_connection_string())
+        return tabla_existe(engine, table_name)
+    except Exception as e:
+        logger.error(f"Error verificando si existe la tabla {table_name}: {str(e)}")
+        return False
+
 def check_sqlserver_service_status():
     """
     Comprueba el estado del servicio de SQL Server en Windows.
@@ -0,0 +1,169 @@
+"""
+Área de preparación (staging) en disco para archivos subidos
+
+Los archivos subidos se escriben por fragmentos en STAGING_DIR con su hash
+SHA-256 como nombre (direccionamiento por contenido). En la sesión solo se
+guarda ese identificador, y los pasos siguientes leen o copian desde disco
+sin tener los bytes en memoria.
+
+Los DataFrames ya parseados que deben sobrevivir entre peticiones (p.e. entre
+la vista previa y el guardado de un archivo local) se vuelcan en el mismo
+directorio en formato Feather, o pickle si Arrow no admite el contenido.
+
+Los archivos que no se usan durante STAGING_TTL_SEGUNDOS se eliminan; la
+limpieza se ejecuta como mucho una vez cada LIMPIEZA_CADA_SEGUNDOS al guardar.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = Path(getattr(settings, 'STAGING_DIR', Path(settings.BASE_DIR) / 'staging'))
+STAGING_TTL_SEGUNDOS = getattr(settings, 'STAGING_TTL_SEGUNDOS', 6 * 3600)
+LIMPIEZA_CADA_SEGUNDOS = 600
+
+_ID_VALIDO = re.compile(r'^[0-9a-f]{64}$')
+_ID_VOLCADO = re.compile(r'^[0-9a-f]{32}$')
+_EXTENSIONES_VOLCADO = ('.feather', '.pkl')
+_ultima_limpieza = 0.0
+
+
+def guardar_subida(archivo):
+    """
+    Guarda un UploadedFile de Django en el área de staging.
+
+    Retorna:
+    - Identificador (hash SHA-256 del contenido) para guardar en la sesión
+    """
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    temporal = STAGING_DIR / f".{uuid.uuid4().hex}.tmp"
+    sha = hashlib.sha256()
+    try:
+        with open(temporal, 'wb') as destino:
+            for fragmento in archivo.chunks():
+                sha.update(fragmento)
+                destino.write(fragmento)
+        staging_id = sha.hexdigest()
+        final = STAGING_DIR / staging_id
+        if final.exists():
+            # Mismo contenido ya preparado: renovar su vigencia
+            os.utime(final)
+        else:
+            os.replace(temporal, final)
+    finally:
+        if temporal.exists():
+            temporal.unlink()
+
+    _limpiar_si_corresponde()
+    return staging_id
+
+
+def ruta(staging_id):
+    """
+    Ruta en disco de un archivo preparado.
+    Lanza FileNotFoundError si el identificador no es válido o el archivo expiró.
+    """
+    if not staging_id or not _ID_VALIDO.match(staging_id):
+        raise FileNotFoundError(f"Identificador de staging inválido: {staging_id!r}")
+    path = STAGING_DIR / staging_id
+    if not path.exists():
+        raise FileNotFoundError("El archivo preparado ya no está disponible. Vuelve a subirlo.")
+    return path
+
+
+def copiar_a(staging_id, ruta_destino):
+    """Copia por fragmentos el archivo preparado a su destino final."""
+    with open(ruta(staging_id), 'rb') as origen, open(ruta_destino, 'wb') as destino:
+        shutil.copyfileobj(origen, destino, 1024 * 1024)
+
+
+def guardar_dataframe(df):
+    """
+    Vuelca un DataFrame al área de staging.
+
+    Retorna:
+    - Identificador del volcado para guardar en la sesión
+    """
+    STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    volcado_id = uuid.uuid4().hex
+    df = df.reset_index(drop=True)
+    destino = STAGING_DIR / f"{volcado_id}.feather"
+    try:
+        df.to_feather(destino)
+    except Exception as e:
+        # Nombres de columna no textuales, tipos mixtos o pyarrow no instalado
+        logger.debug(f"Volcado Feather no disponible ({e}); se usa pickle")
+        if destino.exists():
+            destino.unlink()
+        destino = destino.with_suffix('.pkl')
+        df.to_pickle(destino)
+
+    _limpiar_si_corresponde()
+    return volcado_id
+
+
+def _ruta_volcado(volcado_id):
+    if not volcado_id or not _ID_VOLCADO.match(volcado_id):
+        raise FileNotFoundError(f"Identificador de volcado inválido: {volcado_id!r}")
+    for extension in _EXTENSIONES_VOLCADO:
+        path = STAGING_DIR / f"{volcado_id}{extension}"
+        if path.exists():
+            return path
+    raise FileNotFoundError("Los datos procesados ya no están disponibles. Vuelve a subir el archivo.")
+
+
+def leer_dataframe(volcado_id):
+    """Lee un DataFrame volcado con guardar_dataframe."""
+    path = _ruta_volcado(volcado_id)
+    if path.suffix == '.feather':
+        return pd.read_feather(path)
+    return pd.read_pickle(path)
+
+
+def eliminar_dataframe(volcado_id):
+    """Elimina un volcado; no falla si ya no existe."""
+    try:
+        _ruta_volcado(volcado_id).unlink()
+    except (FileNotFoundError, OSError):
+        pass
+
+
+def limpiar_vencidos(ttl=None):
+    """
+    Elimina los archivos de staging sin uso durante más de `ttl` segundos.
+
+    Retorna:
+    - Número de archivos eliminados
+    """
+    ttl = STAGING_TTL_SEGUNDOS if ttl is None else ttl
+    if not STAGING_DIR.exists():
+        return 0
+    limite = time.time() - ttl
+    eliminados = 0
+    for path in STAGING_DIR.iterdir():
+        try:
+            if path.is_file() and path.stat().st_mtime < limite:
+                path.unlink()
+                eliminados += 1
+        except OSError:
+            continue
+    if eliminados:
+        logger.info(f"Staging: {eliminados} archivo(s) vencido(s) eliminado(s)")
+    return eliminados
+
+
+def _limpiar_si_corresponde():
+    global _ultima_limpieza
+    ahora = time.time()
+    if ahora - _ultima_limpieza >= LIMPIEZA_CADA_SEGUNDOS:
+        _ultima_limpieza = ahora
+        limpiar_vencidos()
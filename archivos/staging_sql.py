@@ -0,0 +1,257 @@
+"""
+Esquema de preparación (staging) para los scripts .sql del asistente
+
+Para copiar tablas de un script .sql con columnas y filas elegidas, el script
+se importa una sola vez en un esquema propio de la sesión (__stg_<epoch>_<id>)
+y el guardado lee de allí las veces que haga falta. Solo se ejecutan los
+CREATE TABLE e INSERT del script, reescritos hacia ese esquema: un DROP TABLE
+o cualquier otra sentencia del volcado nunca toca las tablas reales. En SQL
+Server el script se convierte antes con mysql_to_sqlserver.
+
+En la sesión se guarda un registro (dict serializable) con el esquema, la
+huella del script y la URL de destino; si el script o la conexión cambian se
+prepara de nuevo. El esquema se elimina al reiniciar o terminar el asistente
+y, si la sesión se abandona, al vencer STAGING_SQL_TTL_SEGUNDOS (la fecha de
+creación va en el nombre, la base de datos hace de registro).
+
+Los motores sin esquemas (SQLite) usan el mismo nombre como prefijo de tabla.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from sqlalchemy import inspect, text
+
+from .engines import normalizar_url
+from .lectura_sql import leer_consulta
+from .mysql_to_sqlserver import execute_sqlserver_script, iter_convert_mysql_to_sqlserver
+from .sql_lexer import iter_sentencias_texto
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = '__stg_'
+TTL = getattr(settings, 'STAGING_SQL_TTL_SEGUNDOS', 3600)
+LIMPIEZA_CADA_SEGUNDOS = 600
+
+_NOMBRE_STAGING = re.compile(r'^__stg_(\d+)_[0-9a-f]{8}')
+_IDENT = r'(?:`[^`]+`|\[[^\]]+\]|"[^"]+"|[\w$]+)'
+_SENTENCIA = re.compile(
+    rf'^(CREATE\s+TABLE|INSERT\s+(?:IGNORE\s+)?INTO)\s+(?:IF\s+NOT\s+EXISTS\s+)?({_IDENT}(?:\s*\.\s*{_IDENT})?)',
+    re.I,
+)
+# En staging no hace falta el autoincremento y con él fallarían los INSERT con id explícito
+_IDENTITY = re.compile(r'\s+IDENTITY\s*\(\s*\d+\s*,\s*\d+\s*\)', re.I)
+
+_ultima_limpieza = 0.0
+_lock = threading.Lock()
+
+
+def huella(script=None, ruta=None):
+    """Identifica el script: hash del texto o ruta, tamaño y fecha de modificación del archivo."""
+    if script:
+        return hashlib.sha256(script.encode('utf-8', errors='ignore')).hexdigest()
+    estado = os.stat(ruta)
+    return hashlib.sha256(f"{os.path.abspath(ruta)}|{estado.st_size}|{estado.st_mtime_ns}".encode()).hexdigest()
+
+
+def _usa_esquemas(engine):
+    return engine.dialect.name == 'mssql'
+
+
+def _nombre_tabla(tabla):
+    """Nombre sin comillas; de esquema.tabla se queda con la tabla."""
+    ultimo = re.findall(_IDENT, tabla)[-1]
+    return ultimo[1:-1] if ultimo[0] in '`["' else ultimo
+
+
+def tabla_sql(engine, registro, tabla):
+    """
+    Referencia SQL de una tabla del script dentro del staging.
+
+    El nombre se cita tal cual ('a-b' y 'ab' son tablas distintas, 'año' se
+    conserva); en SQL Server siempre entre corchetes, como los INSERT que
+    execute_sqlserver_script pliega en executemany.
+    """
+    quote = engine.dialect.identifier_preparer.quote_identifier
+    if _usa_esquemas(engine):
+        return f"{quote(registro['esquema'])}.{quote(tabla)}"
+    return quote(f"{registro['esquema']}_{tabla}")
+
+
+def _sentencias(engine, fuente):
+    """Sentencias del script en el dialecto del destino."""
+    if engine.dialect.name == 'mssql':
+        for sentencia in iter_convert_mysql_to_sqlserver(fuente):
+            yield sentencia.rstrip().rstrip(';')
+    else:
+        yield from iter_sentencias_texto(fuente)
+
+
+def _reescribir(engine, fuente, registro):
+    """CREATE TABLE / INSERT del script reescritos hacia el staging; las demás sentencias se omiten."""
+    for sentencia in _sentencias(engine, fuente):
+        m = _SENTENCIA.match(sentencia)
+        if not m:
+            continue
+        es_create = m.group(1).upper().startswith('CREATE')
+        destino = tabla_sql(engine, registro, _nombre_tabla(m.group(2)))
+        sentencia = f"{'CREATE TABLE' if es_create else 'INSERT INTO'} {destino}{sentencia[m.end():]}"
+        yield _IDENTITY.sub('', sentencia) if es_create else sentencia
+
+
+def _tablas_creadas(engine, esquema):
+    """Nombres (tal como están en el script) de las tablas creadas en el staging."""
+    inspector = inspect(engine)
+    if _usa_esquemas(engine):
+        return inspector.get_table_names(schema=esquema)
+    prefijo = f"{esquema}_"
+    return [t[len(prefijo):] for t in inspector.get_table_names() if t.startswith(prefijo)]
+
+
+def _crear(engine, fuente, esquema):
+    """
+    Crea el esquema y ejecuta en él los CREATE TABLE / INSERT del script.
+
+    Las sentencias pasan por execute_sqlserver_script en modo 'lotes': los
+    INSERT de una fila que deja la conversión se agrupan en executemany en
+    lugar de un viaje a la base por fila.
+    """
+    registro = {'esquema': esquema, 'tablas': [], 'errores': 0}
+    if _usa_esquemas(engine):
+        with engine.begin() as conn:
+            conn.execute(text(f"EXEC('CREATE SCHEMA [{esquema}]')"))
+    resultados = execute_sqlserver_script(engine, _reescribir(engine, fuente, registro), modo='lotes')
+    registro['tablas'] = _tablas_creadas(engine, esquema)
+    registro['errores'] = len(resultados['errors'])
+    return registro
+
+
+def _existe(engine, registro):
+    if _usa_esquemas(engine):
+        with engine.connect() as conn:
+            return bool(conn.execute(text("SELECT 1 FROM sys.schemas WHERE name = :n"),
+                                     {'n': registro['esquema']}).scalar())
+    prefijo = f"{registro['esquema']}_"
+    tablas = [t for t in inspect(engine).get_table_names() if t.startswith(prefijo)]
+    return len(tablas) >= len(registro['tablas'])
+
+
+def preparar(engine, script=None, ruta=None, registro=None):
+    """
+    Importa el script en un esquema de staging, o reutiliza el de la sesión.
+
+    Parámetros:
+    - engine: Engine de destino
+    - script / ruta: Texto del script o ruta del archivo (se lee por fragmentos)
+    - registro: Registro guardado en la sesión por una llamada anterior, o None
+
+    Retorna:
+    - Registro (dict serializable) con 'esquema', 'huella', 'url', 'creado',
+      'tablas' (creadas en staging) y 'errores' (sentencias que fallaron);
+      debe guardarse en la sesión
+    """
+    firma = huella(script, ruta)
+    url = normalizar_url(engine.url)
+    if registro and registro.get('huella') == firma and registro.get('url') == url:
+        if time.time() - registro['creado'] < TTL and _existe(engine, registro):
+            return registro
+    if registro:
+        eliminar(engine, registro)
+    limpiar_vencidos(engine)
+
+    creado = int(time.time())
+    esquema = f"{PREFIJO}{creado}_{uuid.uuid4().hex[:8]}"
+    inicio = time.perf_counter()
+    try:
+        if script:
+            nuevo = _crear(engine, script, esquema)
+        else:
+            with open(ruta, 'r', encoding='utf-8', errors='ignore') as f:
+                nuevo = _crear(engine, f, esquema)
+    except Exception:
+        eliminar(engine, {'esquema': esquema})
+        raise
+    nuevo.update({'huella': firma, 'url': url, 'creado': creado})
+    logger.info(f"Staging {esquema}: {len(nuevo['tablas'])} tabla(s) en {time.perf_counter() - inicio:.1f}s, "
+                f"{nuevo['errores']} sentencia(s) con error")
+    return nuevo
+
+
+def leer(engine, registro, tabla, columnas=None, filas=None):
+    """
+    DataFrame con una tabla del staging.
+
+    Parámetros:
+    - columnas: Columnas a leer (todas si es None)
+    - filas: Máximo de filas (todas si es None)
+    """
+    quote = engine.dialect.identifier_preparer.quote
+    select = ", ".join(quote(c) for c in columnas) if columnas else '*'
+    origen = tabla_sql(engine, registro, tabla)
+    if filas is None:
+        consulta = f"SELECT {select} FROM {origen}"
+    elif engine.dialect.name == 'mssql':
+        consulta = f"SELECT TOP {int(filas)} {select} FROM {origen}"
+    else:
+        consulta = f"SELECT {select} FROM {origen} LIMIT {int(filas)}"
+    return leer_consulta(engine, consulta)
+
+
+def _eliminar_esquema(engine, esquema):
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        if _usa_esquemas(engine):
+            tablas = [r[0] for r in conn.execute(
+                text("SELECT name FROM sys.tables WHERE schema_id = SCHEMA_ID(:n)"), {'n': esquema})]
+            for tabla in tablas:
+                conn.execute(text(f"DROP TABLE {quote(esquema)}.{quote(tabla)}"))
+            conn.execute(text(f"IF SCHEMA_ID('{esquema}') IS NOT NULL EXEC('DROP SCHEMA [{esquema}]')"))
+        else:
+            prefijo = f"{esquema}_"
+            for tabla in inspect(conn).get_table_names():
+                if tabla.startswith(prefijo):
+                    conn.execute(text(f"DROP TABLE {quote(tabla)}"))
+
+
+def eliminar(engine, registro):
+    """Elimina el esquema de staging de un registro (no falla si ya no existe)."""
+    if not registro or not _NOMBRE_STAGING.match(registro.get('esquema', '')):
+        return
+    try:
+        _eliminar_esquema(engine, registro['esquema'])
+    except Exception as e:
+        logger.warning(f"No se pudo eliminar el staging {registro['esquema']}: {e}")
+
+
+def limpiar_vencidos(engine, forzar=False):
+    """Elimina los esquemas de staging de más de STAGING_SQL_TTL_SEGUNDOS (como mucho cada 10 minutos)."""
+    global _ultima_limpieza
+    with _lock:
+        if not forzar and time.time() - _ultima_limpieza < LIMPIEZA_CADA_SEGUNDOS:
+            return
+        _ultima_limpieza = time.time()
+
+    try:
+        if _usa_esquemas(engine):
+            with engine.connect() as conn:
+                nombres = [r[0] for r in conn.execute(
+                    text(r"SELECT name FROM sys.schemas WHERE name LIKE '\_\_stg\_%' ESCAPE '\'"))]
+        else:
+            nombres = inspect(engine).get_table_names()
+    except Exception as e:
+        logger.warning(f"No se pudieron listar los esquemas de staging: {e}")
+        return
+
+    limite = time.time() - TTL
+    vencidos = set()
+    for nombre in nombres:
+        m = _NOMBRE_STAGING.match(nombre)
+        if m and int(m.group(1)) < limite:
+            vencidos.add(m.group(0))
+    for esquema in vencidos:
+        eliminar(engine, {'esquema': esquema})
@@ -0,0 +1,164 @@
+/*
+ * Tabla virtual para las vistas previas en JSON por columnas (archivos/vista_previa.py).
+ *
+ * Uso en plantillas:
+ *   <script type="application/json" id="preview-datos">{{ preview|vista_previa_json }}</script>
+ *   <div class="table-responsive" style="max-height: 400px; overflow-y: auto;"
+ *        data-vista-previa="preview-datos" data-numerar data-nulo="No Existe"></div>
+ *
+ * Solo se crean las filas visibles del contenedor (más un margen); al hacer
+ * scroll se reemplazan y filas vacías ocupan el alto del resto.
+ */
+(function () {
+  'use strict';
+
+  var MARGEN = 10;          // Filas dibujadas por encima y por debajo de las visibles
+  var ALTO_INICIAL = 29;    // Alto estimado de una fila table-sm (px) hasta medirla
+
+  var ESTILO = '.vista-previa td{white-space:nowrap;max-width:24em;overflow:hidden;text-overflow:ellipsis}';
+
+  function agregarEstilo() {
+    if (document.getElementById('vista-previa-estilo')) {
+      return;
+    }
+    var estilo = document.createElement('style');
+    estilo.id = 'vista-previa-estilo';
+    estilo.textContent = ESTILO;
+    document.head.appendChild(estilo);
+  }
+
+  function espaciador(columnas, alto) {
+    var tr = document.createElement('tr');
+    var td = document.createElement('td');
+    td.colSpan = columnas;
+    td.style.cssText = 'height:' + alto + 'px;padding:0;border:0';
+    tr.appendChild(td);
+    return tr;
+  }
+
+  function dibujar(contenedor, datos, opciones) {
+    opciones = opciones || {};
+    var nulo = opciones.nulo != null ? opciones.nulo : '';
+    var numerar = !!opciones.numerar;
+    var columnas = datos.columnas || [];
+    var valores = datos.valores || [];
+    var total = datos.filas || 0;
+    var anchoTotal = columnas.length + (numerar ? 1 : 0);
+    var altoFila = ALTO_INICIAL;
+    var medido = false;
+    agregarEstilo();
+
+    var tabla = document.createElement('table');
+    tabla.className = opciones.clase || 'table table-sm table-striped table-hover vista-previa';
+    var thead = tabla.createTHead();
+    var encabezado = thead.insertRow();
+    if (numerar) {
+      var thNumero = document.createElement('th');
+      thNumero.textContent = '#';
+      thNumero.className = 'text-muted';
+      encabezado.appendChild(thNumero);
+    }
+    columnas.forEach(function (nombre) {
+      var th = document.createElement('th');
+      th.textContent = nombre;
+      encabezado.appendChild(th);
+    });
+    var tbody = tabla.createTBody();
+    contenedor.replaceChildren(tabla);
+
+    var desde = -1;
+    var hasta = -1;
+
+    function actualizar() {
+      var visibles = Math.ceil((contenedor.clientHeight || 600) / altoFila);
+      var inicio = Math.max(0, Math.floor(contenedor.scrollTop / altoFila) - MARGEN);
+      // Inicio par: las filas rayadas no cambian de color al hacer scroll
+      inicio -= inicio % 2;
+      var fin = Math.min(total, inicio + visibles + 2 * MARGEN);
+      if (inicio === desde && fin === hasta) {
+        return;
+      }
+      desde = inicio;
+      hasta = fin;
+
+      var fragmento = document.createDocumentFragment();
+      if (inicio > 0) {
+        fragmento.appendChild(espaciador(anchoTotal, inicio * altoFila));
+        // Mantiene la paridad de :nth-of-type para table-striped
+        fragmento.appendChild(espaciador(anchoTotal, 0));
+      }
+      for (var i = inicio; i < fin; i++) {
+        var tr = document.createElement('tr');
+        if (numerar) {
+          var tdNumero = document.createElement('td');
+          tdNumero.textContent = i + 1;
+          tdNumero.className = 'text-muted small';
+          tr.appendChild(tdNumero);
+        }
+        for (var c = 0; c < columnas.length; c++) {
+          var td = document.createElement('td');
+          var valor = valores[c][i];
+          if (valor === null || valor === undefined) {
+            td.textContent = nulo;
+            td.className = 'text-muted';
+          } else {
+            td.textContent = valor;
+            td.title = valor;
+          }
+          tr.appendChild(td);
+        }
+        fragmento.appendChild(tr);
+      }
+      if (fin < total) {
+        fragmento.appendChild(espaciador(anchoTotal, (total - fin) * altoFila));
+      }
+      tbody.replaceChildren(fragmento);
+
+      // La primera vez que el contenedor está visible se mide el alto real de una fila
+      var celda = medido ? null : tbody.querySelector('td:not([colspan])');
+      if (celda && celda.parentNode.offsetHeight) {
+        medido = true;
+        if (celda.parentNode.offsetHeight !== altoFila) {
+          altoFila = celda.parentNode.offsetHeight;
+          desde = hasta = -1;
+          actualizar();
+        }
+      }
+    }
+
+    var pendiente = false;
+    contenedor.addEventListener('scroll', function () {
+      if (!pendiente) {
+        pendiente = true;
+        requestAnimationFrame(function () {
+          pendiente = false;
+          actualizar();
+        });
+      }
+    }, { passive: true });
+    actualizar();
+
+    if (datos.recortados) {
+      contenedor.setAttribute('title', datos.recortados + ' valor(es) recortado(s) en la vista previa');
+    }
+    return { actualizar: actualizar };
+  }
+
+  function iniciar(raiz) {
+    (raiz || document).querySelectorAll('[data-vista-previa]').forEach(function (elemento) {
+      var fuente = document.getElementById(elemento.dataset.vistaPrevia);
+      if (!fuente) {
+        return;
+      }
+      dibujar(elemento, JSON.parse(fuente.textContent), {
+        numerar: elemento.hasAttribute('data-numerar'),
+        nulo: elemento.dataset.nulo
+      });
+    });
+  }
+
+  window.VistaPrevia = { dibujar: dibujar, iniciar: iniciar };
+  document.addEventListener('DOMContentLoaded', function () {
+    iniciar();
+  });
+})();
@@ -1,5 +1,7 @@
 from django import template
 
+from ..vista_previa import para_plantilla
+
 register = template.Library()
 
 @register.filter
@@ -12,4 +14,9 @@ def split(value, separator):
 @register.filter  
 def get_item(dictionary, key):
     """Obtiene un item de un diccionario"""
-    return dictionary.get(key)
\ No newline at end of file
+    return dictionary.get(key)
+
+@register.filter
+def vista_previa_json(datos):
+    """Vista previa por columnas en JSON, para un <script type="application/json">"""
+    return para_plantilla(datos)
\ No newline at end of file
@@ -1,3 +1,343 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from openpyxl import Workbook, load_workbook
+from sqlalchemy import create_engine, text
+
+from . import carga_paralela, division_hojas, metadatos, navegador, procesos, staging, staging_sql
+from .sql_lexer import iter_sentencias_texto
+from .sql_preview import previsualizar_script
+from .models import CarpetaCompartida, ProcessConfig, ProcessRunLog
+
+DATOS = Path(__file__).resolve().parent / 'testdata'
+
+
+class SubidaExcelTests(TestCase):
+    """
+    Subida de libros Excel desde seleccionar_archivos_para_subir.
+    En staging los archivos se guardan sin extensión (su hash como nombre),
+    de modo que el formato debe detectarse por el contenido.
+    """
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        parche = mock.patch.object(staging, 'STAGING_DIR', Path(directorio))
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.carpeta = CarpetaCompartida.objects.create(nombre='Pruebas', ruta=directorio)
+
+    def _subir(self, nombre, contenido):
+        url = reverse('seleccionar_archivos_para_subir', args=[self.carpeta.id])
+        archivo = SimpleUploadedFile(nombre, contenido)
+        return self.client.post(url, {'archivo': [archivo]})
+
+    def _procesado(self, respuesta):
+        self.assertRedirects(respuesta, reverse('confirmar_archivos_subir'), fetch_redirect_response=False)
+        archivos = self.client.session['archivos_para_subir']
+        self.assertEqual(len(archivos), 1)
+        return archivos[0]
+
+    def test_subida_xlsx(self):
+        libro = Workbook()
+        hoja = libro.active
+        hoja.title = 'Ventas'
+        for fila in [('producto', 'cantidad'), ('lápiz', 3), ('cuaderno', 5)]:
+            hoja.append(fila)
+        libro.create_sheet('Resumen').append(('total',))
+        contenido = BytesIO()
+        libro.save(contenido)
+
+        archivo = self._procesado(self._subir('ventas.xlsx', contenido.getvalue()))
+        self.assertEqual(archivo['tipo'], 'excel')
+        self.assertEqual(archivo['hojas'], ['Ventas', 'Resumen'])
+        self.assertEqual(archivo['filas'], 2)
+        self.assertEqual(archivo['columnas_nombres'], ['producto', 'cantidad'])
+
+    def test_subida_xls(self):
+        contenido = (DATOS / 'libro.xls').read_bytes()
+
+        archivo = self._procesado(self._subir('ventas.xls', contenido))
+        self.assertEqual(archivo['tipo'], 'excel')
+        self.assertEqual(archivo['hojas'], ['Ventas', 'Resumen'])
+        self.assertEqual(archivo['filas'], 2)
+        self.assertEqual(archivo['columnas_nombres'], ['producto', 'cantidad'])
+
+    def test_confirmar_divide_hojas_xls(self):
+        self._procesado(self._subir('ventas.xls', (DATOS / 'libro.xls').read_bytes()))
+
+        with mock.patch.object(division_hojas, 'MEDIR_MEMORIA', True):
+            respuesta = self.client.post(reverse('confirmar_archivos_subir'),
+                                         {'archivo_seleccionado': ['archivo_0'], 'hojas_0': ['Ventas']})
+        self.assertRedirects(respuesta, reverse('listar_archivos', args=[self.carpeta.id]),
+                             fetch_redirect_response=False)
+        libro = load_workbook(Path(self.carpeta.ruta) / 'ventas_Ventas.xlsx', read_only=True)
+        filas = list(libro['Ventas'].values)
+        libro.close()
+        self.assertEqual(filas[0], ('producto', 'cantidad'))
+        self.assertEqual(len(filas), 3)
+        mensajes = [str(m) for m in get_messages(respuesta.wsgi_request)]
+        self.assertTrue(any('pico de memoria' in m for m in mensajes), mensajes)
+
+
+class NavegadorTests(SimpleTestCase):
+    """Paginación de tablas con navegador.pagina_tabla sobre SQLite."""
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        self.engine = create_engine(f"sqlite:///{Path(directorio) / 'datos.db'}")
+        self.addCleanup(self.engine.dispose)
+        self.addCleanup(metadatos.invalidar)
+        with self.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE "Años" (id INTEGER PRIMARY KEY, "año" INTEGER NOT NULL, "mes-día" TEXT)'))
+            conn.execute(text('INSERT INTO "Años" VALUES (:id, :anio, :dia)'),
+                         [{'id': i, 'anio': 2000 + i % 3, 'dia': f'{i:02d}'} for i in range(1, 11)])
+
+    def _recorrer(self, **opciones):
+        paginas = []
+        cursor = None
+        while True:
+            pagina = navegador.pagina_tabla(self.engine, 'años', cursor=cursor, **opciones)
+            paginas.append(pagina)
+            cursor = pagina['siguiente']
+            if cursor is None:
+                return paginas
+
+    def test_nombres_no_ascii(self):
+        pagina = navegador.pagina_tabla(self.engine, 'AÑOS', columnas=['AÑO', 'mes-día'], tamanio=3)
+        self.assertEqual(pagina['tabla'], 'Años')
+        self.assertEqual(pagina['columnas'], ['año', 'mes-día'])
+        self.assertEqual(pagina['valores'], [[2001, 2002, 2000], ['01', '02', '03']])
+        self.assertEqual(pagina['total'], 10)
+
+    def test_nombres_desconocidos(self):
+        with self.assertRaisesMessage(ValueError, 'La tabla [aos] no existe'):
+            navegador.pagina_tabla(self.engine, 'aos')
+        with self.assertRaisesMessage(ValueError, 'Columna desconocida: ano'):
+            navegador.pagina_tabla(self.engine, 'años', columnas=['ano'])
+        with self.assertRaisesMessage(ValueError, 'Columna desconocida'):
+            navegador.pagina_tabla(self.engine, 'años', orden=[('"año"; DROP TABLE x', False)])
+
+    def test_keyset_recorre_todas_las_filas(self):
+        paginas = self._recorrer(columnas=['mes-día'], orden=[('año', True)], tamanio=4)
+        self.assertEqual([p['plan'] for p in paginas], ['keyset'] * 3)
+        self.assertEqual([p['filas'] for p in paginas], [4, 4, 2])
+        # Orden por año descendente con la clave (también descendente) como desempate
+        dias = [d for p in paginas for d in p['valores'][0]]
+        self.assertEqual(dias, ['08', '05', '02', '10', '07', '04', '01', '09', '06', '03'])
+
+    def test_offset_con_columnas_nulables(self):
+        paginas = self._recorrer(orden=[('mes-día', False)], tamanio=4)
+        self.assertEqual({p['plan'] for p in paginas}, {'offset'})
+        self.assertEqual([d for p in paginas for d in p['valores'][0]], list(range(1, 11)))
+
+    def test_filtros(self):
+        pagina = navegador.pagina_tabla(self.engine, 'años', columnas=['id'], contar=True,
+                                        filtros=[navegador.parsear_filtro('AÑO:eq:2001')])
+        self.assertEqual(pagina['valores'], [[1, 4, 7, 10]])
+        self.assertEqual(pagina['total'], 4)
+
+
+class SqlPreviewTests(SimpleTestCase):
+    """Vista previa de scripts .sql con sql_preview.previsualizar_script."""
+
+    SCRIPT = (
+        "-- Volcado de prueba\n"
+        "CREATE TABLE `clientes` (\n"
+        "  `id` int(11) NOT NULL AUTO_INCREMENT,\n"
+        "  `nombre` varchar(50) DEFAULT NULL,\n"
+        "  `saldo` decimal(10,2) unsigned,\n"
+        "  PRIMARY KEY (`id`)\n"
+        ") ENGINE=InnoDB;\n"
+        "/* comentario; con punto y coma */\n"
+        "INSERT INTO `clientes` VALUES (1,'Ana; O\\'Brien',10.50),(2,NULL,-3),(3,'a/b--c',0);\n"
+        "INSERT INTO `clientes` (`saldo`, `id`) VALUES (7,4);\n"
+        "DELIMITER {d}\n"
+        "CREATE PROCEDURE total() BEGIN SELECT 1/2; SELECT 3-1; END{d}\n"
+        "DELIMITER ;\n"
+        "CREATE TABLE pedidos (id INT, cliente_id INT);\n"
+        "INSERT INTO pedidos VALUES (1,1),(2,(SELECT 2));\n"
+    )
+
+    def _fragmentos(self, texto, largo):
+        return iter([texto[i:i + largo] for i in range(0, len(texto), largo)])
+
+    def _comprobar(self, resultado):
+        self.assertEqual([t['nombre'] for t in resultado], ['clientes', 'pedidos'])
+        clientes, pedidos = resultado
+        self.assertEqual(clientes['columnas_info'], [
+            {'nombre': 'id', 'tipo': 'int(11)'},
+            {'nombre': 'nombre', 'tipo': 'varchar(50)'},
+            {'nombre': 'saldo', 'tipo': 'decimal(10,2) unsigned'},
+        ])
+        self.assertEqual(clientes['preview'], [
+            ['1', "Ana; O'Brien", '10.50'], ['2', None, '-3'], ['3', 'a/b--c', '0'], ['4', None, '7'],
+        ])
+        self.assertEqual(pedidos['preview'], [['1', '1'], ['2', '(SELECT2)']])
+
+    def test_delimitadores(self):
+        for delimitador in ('//', '$$', ';;'):
+            with self.subTest(delimitador=delimitador):
+                self._comprobar(previsualizar_script(self.SCRIPT.format(d=delimitador)))
+
+    def test_fragmentos(self):
+        # Sentencias, cadenas, comentarios y delimitadores cortados en cualquier punto
+        for delimitador in ('//', '$$'):
+            script = self.SCRIPT.format(d=delimitador)
+            for largo in (1, 2, 3, 7, 64):
+                with self.subTest(delimitador=delimitador, largo=largo):
+                    self._comprobar(previsualizar_script(self._fragmentos(script, largo)))
+
+    def test_filas_y_tablas(self):
+        script = self.SCRIPT.format(d='//')
+        resultado = previsualizar_script(self._fragmentos(script, 5), filas=2, tablas=['CLIENTES'])
+        self.assertEqual([t['nombre'] for t in resultado], ['clientes'])
+        self.assertEqual(resultado[0]['preview'], [['1', "Ana; O'Brien", '10.50'], ['2', None, '-3']])
+
+    def test_insert_sin_create(self):
+        resultado = previsualizar_script("INSERT INTO t (a, b) VALUES ('x', 1);")
+        self.assertEqual(resultado[0]['columnas'], ['a', 'b'])
+        self.assertEqual(resultado[0]['preview'], [['x', '1']])
+
+
+class SqlLexerTests(SimpleTestCase):
+    """División de scripts en sentencias con sql_lexer.iter_sentencias_texto."""
+
+    SCRIPT = (
+        "CREATE TABLE t (a TEXT);\n"
+        "INSERT INTO t VALUES ('x;y'),('z\\'w'),(\"--\");\n"
+        "/* c; */ -- otro;\n"
+        "DELIMITER //\n"
+        "CREATE PROCEDURE p() BEGIN SELECT 1/2; SELECT 3-1; END//\n"
+        "DELIMITER ;\n"
+        "SELECT 1;"
+    )
+    SENTENCIAS = [
+        'CREATE TABLE t (a TEXT)',
+        "INSERT INTO t VALUES ('x;y'),('z\\'w'),(\"--\")",
+        'CREATE PROCEDURE p() BEGIN SELECT 1/2; SELECT 3-1; END',
+        'SELECT 1',
+    ]
+
+    def test_sentencias(self):
+        self.assertEqual(list(iter_sentencias_texto(self.SCRIPT)), self.SENTENCIAS)
+
+    def test_fragmentos(self):
+        for largo in (1, 2, 3, 7):
+            with self.subTest(largo=largo):
+                fragmentos = iter([self.SCRIPT[i:i + largo] for i in range(0, len(self.SCRIPT), largo)])
+                self.assertEqual(list(iter_sentencias_texto(fragmentos)), self.SENTENCIAS)
+
+
+class StagingSqlTests(SimpleTestCase):
+    """Importación de scripts .sql en el staging de la sesión (SQLite)."""
+
+    SCRIPT = (
+        "CREATE TABLE `año` (id INT, valor VARCHAR(5));\n"
+        "INSERT INTO `año` VALUES (1,'x'),(2,'it''s');\n"
+        "CREATE TABLE `a-b` (id INT);\n"
+        "CREATE TABLE `ab` (id INT);\n"
+        "INSERT INTO `a-b` VALUES (1);\n"
+        "INSERT INTO `ab` VALUES (5),(6);\n"
+        "DROP TABLE `ab`;\n"
+        "INSERT INTO `sin_create` VALUES (1);\n"
+    )
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        self.addCleanup(self.engine.dispose)
+
+    def test_nombres_reales(self):
+        registro = staging_sql.preparar(self.engine, script=self.SCRIPT)
+        self.addCleanup(staging_sql.eliminar, self.engine, registro)
+        # El DROP TABLE no se ejecuta; el INSERT sin tabla cuenta como error
+        self.assertEqual(sorted(registro['tablas']), ['a-b', 'ab', 'año'])
+        self.assertEqual(registro['errores'], 1)
+        self.assertEqual(staging_sql.leer(self.engine, registro, 'año').values.tolist(), [[1, 'x'], [2, "it's"]])
+        self.assertEqual(staging_sql.leer(self.engine, registro, 'a-b')['id'].tolist(), [1])
+        self.assertEqual(staging_sql.leer(self.engine, registro, 'ab', ['id'], filas=1)['id'].tolist(), [5])
+
+    def test_reutiliza_y_elimina(self):
+        registro = staging_sql.preparar(self.engine, script=self.SCRIPT)
+        self.assertIs(staging_sql.preparar(self.engine, script=self.SCRIPT, registro=registro), registro)
+        staging_sql.eliminar(self.engine, registro)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("SELECT count(*) FROM sqlite_master").scalar(), 0)
+
+
+class CargaParalelaTests(SimpleTestCase):
+    """Carga de grupos de archivos en una misma tabla con carga_paralela.cargar_grupo."""
+
+    def setUp(self):
+        self.directorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.url = f"sqlite:///{self.directorio / 'datos.db'}"
+        with create_engine(self.url).begin() as conn:
+            # Tabla de una ejecución anterior
+            conn.execute(text("CREATE TABLE ventas (producto TEXT, cantidad TEXT)"))
+            conn.execute(text("INSERT INTO ventas VALUES ('viejo', '1')"))
+
+    def _tarea(self, nombre, modo='replace'):
+        return {'ruta': str(self.directorio / nombre), 'tipo': 'csv', 'hoja': None, 'tabla': 'ventas',
+                'modo': modo, 'engine_url': self.url}
+
+    def _filas(self):
+        with create_engine(self.url).connect() as conn:
+            return [tuple(f) for f in conn.execute(text("SELECT producto, cantidad FROM ventas"))]
+
+    def test_modo_tras_tarea_fallida(self):
+        (self.directorio / 'enero.csv').write_text('producto,cantidad\nlápiz,3\n', encoding='utf-8')
+        (self.directorio / 'febrero.csv').write_text('producto,cantidad\ncuaderno,5\n', encoding='utf-8')
+        # La primera falla sin escribir: 'replace' lo aplica la siguiente
+        estadisticas = carga_paralela.cargar_grupo(
+            [self._tarea('no_existe.csv'), self._tarea('enero.csv'), self._tarea('febrero.csv')])
+        self.assertIn('error', estadisticas[0])
+        self.assertEqual([e['filas'] for e in estadisticas], [0, 1, 1])
+        self.assertEqual(self._filas(), [('lápiz', '3'), ('cuaderno', '5')])
+
+    def test_modo_append(self):
+        (self.directorio / 'enero.csv').write_text('producto,cantidad\nlápiz,3\n', encoding='utf-8')
+        carga_paralela.cargar_grupo([self._tarea('no_existe.csv', 'append'), self._tarea('enero.csv', 'append')])
+        self.assertEqual(self._filas(), [('viejo', '1'), ('lápiz', '3')])
+
+
+class ProcesoScriptTests(TestCase):
+    """Procesos guardados con origen sql_script desde un archivo (procesos.guardar_script)."""
+
+    def setUp(self):
+        self.directorio = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        parche = mock.patch.object(procesos, 'SCRIPTS_DIR', self.directorio / 'scripts')
+        parche.start()
+        self.addCleanup(parche.stop)
+        self.addCleanup(metadatos.invalidar)
+
+    def test_script_guardado_en_disco(self):
+        temporal = self.directorio / 'subido.sql'
+        temporal.write_text("CREATE TABLE t1 (a INT);\nINSERT INTO t1 VALUES (1),(2);\n", encoding='utf-8')
+        origen = procesos.guardar_script(str(temporal), 'Carga diaria: ventas')
+        # El temporal del asistente puede desaparecer; la copia del proceso no
+        temporal.unlink()
+        self.assertRegex(origen['archivo'], r'^Carga_diaria_ventas_[0-9a-f]{8}\.sql$')
+
+        cfg = {'destino': {'motor': 'sqlite', 'conexion': {}},
+               'origen': {'tipo': 'sql_script', **origen, 'tablas_resultantes': [{'origen': 't1', 'destino': 't2'}]}}
+        proceso = ProcessConfig.objects.create(nombre='p', json_config=cfg)
+        run = ProcessRunLog.objects.create(proceso=proceso)
+        url = f"sqlite:///{self.directorio / 'destino.db'}"
+        with mock.patch.object(procesos, 'url_destino', return_value=(url, [])):
+            procesos.ejecutar_proceso_guardado(proceso.id, run.id)
+
+        run.refresh_from_db()
+        self.assertTrue(run.exito, run.mensaje)
+        self.assertIsNone(run.errores)
+        self.assertEqual([d['filas'] for d in run.detalle], [2])
+        self.assertNotIn('contenido', proceso.json_config['origen'])
@@ -34,6 +34,7 @@ urlpatterns = [
     path('subir-sql/', views.subir_sql, name='subir_sql'),
     path('seleccionar-datos/', views.seleccionar_datos, name='seleccionar_datos'),
     path('api/preview-tabla/', views.preview_tabla, name='preview_tabla'),
+    path('api/tablas/<str:tabla>/filas/', views.navegar_tabla, name='navegar_tabla'),
     path('subir-desde-postgres/', views.subir_desde_postgres, name='subir_desde_postgres'),
     path('subir-desde-mysql/', views.subir_desde_mysql, name='subir_desde_mysql'),
     
@@ -47,4 +48,5 @@ urlpatterns = [
     path('procesos/', views.procesos_list, name='procesos_list'),
     path('procesos/<int:proceso_id>/ejecutar/', views.ejecutar_proceso, name='ejecutar_proceso'),
     path('procesos/ejecuciones/', views.procesos_runs_list, name='procesos_runs_list'),
+    path('api/trabajos/<int:trabajo_id>/progreso/', views.progreso_trabajo, name='progreso_trabajo'),
 ]
\ No newline at end of file
@@ -1,49 +1,15 @@
 import os
 import pandas as pd
-from pathlib import Path
 from datetime import datetime
-from .models import ArchivoDetectado, CarpetaCompartida
+from .ingesta import iterar_bloques
+from .excel_reader import leer_excel, nombres_hojas
+from .escaner import escanear_carpeta
 
-def detectar_archivos_en_carpeta(carpeta):
+def detectar_archivos_en_carpeta(carpeta, forzar=False):
     """Detecta automáticamente todos los archivos soportados en una carpeta"""
-    archivos_encontrados = []
-    
     try:
-        ruta_carpeta = Path(carpeta.ruta)
-        if not ruta_carpeta.exists():
-            return []
-        
-        # Extensiones soportadas
-        extensiones_soportadas = ['.xlsx', '.xls', '.csv', '.txt']
-        
-        # Buscar todos los archivos en la carpeta
-        for archivo in ruta_carpeta.iterdir():
-            if archivo.is_file() and archivo.suffix.lower() in extensiones_soportadas:
-                
-                # Crear o actualizar registro del archivo
-                archivo_obj, created = ArchivoDetectado.objects.get_or_create(
-                    ruta_completa=str(archivo),
-                    defaults={
-                        'nombre': archivo.name,
-                        'carpeta': carpeta,
-                        'tamaño': archivo.stat().st_size,
-                        'fecha_modificacion': datetime.fromtimestamp(archivo.stat().st_mtime),
-                        'tipo': detectar_tipo_archivo(archivo.suffix)
-                    }
-                )
-                
-                # Si el archivo ya existía, actualizar fecha de modificación
-                if not created:
-                    nueva_fecha_mod = datetime.fromtimestamp(archivo.stat().st_mtime)
-                    if archivo_obj.fecha_modificacion != nueva_fecha_mod:
-                        archivo_obj.fecha_modificacion = nueva_fecha_mod
-                        archivo_obj.tamaño = archivo.stat().st_size
-                        archivo_obj.save()
-                
-                archivos_encontrados.append(archivo_obj)
-        
-        return archivos_encontrados
-        
+        # Escaneo incremental con altas/bajas/cambios en bloque
+        return escanear_carpeta(carpeta, forzar=forzar)
     except Exception as e:
         print(f"Error detectando archivos: {e}")
         return []
@@ -62,8 +28,8 @@ def detectar_tipo_archivo(extension):
 def leer_hojas_excel(ruta_archivo):
     """Lee las hojas disponibles en un archivo Excel"""
     try:
-        xl_file = pd.ExcelFile(ruta_archivo)
-        return xl_file.sheet_names
+        # Solo el manifiesto del libro: no se abre ninguna hoja
+        return nombres_hojas(ruta_archivo)
     except Exception as e:
         print(f"Error leyendo hojas Excel: {e}")
         return []
@@ -79,40 +45,16 @@ def procesar_archivo(archivo_detectado, hoja_seleccionada=None):
         # Procesar según el tipo
         if archivo_detectado.tipo == 'excel':
             if hoja_seleccionada:
-                df = pd.read_excel(ruta, sheet_name=hoja_seleccionada)
+                df = leer_excel(ruta, hoja_seleccionada)
             else:
                 # Leer la primera hoja por defecto
-                df = pd.read_excel(ruta, sheet_name=0)
+                df = leer_excel(ruta, 0)
                 
-        elif archivo_detectado.tipo == 'csv':
-            # Detectar separador automáticamente
-            separadores = [',', ';', '\t', '|']
-            df = None
-            
-            for sep in separadores:
-                try:
-                    df_temp = pd.read_csv(ruta, sep=sep, nrows=5)
-                    if len(df_temp.columns) > 1:
-                        df = pd.read_csv(ruta, sep=sep)
-                        break
-                except:
-                    continue
-                    
-            if df is None:
-                df = pd.read_csv(ruta)
+        elif archivo_detectado.tipo in ('csv', 'txt'):
+            # Dialecto detectado una sola vez sobre una muestra del inicio
+            bloques = list(iterar_bloques(ruta, archivo_detectado.tipo))
+            df = pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame()
                 
-        elif archivo_detectado.tipo == 'txt':
-            # Intentar como CSV primero, luego como texto plano
-            try:
-                df = pd.read_csv(ruta, sep='\t')
-            except:
-                try:
-                    df = pd.read_csv(ruta)
-                except:
-                    # Leer como texto plano
-                    with open(ruta, 'r', encoding='utf-8', errors='ignore') as f:
-                        lines = f.readlines()[:1000]
-                    df = pd.DataFrame({'contenido': [line.strip() for line in lines]})
         else:
             raise ValueError(f"Tipo de archivo no soportado: {archivo_detectado.tipo}")
         
@@ -134,4 +76,4 @@ def procesar_archivo(archivo_detectado, hoja_seleccionada=None):
         
     except Exception as e:
         print(f"Error procesando archivo: {e}")
-        raise e
\ No newline at end of file
+        raise e
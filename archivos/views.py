@@ -7,28 +7,45 @@ from django.views.decorators.http import require_http_methods
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
+import logging
 import os
 import re,uuid
 import json
 import humanize
-import base64
 
 from io import BytesIO, StringIO
 from .forms import SubirArchivoForm, CarpetaCompartidaForm
 from .models import *
 from .utils import detectar_archivos_en_carpeta, leer_hojas_excel, procesar_archivo
+from .ingesta import iterar_bloques, resumir_archivo
+from .excel_reader import leer_excel, nombres_hojas, resumir_hoja
+from .division_hojas import dividir_hojas
+from .normalizacion import REGLAS as REGLAS_NORMALIZACION, normalizar_dataframe
+from .esquema import inferir_esquema, tipar_dataframe, tipos_sqlalchemy
+from .sql_preview import previsualizar_archivo, previsualizar_tabla
+from . import cache_datos
+from . import metadatos
+from . import navegador
+from . import vista_previa
+from . import staging_sql
+from .escaner import escanear_carpeta
+from . import staging
+from .bulk_loader import cargar_dataframe
+from .engines import get_engine
+from .lectura_sql import iterar_consulta
+from . import jobs
+from . import procesos
 from django.views.decorators.csrf import csrf_exempt 
 from django import forms
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from .forms import SQLUploadForm
 from django import template
 from sqlalchemy import text
 from django.conf import settings
 from django.views.decorators.http import require_GET
-import traceback
 from django.utils import timezone
-import traceback
 
+logger = logging.getLogger(__name__)
 
 
 register = template.Library()
@@ -56,96 +73,47 @@ def seleccionar_archivos_para_subir(request, carpeta_id):
             
             for archivo in archivos_subidos:
                 try:
-                    # Procesar según tipo
-                    archivo.seek(0)  
+                    # Guardar en el área de staging: la sesión solo lleva el identificador
+                    staging_id = staging.guardar_subida(archivo)
+                    ruta_staging = staging.ruta(staging_id)
                     
                     if archivo.name.lower().endswith(('.xlsx', '.xls')):
                         # Para Excel, obtener las hojas
                         try:
-                            xl_file = pd.ExcelFile(archivo)
-                            hojas = xl_file.sheet_names
+                            hojas = nombres_hojas(ruta_staging)
                             
-                            # Leer primera hoja para preview
-                            df = pd.read_excel(archivo, sheet_name=0)
+                            # Una pasada en streaming por la primera hoja: preview y conteo de filas
+                            df, filas = resumir_hoja(ruta_staging, 0, filas_preview=10)
                             tipo = 'excel'
                         except Exception as e:
                             messages.warning(request, f'Error leyendo Excel {archivo.name}: {str(e)}')
                             continue
                             
-                    elif archivo.name.lower().endswith('.csv'):
-                        try:
-                            # Leer como CSV
-                            content = archivo.read().decode('utf-8')
-                            archivo.seek(0)
-                            
-                            # Intentar detectar separador
-                            separadores = [',', ';', '\t', '|']
-                            df = None
-                            
-                            for sep in separadores:
-                                try:
-                                    df = pd.read_csv(StringIO(content), sep=sep)
-                                    if len(df.columns) > 1:
-                                        break
-                                except:
-                                    continue
-                            
-                            if df is None:
-                                df = pd.read_csv(StringIO(content))
-                            
-                            hojas = []
-                            tipo = 'csv'
-                        except Exception as e:
-                            messages.warning(request, f'Error leyendo CSV {archivo.name}: {str(e)}')
-                            continue
-                            
-                    elif archivo.name.lower().endswith('.txt'):
+                    elif archivo.name.lower().endswith(('.csv', '.txt')):
+                        tipo = 'csv' if archivo.name.lower().endswith('.csv') else 'txt'
                         try:
-                            content = archivo.read().decode('utf-8')
-                            archivo.seek(0)
-                            
-                            # Intentar como CSV estructurado
-                            separadores = ['\t', ';', '|', ',']
-                            df = None
-                            
-                            for sep in separadores:
-                                try:
-                                    df = pd.read_csv(StringIO(content), sep=sep)
-                                    if len(df.columns) > 1:
-                                        break
-                                except:
-                                    continue
-                            
-                            if df is None:
-                                # Como texto plano
-                                lines = content.split('\n')[:100]  # Máximo 100 líneas para preview
-                                df = pd.DataFrame({'contenido': [line.strip() for line in lines if line.strip()]})
-                            
+                            # Una pasada por bloques desde disco: preview y conteo de filas
+                            df, filas, _ = resumir_archivo(ruta_staging, tipo, filas_preview=10)
                             hojas = []
-                            tipo = 'txt'
                         except Exception as e:
-                            messages.warning(request, f'Error leyendo TXT {archivo.name}: {str(e)}')
+                            messages.warning(request, f'Error leyendo {tipo.upper()} {archivo.name}: {str(e)}')
                             continue
                     
                     # Limpiar datos
                     if df is not None:
                         df = df.dropna(how='all').reset_index(drop=True)
-                        df = df.fillna('No Existe')
-                        # Convertir archivo a base64 para sesión
-                        archivo.seek(0)
-                        archivo_bytes = archivo.read()
-                        archivo_b64 = base64.b64encode(archivo_bytes).decode('utf-8')
                         
                         info_archivo = {
                             'nombre': archivo.name,
                             'tipo': tipo,
                             'tamaño': archivo.size,
-                            'filas': len(df),
+                            'filas': filas,
                             'columnas': len(df.columns),
                             'columnas_nombres': list(df.columns.astype(str)),
                             'hojas': hojas,
-                            'preview_html': df.head(10).to_html(classes='table table-sm table-striped', table_id=f'preview-{len(archivos_procesados)}'),
-                            'archivo_b64': archivo_b64
+                            # Vista previa por columnas: la sesión no lleva HTML
+                            'preview': vista_previa.serializar(df, filas=10),
+                            'staging_id': staging_id
                         }
                         
                         archivos_procesados.append(info_archivo)
@@ -269,9 +237,8 @@ def confirmar_archivos_subir(request):
             if archivo_key in archivos_seleccionados:
                 # Este archivo fue seleccionado para subir
                 try:
-                    # Decodificar archivo
-                    import base64
-                    archivo_bytes = base64.b64decode(archivo_info['archivo_b64'])
+                    # Archivo preparado en disco durante la selección
+                    ruta_staging = staging.ruta(archivo_info['staging_id'])
                     
                     # Determinar nombre final
                     nombre_base = archivo_info['nombre']
@@ -281,23 +248,24 @@ def confirmar_archivos_subir(request):
                         hojas_seleccionadas = request.POST.getlist(f'hojas_{i}')
                         
                         if hojas_seleccionadas:
-                            # Crear un archivo por cada hoja seleccionada
-                            for hoja in hojas_seleccionadas:
-                                nombre_hoja = f"{os.path.splitext(nombre_base)[0]}_{hoja}.xlsx"
-                                ruta_destino = os.path.join(carpeta.ruta, nombre_hoja)
-                                
-                                # Crear DataFrame de la hoja específica
-                                from io import BytesIO
-                                df_hoja = pd.read_excel(BytesIO(archivo_bytes), sheet_name=hoja)
-                                
-                                # Guardar solo esa hoja
-                                df_hoja.to_excel(ruta_destino, index=False)
-                                archivos_subidos_exitosamente.append(nombre_hoja)
+                            # Crear un archivo por cada hoja seleccionada: el libro se abre
+                            # una sola vez y las hojas se copian en streaming (en paralelo)
+                            destinos = [
+                                (hoja, os.path.join(carpeta.ruta, f"{os.path.splitext(nombre_base)[0]}_{hoja}.xlsx"))
+                                for hoja in hojas_seleccionadas
+                            ]
+                            estadisticas, pico = dividir_hojas(ruta_staging, destinos)
+                            if pico is not None:
+                                messages.info(request, f'{nombre_base}: pico de memoria al dividir las hojas {pico} MB')
+                            for estadistica in estadisticas:
+                                if 'error' in estadistica:
+                                    messages.error(request, f'Error en la hoja {estadistica["hoja"]} de {nombre_base}: {estadistica["error"]}')
+                                else:
+                                    archivos_subidos_exitosamente.append(estadistica['archivo'])
                         else:
                             # Subir archivo completo
                             ruta_destino = os.path.join(carpeta.ruta, nombre_base)
-                            with open(ruta_destino, 'wb') as f:
-                                f.write(archivo_bytes)
+                            staging.copiar_a(archivo_info['staging_id'], ruta_destino)
                             archivos_subidos_exitosamente.append(nombre_base)
                     else:
                         # Subir archivo completo
@@ -313,8 +281,7 @@ def confirmar_archivos_subir(request):
                                 contador += 1
                             nombre_base = nuevo_nombre
                         
-                        with open(ruta_destino, 'wb') as f:
-                            f.write(archivo_bytes)
+                        staging.copiar_a(archivo_info['staging_id'], ruta_destino)
                         archivos_subidos_exitosamente.append(nombre_base)
                         
                 except Exception as e:
@@ -453,64 +420,48 @@ def subir_archivo_local(request):
             # Detectar tipo y procesar
             try:
                 if nombre.lower().endswith(('.xlsx', '.xls')):
-                    df = pd.read_excel(archivo)
                     tipo = "Excel"
                 elif nombre.lower().endswith('.csv'):
-                    df = pd.read_csv(archivo)
                     tipo = "CSV"
                 elif nombre.lower().endswith('.txt'):
-                    # Intentar leer como CSV con diferentes separadores
-                    archivo.seek(0)  # Volver al inicio del archivo
-                    content = archivo.read().decode('utf-8')
-                    
-                    # Detectar separador
-                    separadores = ['\t', ';', '|', ',']
-                    df = None
-                    
-                    for sep in separadores:
-                        try:
-                            from io import StringIO
-                            df = pd.read_csv(StringIO(content), sep=sep)
-                            if len(df.columns) > 1:
-                                break
-                        except:
-                            continue
-                    
-                    if df is None or len(df.columns) == 1:
-                        # Leer como texto plano
-                        lines = content.split('\n')[:100]
-                        df = pd.DataFrame({'contenido': lines})
-                    
                     tipo = "TXT"
                 else:
                     messages.error(request, "Formato no soportado. Solo se permiten archivos .xlsx, .xls, .csv y .txt")
                     return render(request, "archivos/subir_local.html", {"form": form})
 
+                # Leer desde disco (staging) en lugar de cargar la subida en memoria
+                ruta_staging = staging.ruta(staging.guardar_subida(archivo))
+                if tipo == "Excel":
+                    df = leer_excel(ruta_staging)
+                else:
+                    # Separador detectado una sola vez y lectura por bloques
+                    bloques = list(iterar_bloques(ruta_staging, tipo.lower()))
+                    df = pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame()
+
                 # Limpiar datos
                 if df is not None and not df.empty:
                     df = df.dropna(how='all')  # Eliminar filas vacías
                     df = df.reset_index(drop=True)
-                    df = df.fillna('No Existe')
                     
-                    if df.empty:
-                        messages.error(request, "El archivo no contiene datos válidos")
-                        return render(request, "archivos/subir_local.html", {"form": form})
+                if df is None or df.empty:
+                    messages.error(request, "El archivo no contiene datos válidos")
+                    return render(request, "archivos/subir_local.html", {"form": form})
 
-                # Guardar en sesión para preview
+                # Los datos completos quedan en un volcado en disco; la sesión solo
+                # guarda su identificador y la vista previa se limita a las primeras filas
+                preview = vista_previa.serializar(df, filas=100)
                 request.session['archivo_temporal'] = {
                     'nombre': nombre,
                     'tipo': tipo,
-                    'df_html': df.to_html(classes='table table-striped table-hover'),
-                    'columnas': list(df.columns),
+                    'volcado_id': staging.guardar_dataframe(df),
+                    'columnas': [str(c) for c in df.columns],
                     'filas': len(df)
                 }
-                
-                request.session['archivo_datos'] = df.to_dict('records')
 
                 return render(request, "archivos/preview_local.html", {
                     "nombre": nombre,
                     "tipo": tipo,
-                    "df_html": df.to_html(classes='table table-striped table-hover'),
+                    "preview": preview,
                     "filas": len(df),
                     "columnas": len(df.columns),
                     "columnas_nombres": list(df.columns)
@@ -530,9 +481,8 @@ def guardar_archivo_local(request):
     """Guarda el archivo local procesado"""
     if request.method == 'POST':
         archivo_temp = request.session.get('archivo_temporal')
-        archivo_datos = request.session.get('archivo_datos')
         
-        if not archivo_temp or not archivo_datos:
+        if not archivo_temp or not archivo_temp.get('volcado_id'):
             messages.error(request, "No hay archivo para guardar. Por favor, sube un archivo primero.")
             return redirect('subir_archivo_local')
         
@@ -547,8 +497,6 @@ def guardar_archivo_local(request):
             
             
             # === Guardar archivo físico en carpeta compartida ===
-            import pandas as pd
-            from io import StringIO
             import os
 
             # Obtener carpeta compartida activa
@@ -562,9 +510,10 @@ def guardar_archivo_local(request):
 
             ruta_destino = os.path.join(carpeta.ruta, archivo_temp['nombre'])
 
-            # Reconstruir DataFrame y guardar según tipo de archivo
-            df = pd.DataFrame(archivo_datos)
-            df = df.fillna('')
+            # Leer el volcado y guardar según tipo de archivo. Las celdas vacías
+            # quedan vacías: un texto de relleno convertiría en texto las
+            # columnas numéricas y de fecha al cargarlas después
+            df = staging.leer_dataframe(archivo_temp['volcado_id'])
             if archivo_temp['tipo'].lower() == 'excel':
                 df.to_excel(ruta_destino, index=False)
             elif archivo_temp['tipo'].lower() == 'csv':
@@ -576,7 +525,7 @@ def guardar_archivo_local(request):
 
             # Limpiar sesión tras guardar
             del request.session['archivo_temporal']
-            del request.session['archivo_datos']
+            staging.eliminar_dataframe(archivo_temp['volcado_id'])
 
             messages.success(request, f"¡Archivo '{archivo_temp['nombre']}' guardado exitosamente!")
             return render(request, "archivos/exito.html", {
@@ -603,7 +552,10 @@ def detalle_archivo(request, archivo_id):
     
     # Si es Excel, obtener las hojas disponibles
     hojas_disponibles = []
-    if archivo.tipo == 'excel':
+    if archivo.tipo == 'excel' and archivo.hojas:
+        # Calculadas en segundo plano por vigilar_carpetas
+        hojas_disponibles = json.loads(archivo.hojas)
+    elif archivo.tipo == 'excel':
         try:
             hojas_disponibles = leer_hojas_excel(archivo.ruta_completa)
         except Exception as e:
@@ -622,7 +574,26 @@ def procesar_archivo_vista(request, archivo_id):
     
     try:
         # Procesar el archivo
-        df, info_procesamiento = procesar_archivo(archivo, hoja_seleccionada)
+        if archivo.tipo in ('csv', 'txt'):
+            # Una sola pasada por bloques: vista previa y conteo sin cargar todo el archivo
+            df, total_filas, _ = resumir_archivo(archivo.ruta_completa, archivo.tipo, filas_preview=100)
+            info_procesamiento = {
+                'archivo': archivo.nombre,
+                'tipo': archivo.tipo,
+                'procesado_en': datetime.now(),
+                'filas_procesadas': total_filas,
+                'columnas_detectadas': len(df.columns),
+                'hojas_disponibles': []
+            }
+        else:
+            df, info_procesamiento = procesar_archivo(archivo, hoja_seleccionada)
+            total_filas = len(df) if df is not None else 0
+            if df is not None and not df.empty:
+                # El archivo ya está parseado: dejarlo en caché para la paginación
+                try:
+                    cache_datos.guardar(archivo, hoja_seleccionada, df)
+                except Exception as e:
+                    logger.warning(f"No se pudo guardar en caché {archivo.nombre}: {e}")
         
         if df is not None:
             df = df.fillna('')
@@ -635,14 +606,14 @@ def procesar_archivo_vista(request, archivo_id):
         archivo_procesado = ArchivoProcesado.objects.create(
             archivo_original=archivo,
             hoja_seleccionada=hoja_seleccionada,
-            filas_totales=len(df),
+            filas_totales=total_filas,
             columnas_totales=len(df.columns),
             columnas_nombres=', '.join(df.columns.astype(str)),
             datos_preview=df.head(100).to_json()
         )
         
-        # Preparar datos para la vista
-        df_html = df.head(50).to_html(classes='table table-striped table-hover', table_id='archivo-tabla')
+        # Preparar datos para la vista (la tabla se dibuja en el navegador)
+        preview = vista_previa.serializar(df, filas=50)
         
         # Convertir columnas a lista para evitar usar filtros
         columnas_lista = [str(col) for col in df.columns]
@@ -650,11 +621,11 @@ def procesar_archivo_vista(request, archivo_id):
         return render(request, 'archivos/procesar_archivo.html', {
             'archivo': archivo,
             'archivo_procesado': archivo_procesado,
-            'df_html': df_html,
+            'preview': preview,
             'info_procesamiento': info_procesamiento,
             'hoja_seleccionada': hoja_seleccionada,
             'mostrando_filas': min(50, len(df)),
-            'total_filas': len(df),
+            'total_filas': total_filas,
             'columnas_lista': columnas_lista,  
         })
         
@@ -666,25 +637,24 @@ def procesar_archivo_vista(request, archivo_id):
 
 @require_http_methods(["GET"])
 def obtener_datos_archivo(request, procesado_id):
-    """API para obtener datos paginados del archivo procesado"""
+    """API para obtener datos paginados del archivo procesado (vista previa por columnas, ver vista_previa)"""
     procesado = get_object_or_404(ArchivoProcesado, id=procesado_id)
     
     try:
         inicio = int(request.GET.get('inicio', 0))
         limite = int(request.GET.get('limite', 50))
         
-        # Recrear DataFrame desde el archivo original
-        df, _ = procesar_archivo(procesado.archivo_original, procesado.hoja_seleccionada)
-        
-        # Obtener el segmento solicitado
-        df_segmento = df.iloc[inicio:inicio+limite]
+        # Leer solo la página solicitada desde la caché de datos parseados
+        df_segmento, total = cache_datos.obtener_pagina(
+            procesado.archivo_original, procesado.hoja_seleccionada, inicio, limite
+        )
         
-        return JsonResponse({
+        return vista_previa.respuesta_json(request, {
             'success': True,
-            'html': df_segmento.to_html(classes='table table-striped table-hover'),
+            'preview': vista_previa.serializar(df_segmento),
             'inicio': inicio,
-            'fin': min(inicio + limite, len(df)),
-            'total': len(df)
+            'fin': min(inicio + limite, total),
+            'total': total
         })
         
     except Exception as e:
@@ -718,7 +688,7 @@ def guardar_archivo(request):
 
 
 # SECCION SUBIR A BASE DE DATOS
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from django.shortcuts import redirect
@@ -846,16 +816,10 @@ def conectar_sqlserver_automatico(request):
 # ...existing code...
 def subir_sql(request):
     from .sqlserver_utils import get_sqlserver_connection_string, sqlalchemy_connection
-    from .mysql_to_sqlserver import convert_mysql_to_sqlserver, execute_sqlserver_script
     from .models import ProcessAutomation, SqlFileUpload
-    import logging
     import json
     import tempfile
-    import os
     from datetime import datetime
-    import time
-    
-    logger = logging.getLogger(__name__)
     
     # Limpiar errores SQL de sesiones anteriores
     if 'sql_errors' in request.session:
@@ -865,16 +829,10 @@ def subir_sql(request):
     if not engine_url:
         engine_url = get_sqlserver_connection_string()
         request.session['engine_url'] = engine_url
-        
-    from sqlalchemy import create_engine
-    engine = create_engine(engine_url)
     
     if request.method == 'POST':
         archivo_sql = request.FILES.get('archivo_sql')
         if archivo_sql:
-            # Registrar tiempo de inicio para medir duración
-            tiempo_inicio = time.time()
-            
             # Limpiar sesión de datos anteriores
             for key in ['tablas', 'tablas_seleccionadas', 'columnas', 'columnas_elegidas']:
                 if key in request.session:
@@ -884,13 +842,17 @@ def subir_sql(request):
             nombre_archivo = archivo_sql.name
             tamanio_bytes = archivo_sql.size
             
-            # Leer contenido del archivo SQL
-            archivo_sql.seek(0)
-            sql_texto_original = archivo_sql.read().decode('utf-8', errors='ignore')
-            
-            # Crear un registro temporal del archivo
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.sql', mode='w', encoding='utf-8') as tmp:
-                tmp.write(sql_texto_original)
+            # Copiar el archivo SQL a un temporal por fragmentos, detectando de paso
+            # si contiene sintaxis de MySQL (sin cargarlo entero en memoria)
+            requiere_conversion = False
+            cola = b''
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.sql', mode='wb') as tmp:
+                for chunk in archivo_sql.chunks():
+                    tmp.write(chunk)
+                    if not requiere_conversion:
+                        ventana = cola + chunk
+                        requiere_conversion = b'`' in ventana or b'ENGINE=' in ventana
+                        cola = chunk[-6:]
                 ruta_temporal = tmp.name
               # Crear registro inicial en SqlFileUpload
             sql_upload = SqlFileUpload(
@@ -900,7 +862,7 @@ def subir_sql(request):
                 usuario=request.user.username if request.user.is_authenticated else 'usuario_anónimo',
                 sentencias_total=0,
                 sentencias_exito=0,
-                conversion_mysql=('`' in sql_texto_original or 'ENGINE=' in sql_texto_original),
+                conversion_mysql=requiere_conversion,
                 estado='Procesando',
                 ruta_temporal=ruta_temporal
             )
@@ -911,151 +873,78 @@ def subir_sql(request):
                 nombre=f"Importación SQL: {nombre_archivo}",
                 tipo_proceso="Importación SQL",
                 fecha_ejecucion=timezone.now(),  # Usar timezone.now() en lugar de auto_now_add
-                estado="En proceso",
+                # Con la cola asíncrona el estado final lo escribe el worker
+                estado="En cola" if jobs.ASINCRONA else "En proceso",
                 tiempo_ejecucion=0,
                 usuario=request.user.username if request.user.is_authenticated else 'usuario_anónimo',
                 parametros=json.dumps({
                     "nombre_archivo": nombre_archivo,
                     "tamanio_bytes": tamanio_bytes,
-                    "conversion_requerida": bool('`' in sql_texto_original or 'ENGINE=' in sql_texto_original)
+                    "conversion_requerida": requiere_conversion
                 }),
                 filas_afectadas=0
             )
             process_record.save()
             
-            try:
-                # Convertir SQL de MySQL a formato compatible con SQL Server
-                sql_texto_convertido = convert_mysql_to_sqlserver(sql_texto_original)
-                
-                # Guardar versión original y convertida para visualización (opcional)
-                request.session['sql_original'] = sql_texto_original[:5000] if len(sql_texto_original) > 5000 else sql_texto_original
-                request.session['sql_convertido'] = sql_texto_convertido[:5000] if len(sql_texto_convertido) > 5000 else sql_texto_convertido
-                
-                # Actualizar registro del archivo con la versión convertida
-                sql_upload.version_convertida = sql_texto_convertido[:10000] if len(sql_texto_convertido) > 10000 else sql_texto_convertido
-                sql_upload.save()
-                
-                # Ejecutar el script SQL convertido en SQL Server
-                resultados = execute_sqlserver_script(engine, sql_texto_convertido)
-                  # Calcular tiempo de ejecución en segundos
-                tiempo_ejecucion = int(time.time() - tiempo_inicio)
-                
-                # Actualizar registros en ambas tablas con los resultados
-                if resultados['errors']:
-                    # Hubo errores en la ejecución
-                    error_summary = f"{len(resultados['errors'])} de {resultados['total']} sentencias fallaron."
-                    
-                    # Mostrar mensaje principal de error
-                    messages.error(request, f"Error al ejecutar SQL: {error_summary}")
-                    
-                    # Mostrar advertencias específicas si existen
-                    if 'warnings' in resultados and resultados['warnings']:
-                        for warning in resultados['warnings'][:3]:  # Limitar a 3 advertencias
-                            messages.warning(request, warning)
-                    
-                    # Mostrar detalles del primer error con sugerencia si está disponible
-                    first_error = resultados['errors'][0]
-                    error_msg = first_error['error']
-                    
-                    # Incluir sugerencia si está disponible
-                    if 'sugerencia' in first_error and first_error['sugerencia']:
-                        error_msg += f" - Sugerencia: {first_error['sugerencia']}"
-                    
-                    messages.error(request, f"Detalle del error: {error_msg}")
-                    
-                    # Si hay múltiples errores, agregar una nota
-                    if len(resultados['errors']) > 1:
-                        messages.info(request, f"Hay {len(resultados['errors'])-1} errores adicionales. Revise los logs para más detalles.")
-                    
-                    # Registrar información detallada en logs
-                    logger.error(f"Errores en ejecución SQL: {len(resultados['errors'])} de {resultados['total']} sentencias fallaron.")
-                    for i, error in enumerate(resultados['errors'][:5]):  # Limitamos a los primeros 5 errores
-                        logger.error(f"Error #{i+1}: {error['error']} en sentencia: {error['statement']}")
-                        if 'sugerencia' in error:
-                            logger.error(f"  Sugerencia: {error['sugerencia']}")
-                    
-                    # Guardar información de errores en la sesión para mostrar en la página
-                    request.session['sql_errors'] = [
-                        {
-                            'error': e['error'],
-                            'statement': e['statement'],
-                            'sugerencia': e.get('sugerencia', '')
-                        } for e in resultados['errors'][:10]  # Limitamos a 10 errores
-                    ]
-                    
-                    # Actualizar registro de SqlFileUpload con los errores
-                    sql_upload.estado = 'Error'
-                    sql_upload.sentencias_total = resultados['total']
-                    sql_upload.sentencias_exito = resultados['success']
-                    sql_upload.errores = json.dumps([
-                        {
-                            'error': e['error'],
-                            'statement': e['statement'][:200]  # Limitamos la longitud
-                        } for e in resultados['errors'][:20]
-                    ])
-                else:
-                    # Éxito
-                    messages.success(request, f"Archivo SQL ejecutado correctamente: {resultados['success']} sentencias OK")
-                    sql_upload.estado = 'Completado'
-                    sql_upload.sentencias_total = resultados['total']
-                    sql_upload.sentencias_exito = resultados['success']
-                    sql_upload.save()
-                    process_record.estado = 'Completado'
-                    process_record.tiempo_ejecucion = tiempo_ejecucion
-                    process_record.filas_afectadas = resultados.get('rows_affected', 0)
-                    process_record.resultado = json.dumps({
-                        'sentencias_total': resultados['total'],
-                        'sentencias_exito': resultados['success'],
-                        'errores': len(resultados['errors'])
-                    })
-                    process_record.save()
-                    # Limpiar archivo temporal
-                    try:
-                        if os.path.exists(ruta_temporal):
-                            os.remove(ruta_temporal)
-                    except Exception:
-                        pass
-                    return redirect('subir_sql')
-            except Exception as e:
-                import traceback
-                logger.exception("Error en subir_sql")
-                error_detalle = traceback.format_exc()
-                
-                # Actualizar SqlFileUpload con información del error
-                sql_upload.estado = 'Error'
-                sql_upload.errores = json.dumps({
-                    'error': str(e),
-                    'detalle': error_detalle[:1000]  # Limitamos para no guardar trazas enormes
-                })
-                sql_upload.save()
-                
-                # Actualizar ProcessAutomation con información del error
-                process_record.estado = 'Error'
-                process_record.tiempo_ejecucion = tiempo_ejecucion
-                process_record.error_mensaje = f"Error inesperado: {str(e)}"
-                process_record.resultado = json.dumps({
-                    'error': str(e),
-                    'tipo_error': e.__class__.__name__
-                })
-                process_record.save()
-                
+            # Guardar el inicio del original para visualización (opcional)
+            with open(ruta_temporal, 'r', encoding='utf-8', errors='ignore') as archivo_script:
+                request.session['sql_original'] = archivo_script.read(5000)
+            
+            # Convertir y ejecutar (en esta petición o en el worker de la cola)
+            trabajo = jobs.enviar('importar_sql', {
+                'ruta_temporal': ruta_temporal,
+                'conexion': 'sqlserver',
+                'sql_upload_id': sql_upload.id,
+                'process_id': process_record.id,
+            }, process_automation_id=process_record.id)
+            
+            if trabajo.estado == 'pendiente':
+                request.session['trabajo_en_curso'] = trabajo.id
+                messages.info(request, f"Importación de {nombre_archivo} en cola (trabajo #{trabajo.id}). El avance se muestra en esta página.")
+                return redirect('subir_sql')
+            
+            if trabajo.estado == 'error':
                 # Mostrar mensaje de error al usuario
-                messages.error(request, f"Error al procesar el archivo SQL: {str(e)}")
+                messages.error(request, f"Error al procesar el archivo SQL: {trabajo.mensaje}")
                 
                 # Guardar el error en la sesión para visualización
                 request.session['sql_errors'] = [{
-                    'error': str(e),
+                    'error': trabajo.mensaje,
                     'statement': 'N/A',
                     'sugerencia': 'Revisa el formato del archivo SQL y asegúrate que sea compatible.'
                 }]
+                return redirect('subir_sql')
+            
+            resultados = trabajo.resultado
+            request.session['sql_convertido'] = resultados['sql_convertido']
+            
+            if resultados['errors']:
+                # Hubo errores en la ejecución
+                error_summary = f"{len(resultados['errors'])} de {resultados['total']} sentencias fallaron."
                 
-                # Eliminar el archivo temporal si existe
-                try:
-                    if os.path.exists(ruta_temporal):
-                        os.remove(ruta_temporal)
-                except:
-                    pass
+                # Mostrar mensaje principal de error
+                messages.error(request, f"Error al ejecutar SQL: {error_summary}")
                 
+                # Mostrar advertencias específicas si existen
+                for warning in resultados['warnings'][:3]:  # Limitar a 3 advertencias
+                    messages.warning(request, warning)
+                
+                # Mostrar detalles del primer error con sugerencia si está disponible
+                first_error = resultados['errors'][0]
+                error_msg = first_error['error']
+                if first_error['sugerencia']:
+                    error_msg += f" - Sugerencia: {first_error['sugerencia']}"
+                messages.error(request, f"Detalle del error: {error_msg}")
+                
+                # Si hay múltiples errores, agregar una nota
+                if len(resultados['errors']) > 1:
+                    messages.info(request, f"Hay {len(resultados['errors'])-1} errores adicionales. Revise los logs para más detalles.")
+                
+                # Guardar información de errores en la sesión para mostrar en la página
+                request.session['sql_errors'] = resultados['errors']
+            else:
+                # Éxito
+                messages.success(request, f"Archivo SQL ejecutado correctamente: {resultados['success']} sentencias OK")
                 return redirect('subir_sql')
                 
     return render(request, "archivos/subir_sql.html")
@@ -1070,16 +959,7 @@ def subir_sql(request):
 
 def tabla_existe(engine, tabla):
     try:
-        with engine.connect() as conn:
-            # Usar sintaxis SQL Server para verificar existencia de tabla
-            query = """
-            SELECT COUNT(*) 
-            FROM INFORMATION_SCHEMA.TABLES 
-            WHERE TABLE_NAME = ? 
-            AND TABLE_CATALOG = DB_NAME()
-            """
-            result = conn.execute(text(query), (tabla,))
-            return result.scalar() > 0
+        return metadatos.tabla_existe(engine, tabla)
     except Exception:
         return False
     
@@ -1116,115 +996,13 @@ def preview_sql_estructura(request):
         if not archivo.lower().endswith('.sql'):
             return JsonResponse({'ok': False, 'error': 'El archivo debe tener extensión .sql'})
         
-        # Leer el contenido del archivo SQL
-        with open(ruta_completa, 'r', encoding='utf-8', errors='ignore') as f:
-            sql_content = f.read()
-        
-        # Buscar tablas en el script (CREATE TABLE)
-        tabla_pattern = re.compile(r'create\s+table\s+(?:if\s+not\s+exists\s+)?`?([A-Za-z0-9_]+)`?(?:\s*\(|\s+as)', re.IGNORECASE)
-        tablas_encontradas = tabla_pattern.findall(sql_content)
-        tablas_encontradas = sorted(list(dict.fromkeys(tablas_encontradas)))  # Eliminar duplicados
-        
-        # Obtener engine desde sesión
-        engine_url = request.session.get('engine_url')
-        if not engine_url:
-            return JsonResponse({'ok': False, 'error': 'No hay conexión a base de datos'})
+        # Columnas, tipos y primeras filas de cada tabla leídos del script, sin
+        # ejecutarlo ni cargarlo completo en memoria
+        resultado_tablas = previsualizar_archivo(ruta_completa, filas=5)
+        resultado_tablas.sort(key=lambda t: t['nombre'])
         
-        engine = create_engine(engine_url)
-        
-        # En lugar de usar un schema temporal, usaremos tablas temporales con prefijo
-        prefix = f"__tmp_{uuid.uuid4().hex[:8]}_"
-        
-        resultado_tablas = []
-        created_temp_tables = []
-        
-        try:
-            # Modificar el script para usar tablas temporales con prefijo
-            def _reemplazar_tabla(m):
-                nombre_tabla = m.group(2)
-                return f"{m.group(1)} `{prefix}{nombre_tabla}`"
-            
-            script_mod = re.sub(r'(?i)\b(CREATE\s+TABLE|INSERT\s+INTO)\s+`?([A-Za-z0-9_]+)`?',
-                                _reemplazar_tabla, sql_content)
-            
-            # Ejecutar cada sentencia
-            with engine.begin() as conn:
-                for stmt in [s.strip() for s in script_mod.split(';') if s.strip()]:
-                    try:
-                        conn.execute(text(stmt))
-                        # Capturar nombres de tablas creadas
-                        if re.search(r'(?i)create\s+table', stmt):
-                            tabla_match = re.search(r'(?i)create\s+table\s+(?:if\s+not\s+exists\s+)?`?(\w+)`?', stmt)
-                            if tabla_match:
-                                created_temp_tables.append(tabla_match.group(1))
-                    except Exception as e:
-                        print(f"Error ejecutando: {stmt[:100]}... | {str(e)}")
-              # Procesar cada tabla original detectada
-            for tabla in tablas_encontradas:
-                temp_tabla = f"{prefix}{tabla}"
-                tabla_info = {'nombre': tabla, 'columnas': [], 'columnas_info': [], 'preview': []}
-                
-                try:
-                    # Obtener columnas usando sintaxis SQL Server
-                    with engine.begin() as conn:
-                        # Usar INFORMATION_SCHEMA en lugar de SHOW COLUMNS
-                        query = """
-                        SELECT COLUMN_NAME, DATA_TYPE 
-                        FROM INFORMATION_SCHEMA.COLUMNS 
-                        WHERE TABLE_NAME = ? 
-                        AND TABLE_CATALOG = DB_NAME()
-                        ORDER BY ORDINAL_POSITION
-                        """
-                        result = conn.execute(text(query), (temp_tabla,))
-                        columns_info = result.fetchall()
-                        
-                        for col_info in columns_info:
-                            col_name = col_info[0]
-                            col_type = col_info[1]
-                            tabla_info['columnas'].append(col_name)
-                            tabla_info['columnas_info'].append({
-                                'nombre': col_name,
-                                'tipo': col_type
-                            })
-                    
-                    # Obtener datos de muestra (primeras 5 filas) - usar TOP en lugar de LIMIT
-                    df = pd.read_sql(f"SELECT TOP 5 * FROM [{temp_tabla}]", engine)
-                      # Convertir a lista para JSON
-                    tabla_info['preview'] = df.values.tolist()
-                    
-                except Exception as e:
-                    print(f"Error obteniendo datos de {tabla}: {str(e)}")
-                
-                resultado_tablas.append(tabla_info)
-        
-        except Exception as e:
-            return JsonResponse({'ok': False, 'error': f"Error al procesar el script: {str(e)}"})
-        
-        finally:
-            # Limpiar tablas temporales
-            try:
-                with engine.begin() as conn:
-                    for tabla in created_temp_tables:
-                        try:
-                            conn.execute(text(f"DROP TABLE IF EXISTS [{tabla}]"))
-                        except:
-                            pass
-            except:
-                pass
-        
-        # Si no se encontraron tablas con información, buscar tablas insertadas
-        if not any(tabla.get('columnas') for tabla in resultado_tablas):
-            insert_pattern = re.compile(r'insert\s+into\s+`?([A-Za-z0-9_]+)`?', re.IGNORECASE)
-            tablas_insert = insert_pattern.findall(sql_content)
-            tablas_insert = sorted(list(dict.fromkeys(tablas_insert)))  # Eliminar duplicados
-            
-            for tabla in tablas_insert:
-                if not any(t['nombre'] == tabla for t in resultado_tablas):
-                    tabla_info = {'nombre': tabla, 'columnas': [], 'preview': []}
-                    resultado_tablas.append(tabla_info)
-        
-        # Guardar el script y las tablas encontradas en la sesión para usar después
-        request.session['sql_script_preview'] = sql_content
+        # Guardar la ruta del script y las tablas encontradas en la sesión para usar después
+        request.session['sql_script_ruta'] = ruta_completa
         request.session['tablas_detectadas'] = [t['nombre'] for t in resultado_tablas]
         
         return JsonResponse({
@@ -1266,7 +1044,7 @@ def preview_tabla(request):
 
     try:
         if source_type == 'excel':
-            df = pd.read_excel(temp_file, sheet_name=tabla, nrows=sample_rows, dtype=object)
+            df = leer_excel(temp_file, tabla, nrows=sample_rows, dtype=object)
         elif source_type == 'csv':
             if tabla != 'csv_table':
                 return JsonResponse({'ok': False, 'error': 'Tabla CSV inválida'})
@@ -1274,7 +1052,7 @@ def preview_tabla(request):
         elif source_type == 'sql':
             if not engine_url:
                 return JsonResponse({'ok': False, 'error': 'Sin conexión'})
-            engine = create_engine(engine_url)
+            engine = get_engine(engine_url)
             safe = re.sub(r'[^A-Za-z0-9_]', '', tabla)
             df = pd.read_sql(f"SELECT TOP {sample_rows} * FROM [{safe}]", engine)
         elif source_type == 'sql_script':
@@ -1288,7 +1066,7 @@ def preview_tabla(request):
             
             # Usamos un prefijo único para las tablas temporales
             prefix = f"__tmp_{uuid.uuid4().hex[:8]}_"
-            engine = create_engine(engine_url)
+            engine = get_engine(engine_url)
             created_tables = []
             
             try:
@@ -1384,22 +1162,25 @@ def preview_tabla(request):
     import pandas as pd
     from .sqlserver_utils import read_sql_safe, table_exists
     sample_rows = 25
+    # Filas leídas de Excel/CSV para inferir el esquema (solo se muestran sample_rows)
+    filas_esquema = max(sample_rows, getattr(settings, 'ESQUEMA_FILAS_PREVIEW', 1000))
     cols = []
     data = []
+    esquema = []
 
     try:
         if source_type == 'excel':
-            df = pd.read_excel(temp_file, sheet_name=tabla, nrows=sample_rows, dtype=object)
+            df = leer_excel(temp_file, tabla, nrows=filas_esquema, dtype=object)
         elif source_type == 'csv':
             if tabla != 'csv_table':
                 return JsonResponse({'ok': False, 'error': 'Tabla CSV inválida'})
-            df = pd.read_csv(temp_file, nrows=sample_rows, dtype=object)
+            df = pd.read_csv(temp_file, nrows=filas_esquema, dtype=object)
         elif source_type == 'sql':
             if not engine_url:
                 return JsonResponse({'ok': False, 'error': 'Sin conexión'})
             
             # Usar conexión segura para SQL Server
-            engine = create_engine(engine_url)
+            engine = get_engine(engine_url)
             safe = re.sub(r'[^A-Za-z0-9_]', '', tabla)
             
             # Verificar si la tabla existe primero
@@ -1413,58 +1194,42 @@ def preview_tabla(request):
                 return JsonResponse({'ok': False, 'error': f"Error en consulta: {df['error'][0]}"})
 
         elif source_type == 'sql_script':
-            # Para scripts SQL, vamos a crear tablas temporales con prefijo en lugar de schema temporal
-            if not engine_url:
-                return JsonResponse({'ok': False, 'error': 'Sin conexión'})
-            
+            # Se leen del script las columnas y las primeras filas de la tabla, sin ejecutarlo
             script = request.session.get('sql_script', '')
-            if not script:
+            script_ruta = request.session.get('sql_script_ruta')
+            if not script and not (script_ruta and os.path.isfile(script_ruta)):
                 return JsonResponse({'ok': False, 'error': 'Script SQL no disponible'})
-              # Crea schema temporal único para preview
-            import uuid
-            temp_schema = f"__preview_{uuid.uuid4().hex[:8]}"
-            engine = create_engine(engine_url)
+            registro = request.session.get('sql_staging')
+            # Solo se leen del staging las tablas que el script creó allí (con su nombre real)
+            en_staging = {t.lower(): t for t in registro['tablas']} if registro else {}
             try:
-                with engine.begin() as conn:
-                    # SQL Server usa sintaxis diferente para crear schemas
-                    conn.execute(text(f"IF NOT EXISTS (SELECT * FROM sys.schemas WHERE name = '{temp_schema}') BEGIN EXEC('CREATE SCHEMA [{temp_schema}]') END"))
-                    
-                    # Modifica el script para crear tablas en schema temporal
-                    def _reemplazar_tabla(m):
-                        nombre_tabla = m.group(2)
-                        return f"{m.group(1)} [{temp_schema}].[{nombre_tabla}]"
-                    
-                    script_mod = re.sub(r'(?i)\b(CREATE\s+TABLE|INSERT\s+INTO)\s+`?([A-Za-z0-9_]+)`?',
-                                        _reemplazar_tabla, script)
-                    
-                    # Ejecuta el script modificado en el schema temporal
-                    for stmt in [s.strip() for s in script_mod.split(';') if s.strip()]:
-                        try:
-                            conn.execute(text(stmt))
-                        except Exception:
-                            pass  # Ignoramos errores individuales
-                  # Ahora lee la tabla específica desde el schema temporal
-                safe_tabla = re.sub(r'[^A-Za-z0-9_]', '', tabla)
-                try:
-                    # Intenta leer la tabla - SQL Server usa TOP en lugar de LIMIT
-                    df = pd.read_sql(f"SELECT TOP {sample_rows} * FROM [{temp_schema}].[{safe_tabla}]", engine)
-                except Exception:
-                    # Si falla, devuelve estructura vacía
-                    return JsonResponse({
-                        'ok': True, 
-                        'columnas': [], 
-                        'data': [],
-                        'warning': 'La tabla parece no existir o está vacía'                    })
-                finally:
-                    # Siempre limpia el schema temporal - SQL Server
-                    with engine.begin() as conn:
-                        conn.execute(text(f"DROP SCHEMA IF EXISTS [{temp_schema}]"))
+                if engine_url and tabla.lower() in en_staging:
+                    # El script ya se importó en el staging de la sesión: leer de allí
+                    df = staging_sql.leer(get_engine(engine_url), registro, en_staging[tabla.lower()], filas=filas_esquema)
+                elif script:
+                    df = previsualizar_tabla(script, tabla, filas_esquema)
+                else:
+                    with open(script_ruta, 'r', encoding='utf-8', errors='ignore') as f:
+                        df = previsualizar_tabla(f, tabla, filas_esquema)
             except Exception as e:
                 return JsonResponse({'ok': False, 'error': f"Error al preparar vista previa: {str(e)}"})
+            if not len(df.columns):
+                return JsonResponse({
+                    'ok': True,
+                    'columnas': [],
+                    'data': [],
+                    'warning': 'La tabla parece no existir o está vacía'
+                })
         else:
             return JsonResponse({'ok': False, 'error': 'Tipo de origen desconocido'})
         
         # Procesamiento común final
+        try:
+            # Tipos SQL con los que se crearía la tabla al guardar
+            esquema = inferir_esquema(df)
+        except Exception:
+            esquema = []
+        df = df.head(sample_rows)
         cols = [str(c) for c in df.columns]
         # Limitar longitud de valores para preview
         def _tr(v):
@@ -1474,7 +1239,7 @@ def preview_tabla(request):
     except Exception as e:
         return JsonResponse({'ok': False, 'error': str(e)})
 
-    return JsonResponse({'ok': True, 'columnas': cols, 'data': data})
+    return JsonResponse({'ok': True, 'columnas': cols, 'data': data, 'esquema': esquema})
 
 
 # ===== MODIFICACIÓN FLUJO seleccionar_datos: integrar columnas en el paso 2 (sin step 3) =====
@@ -1495,12 +1260,13 @@ def seleccionar_datos(request):
     if not engine_url:
         messages.error(request, "Sesión expirada. Conecta de nuevo.")
         return redirect('subir_desde_mysql')
-    engine = create_engine(engine_url)
+    engine = get_engine(engine_url)
 
     # Reset rápido vía ?reset=1
     if request.GET.get('reset') == '1':
         for k in ['wizard_step', 'source_type', 'temp_file', 'excel_sheets', 'created_tables']:
             request.session.pop(k, None)
+        staging_sql.eliminar(engine, request.session.pop('sql_staging', None))
         request.session['wizard_step'] = 1
         return redirect('seleccionar_datos')
 
@@ -1515,11 +1281,11 @@ def seleccionar_datos(request):
         modo = request.POST.get('modo_origen', 'local')
 
         # Limpiar estado previo
-        for k in ['source_type','temp_file','excel_sheets','created_tables','sql_script','candidate_sql_tables']:
+        for k in ['source_type','temp_file','excel_sheets','created_tables','sql_script','sql_script_ruta','candidate_sql_tables']:
             request.session.pop(k, None)
+        staging_sql.eliminar(engine, request.session.pop('sql_staging', None))
 
         import tempfile, shutil
-        script = ''
         archivo_path = None
 
         # 1. Obtener archivo (local o compartido)
@@ -1539,9 +1305,6 @@ def seleccionar_datos(request):
                 with open(full_path, 'rb') as fsrc, open(tmp.name, 'wb') as fdst:
                     shutil.copyfileobj(fsrc, fdst)
                 archivo_path = tmp.name
-                if ext == '.sql':
-                    with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        script = f.read()
             else:
                 archivo = request.FILES.get('archivo_fuente')
                 if not archivo:
@@ -1554,9 +1317,6 @@ def seleccionar_datos(request):
                     tmp.write(chunk)
                 tmp.close()
                 archivo_path = tmp.name
-                if ext == '.sql':
-                    archivo.seek(0)
-                    script = archivo.read().decode('utf-8', errors='ignore')
         except Exception as e:
             messages.error(request, f"Error leyendo el archivo: {e}")
             return redirect('seleccionar_datos')
@@ -1564,12 +1324,12 @@ def seleccionar_datos(request):
         # 2. Procesar según extensión
         if ext in ('.xlsx', '.xls'):
             try:
-                xls = pd.ExcelFile(archivo_path)
+                hojas = nombres_hojas(archivo_path)
                 request.session['source_type'] = 'excel'
                 request.session['temp_file'] = archivo_path
-                request.session['excel_sheets'] = xls.sheet_names
+                request.session['excel_sheets'] = hojas
                 request.session['wizard_step'] = 2
-                messages.success(request, f"Excel cargado ({len(xls.sheet_names)} hojas). Selecciona qué subir.")
+                messages.success(request, f"Excel cargado ({len(hojas)} hojas). Selecciona qué subir.")
             except Exception as e:
                 messages.error(request, f"Error leyendo Excel: {e}")
                 return redirect('seleccionar_datos')
@@ -1582,41 +1342,33 @@ def seleccionar_datos(request):
             messages.success(request, "CSV cargado. Selecciona columnas.")
 
         elif ext == '.sql':
-            if not script.strip():
+            # Recorrido previo línea a línea: tablas, número aproximado de sentencias
+            # y sintaxis MySQL, sin cargar el script completo en memoria
+            patt = re.compile(r'create\s+table\s+`?([A-Za-z0-9_]+)`?', re.IGNORECASE)
+            tablas = []
+            sentencias_detectadas = 0
+            conversion_flag = False
+            hay_contenido = False
+            with open(archivo_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for linea in f:
+                    tablas.extend(patt.findall(linea))
+                    sentencias_detectadas += linea.rstrip().endswith(';')
+                    conversion_flag = conversion_flag or '`' in linea or 'ENGINE=' in linea
+                    hay_contenido = hay_contenido or bool(linea.strip())
+            if not hay_contenido:
                 messages.error(request, "Script SQL vacío.")
                 return redirect('seleccionar_datos')
 
-            patt = re.compile(r'create\s+table\s+`?([A-Za-z0-9_]+)`?', re.IGNORECASE)
-            tablas = patt.findall(script)
             tablas = sorted(list(dict.fromkeys(tablas)))
             if not tablas:
                 messages.warning(request, "No se detectaron tablas en el script. Aun así se ejecutará.")
 
-            errores = []
-            total_filas = 0
-            # Pre-scan tablas existentes para poder decidir si habrá cambios
-            tablas_existentes = set()
-            if tablas:
-                try:
-                    with engine.connect() as _chk_conn:
-                        for _t in tablas:
-                            try:
-                                res = _chk_conn.execute(text("SELECT 1 FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = :t AND TABLE_CATALOG = DB_NAME()"), {"t": _t})
-                                if res.scalar():
-                                    tablas_existentes.add(_t)
-                            except Exception:
-                                pass
-                except Exception:
-                    pass
             # Registro inicial en SqlFileUpload / ProcessAutomation
             from .db_models import SqlFileUpload, ProcessAutomation
-            from django.utils import timezone
             import json as _json
             try:
                 nombre_archivo_sql = nombre_archivo if modo == 'compartido' else (archivo.name if 'archivo' in locals() and archivo else 'script.sql')
-                sentencias_detectadas = len([b for b in script.split(';') if b.strip()])
-                conversion_flag = ('`' in script or 'ENGINE=' in script)
-                tamanio_bytes = os.path.getsize(archivo_path) if os.path.exists(archivo_path) else len(script.encode('utf-8'))
+                tamanio_bytes = os.path.getsize(archivo_path)
                 sql_upload = SqlFileUpload(
                     nombre_archivo=nombre_archivo_sql,
                     tamanio_bytes=tamanio_bytes,
@@ -1632,7 +1384,7 @@ def seleccionar_datos(request):
                 process_record = ProcessAutomation(
                     nombre=f"Importación SQL (web): {nombre_archivo_sql}",
                     tipo_proceso="Importación SQL",
-                    estado="En proceso",
+                    estado="En cola" if jobs.ASINCRONA else "En proceso",
                     tiempo_ejecucion=0,
                     usuario=request.user.username if request.user.is_authenticated else 'usuario_anónimo',
                     parametros=_json.dumps({
@@ -1648,92 +1400,10 @@ def seleccionar_datos(request):
                 sql_upload = None
                 process_record = None
                 messages.warning(request, f"No se pudo registrar la subida inicial: {_reg_err}")
-            try:
-                bloques = [b.strip() for b in script.split(';') if b.strip()]
-                # Caso: todas las tablas ya existen y no queremos rehacer nada -> Guardado_sin_cambios
-                if tablas and len(tablas_existentes) == len(tablas):
-                    estado_final = 'Guardado_sin_cambios'
-                    messages.info(request, f"Todas las tablas ({len(tablas)}) ya existían. No se aplicaron cambios.")
-                    if sql_upload:
-                        sql_upload.estado = estado_final
-                        sql_upload.sentencias_exito = 0
-                        sql_upload.save()
-                    if process_record:
-                        process_record.estado = 'Guardado sin cambios'
-                        process_record.resultado = _json.dumps({'tablas': tablas, 'sin_cambios': True})
-                        process_record.save()
-                else:
-                    # Ejecutar normalmente solo si hay potencial de crear algo nuevo
-                    with engine.begin() as conn:
-                        for stmt in bloques:
-                            try:
-                                conn.execute(text(stmt))
-                            except Exception as e:
-                                # Detectar error benigno de existencia y tratarlo como skip
-                                msg_err = str(e)
-                                if 'already exists' in msg_err.lower() or 'ya existe' in msg_err.lower():
-                                    errores.append({'stmt': stmt[:60], 'error': 'EXISTS_SKIP'})
-                                else:
-                                    errores.append({'stmt': stmt[:60], 'error': msg_err})
-                                    messages.warning(request, f"Error al ejecutar: {msg_err}")
-                    if tablas:
-                        with engine.connect() as count_conn:
-                            for t in tablas:
-                                try:
-                                    result = count_conn.execute(text(f"SELECT COUNT(*) FROM [{t}]"))
-                                    filas = result.scalar() or 0
-                                    total_filas += filas
-                                except Exception:
-                                    pass
-                    mensajes_estado = []
-                    skips = sum(1 for e in errores if e['error'] == 'EXISTS_SKIP')
-                    reales = [e for e in errores if e['error'] != 'EXISTS_SKIP']
-                    if skips and not reales:
-                        estado_final = 'Guardado_sin_cambios'
-                        mensajes_estado.append(f"{skips} sentencias omitidas por existencia previa.")
-                    elif reales:
-                        estado_final = 'Parcial'
-                        mensajes_estado.append(f"{len(reales)} errores reales.")
-                    else:
-                        estado_final = 'Completado'
-                    messages.success(request, f"Script ejecutado. {len(tablas)} tabla(s), {total_filas} fila(s). {' '.join(mensajes_estado)}")
-                    if sql_upload:
-                        sql_upload.sentencias_exito = len(bloques) - len(reales)
-                        sql_upload.estado = estado_final
-                        if reales:
-                            sql_upload.errores = _json.dumps(reales[:50])
-                        else:
-                            sql_upload.errores = 'Sin errores'
-                        sql_upload.save()
-                    if process_record:
-                        process_record.estado = estado_final.replace('_', ' ')
-                        process_record.filas_afectadas = total_filas
-                        if reales:
-                            process_record.resultado = _json.dumps({
-                                'tablas': tablas,
-                                'errores_reales': reales[:20],
-                                'skips_existencia': skips,
-                                'filas_totales': total_filas,
-                                'sentencias_totales': len(bloques),
-                                'sentencias_exito': len(bloques) - len(reales)
-                            })
-                        else:
-                            process_record.resultado = 'Sin errores'
-                        process_record.save()
-            except Exception as e:
-                messages.error(request, f"Error global ejecutando script: {e}")
-                try:
-                    if sql_upload:
-                        sql_upload.estado = 'Error'
-                        sql_upload.errores = _json.dumps({'error': str(e)})
-                        sql_upload.save()
-                    if process_record:
-                        process_record.estado = 'Error'
-                        process_record.error_mensaje = str(e)
-                        process_record.save()
-                except Exception:
-                    pass
 
+            # (Opcional) guardar como proceso: su primera ejecución es la de este script
+            run = None
+            nombre_proc = None
             if request.POST.get('guardar_proceso'):
                 import time
                 from sqlalchemy.engine.url import make_url
@@ -1743,7 +1413,8 @@ def seleccionar_datos(request):
                     "nombre_proceso": nombre_proc,
                     "origen": {
                         "tipo": "sql_script",
-                        "contenido": script,  # Guardar script completo para re-ejecución
+                        # Copia durable del script: el proceso lo relee por fragmentos, sin guardarlo en la BD
+                        **procesos.guardar_script(archivo_path, nombre_proc),
                         "tablas_resultantes": tablas
                     },
                     "destino": {
@@ -1765,20 +1436,44 @@ def seleccionar_datos(request):
                         descripcion="Proceso (ejecutado inmediatamente)",
                         json_config=cfg
                     )
-                    run = ProcessRunLog.objects.create(
-                        proceso=proceso,
-                        exito=True,
-                        filas_totales=total_filas,
-                        mensaje=f"OK. Filas procesadas: {total_filas}",
-                        fin=timezone.now()
-                    )
-                    if errores:
-                        run.errores = errores
-                        run.save()
-                    messages.success(request, f"Proceso '{nombre_proc}' guardado y registrado.")
+                    run = ProcessRunLog.objects.create(proceso=proceso, mensaje="En ejecución")
                 except Exception as e:
                     messages.error(request, f"No se pudo guardar el proceso: {e}")
 
+            # Ejecutar el script (en esta petición o en el worker de la cola)
+            trabajo = jobs.enviar('script_seleccion', {
+                'archivo_path': archivo_path,
+                'conexion': 'sqlserver',
+                'tablas': tablas,
+                'sql_upload_id': sql_upload.id if sql_upload else None,
+                'process_id': process_record.id if process_record else None,
+                'run_id': run.id if run else None,
+            }, sentencias_total=sentencias_detectadas or None,
+               process_automation_id=process_record.id if process_record else None,
+               run_log=run)
+
+            if trabajo.estado == 'pendiente':
+                request.session['trabajo_en_curso'] = trabajo.id
+                messages.info(request, f"Script en cola (trabajo #{trabajo.id}). El avance se muestra en la parte superior de la página.")
+            elif trabajo.estado == 'error':
+                messages.error(request, f"Error global ejecutando script: {trabajo.mensaje}")
+            else:
+                resultado = trabajo.resultado
+                if resultado['sin_cambios']:
+                    messages.info(request, f"Todas las tablas ({len(tablas)}) ya existían. No se aplicaron cambios.")
+                else:
+                    for error in resultado['errores']:
+                        messages.warning(request, f"Error al ejecutar: {error['error']}")
+                    mensajes_estado = []
+                    if resultado['estado_final'] == 'Guardado_sin_cambios':
+                        mensajes_estado.append(f"{resultado['skips']} sentencias omitidas por existencia previa.")
+                    elif resultado['estado_final'] == 'Parcial':
+                        mensajes_estado.append(f"{len(resultado['errores'])} errores reales.")
+                    messages.success(request, f"Script ejecutado. {len(tablas)} tabla(s), {resultado['total_filas']} fila(s). {' '.join(mensajes_estado)}")
+
+            if run:
+                messages.success(request, f"Proceso '{nombre_proc}' guardado y registrado.")
+
             return redirect('index')
 
         else:
@@ -1796,35 +1491,30 @@ def seleccionar_datos(request):
         
         source_type = request.session.get('source_type')
         normalizar = bool(request.POST.get('aplicar_normalizacion'))
+        reglas_normalizacion = request.POST.get('reglas_normalizacion') or 'basica'
+        inferir_tipos = bool(request.POST.get('inferir_tipos'))
+        if normalizar and reglas_normalizacion not in REGLAS_NORMALIZACION:
+            messages.error(request, f"Reglas de normalización desconocidas: {reglas_normalizacion}")
+            return redirect('seleccionar_datos')
         procesadas = 0
         detalles = []
 
+        staging_registro = None
         if source_type == 'sql_script':
             script = request.session.get('sql_script', '')
-            if not script:
+            script_ruta = request.session.get('sql_script_ruta')
+            if not script and not (script_ruta and os.path.isfile(script_ruta)):
                 messages.error(request, "Script no disponible en sesión.")
                 return redirect('seleccionar_datos')
-            
-            temp_schema = f"__tmp_{uuid.uuid4().hex[:8]}"
             try:
-                with engine.begin() as conn:
-                    # SQL Server usa sintaxis diferente para crear schemas
-                    conn.execute(text(f"IF NOT EXISTS (SELECT * FROM sys.schemas WHERE name = '{temp_schema}') BEGIN EXEC('CREATE SCHEMA [{temp_schema}]') END"))
-                    # Reescribir CREATE/INSERT apuntando al schema temporal
-                    def _reemplazar_tabla(m):
-                        nombre_tabla = m.group(2)
-                        return f"{m.group(1)} [{temp_schema}].[{nombre_tabla}]"
-                    script_mod = re.sub(r'(?i)\b(CREATE\s+TABLE|INSERT\s+INTO)\s+`?([A-Za-z0-9_]+)`?',
-                                        _reemplazar_tabla, script)
-                    for stmt in [s.strip() for s in script_mod.split(';') if s.strip()]:
-                        conn.execute(text(stmt))
+                # El script se importa una sola vez por sesión; un reintento reutiliza el staging
+                staging_registro = staging_sql.preparar(
+                    engine, script=script or None, ruta=script_ruta, registro=request.session.get('sql_staging')
+                )
+                request.session['sql_staging'] = staging_registro
             except Exception as e:
-                messages.error(request, f"Fallo ejecutando script: {e}")                # Intentar limpiar
-                with engine.begin() as c:
-                    try:
-                        c.execute(text(f"DROP SCHEMA IF EXISTS [{temp_schema}]"))
-                    except:
-                        pass
+                request.session.pop('sql_staging', None)
+                messages.error(request, f"Fallo ejecutando script: {e}")
                 return redirect('seleccionar_datos')
 
         for tabla in tablas_sel:
@@ -1832,15 +1522,13 @@ def seleccionar_datos(request):
             if not cols_sel:
                 continue            # Cargar DataFrame
             if source_type == 'excel':
-                df_full = pd.read_excel(request.session['temp_file'], sheet_name=tabla, dtype=object)
+                df_full = leer_excel(request.session['temp_file'], tabla, dtype=object)
             elif source_type == 'csv':
                 df_full = pd.read_csv(request.session['temp_file'], dtype=object)
             elif source_type == 'sql_script':
-                # Leer de schema temporal
-                safe = re.sub(r'[^A-Za-z0-9_]', '', tabla)
+                # Leer del staging de la sesión
                 try:
-                    select_cols = ", ".join([f"[{c}]" for c in cols_sel])
-                    df_full = pd.read_sql(f"SELECT {select_cols} FROM [{temp_schema}].[{safe}]", engine)
+                    df_full = staging_sql.leer(engine, staging_registro, tabla, cols_sel)
                 except Exception:
                     df_full = pd.DataFrame(columns=cols_sel)
             else:
@@ -1876,30 +1564,33 @@ def seleccionar_datos(request):
             df = df.rename(columns=nuevos)
 
             if normalizar and not df.empty:
-                for c in df.columns:
-                    df[c] = df[c].apply(_normalizar_celda)
+                # Vectorizada por columna; las columnas solo enteras quedan como Int64
+                df = normalizar_dataframe(df, reglas_normalizacion)
+
+            tipos_sql = None
+            if inferir_tipos and not df.empty:
+                # INT/DECIMAL/DATE/NVARCHAR(n) en lugar de NVARCHAR(MAX) para todo
+                df, esquema = tipar_dataframe(df)
+                tipos_sql = tipos_sqlalchemy(esquema)
 
             final_name = request.POST.get(f'nombre_tabla_final_{tabla}', tabla).strip() or tabla
             final_name = re.sub(r'\W+', '_', final_name)[:60]
             try:
-                df.to_sql(final_name, engine, if_exists='replace', index=False)
+                cargar_dataframe(df, final_name, engine, if_exists='replace', dtype=tipos_sql)
                 procesadas += 1
                 detalles.append(f"{final_name}({len(df)})")
             except Exception as e:
                 messages.error(request, f"Error guardando {final_name}: {e}")
 
-        # Limpiar schema temporal si hubo script        if source_type == 'sql_script':
-            with engine.begin() as conn:
-                try:
-                    conn.execute(text(f"DROP SCHEMA [{temp_schema}]"))
-                except:
-                    pass
+        # El asistente termina aquí: eliminar el staging del script
+        if source_type == 'sql_script':
+            staging_sql.eliminar(engine, request.session.pop('sql_staging', None))
 
         if procesadas:
             messages.success(request, f"{procesadas} tabla(s) guardada(s): " + ", ".join(detalles))
         else:
             messages.error(request, "No se guardó ninguna tabla.")
-        for k in ['wizard_step','source_type','temp_file','excel_sheets','created_tables','sql_script','candidate_sql_tables']:
+        for k in ['wizard_step','source_type','temp_file','excel_sheets','created_tables','sql_script','sql_script_ruta','candidate_sql_tables']:
             request.session.pop(k, None)
         return redirect('index')
 
@@ -1917,7 +1608,8 @@ def seleccionar_datos(request):
         return render(request, 'archivos/seleccionar_datos.html', {
             'step': 2,
             'tablas_disponibles': tablas_disponibles,
-            'source_type': source_type
+            'source_type': source_type,
+            'reglas_normalizacion': list(REGLAS_NORMALIZACION),
         })
 
     return render(request, 'archivos/seleccionar_datos.html', {'step': 1})
@@ -1932,41 +1624,10 @@ def _extraer_tablas_creadas(engine):
         WHERE TABLE_TYPE = 'BASE TABLE' 
         AND TABLE_CATALOG = DB_NAME()
         """
-        return pd.read_sql(query, engine)['TABLE_NAME'].tolist()
+        return [nombre for bloque in iterar_consulta(engine, query) for nombre in bloque['TABLE_NAME']]
     except Exception:
         return []
 
-def _normalizar_celda(valor):
-    """
-    Normaliza una celda según reglas simples:
-      - Cadenas vacías o equivalentes a nulo ('n/a', 'na', 'none', 'null') -> None
-      - Si la cadena inicia con un número entero (ej: '15 días', '20kg', '  7 items') devuelve ese entero
-      - En cualquier otro caso devuelve el valor original
-    No altera tipos que no sean str.
-    """
-    if isinstance(valor, str):
-        texto = valor.strip()
-        if not texto or texto.lower() in ('n/a', 'na', 'none', 'null'):
-            return None
-
-        # Captura un entero inicial (positivo o negativo) al comienzo de la cadena
-        coincidencia = re.match(r'^(-?\d+)', texto)
-        if coincidencia:
-            numero_str = coincidencia.group(1)
-            try:
-                return int(numero_str)
-            except Exception:
-                # Si falla la conversión, se deja el valor original
-                pass
-
-    return valor
-
-
-
-
-
-
-
 
 def procesos_list(request):
     """Listado de configuraciones de procesos guardados con filtros y paginación.
@@ -2120,35 +1781,30 @@ def gestionar_carpetas(request):
 
 def listar_archivos(request, carpeta_id):
     """Lista archivos (excel/csv/txt) en una carpeta compartida."""
-    from .models import CarpetaCompartida, ArchivoDetectado
-    from datetime import datetime
+    from .models import CarpetaCompartida
     carpeta = get_object_or_404(CarpetaCompartida, id=carpeta_id)
-    carpeta_accesible = os.path.exists(carpeta.ruta) and os.path.isdir(carpeta.ruta)
     archivos_detectados = []
     tipos_archivo = {}
+    refrescar = request.GET.get('refrescar') == '1'
+    if getattr(settings, 'VIGILANTE_CARPETAS_ACTIVO', False) and not refrescar:
+        # El comando vigilar_carpetas mantiene los registros al día: solo se consulta la BD
+        archivos_detectados = list(ArchivoDetectado.objects.filter(carpeta=carpeta).order_by('nombre'))
+        for archivo_obj in archivos_detectados:
+            tipos_archivo[archivo_obj.tipo] = tipos_archivo.get(archivo_obj.tipo, 0) + 1
+        carpeta_accesible = carpeta.ultimo_escaneo is not None
+        return render(request, 'archivos/listar_archivos.html', {
+            'carpeta': carpeta,
+            'archivos': archivos_detectados,
+            'carpeta_accesible': carpeta_accesible,
+            'total_archivos': len(archivos_detectados),
+            'tipos_archivo': tipos_archivo,
+        })
+    carpeta_accesible = os.path.exists(carpeta.ruta) and os.path.isdir(carpeta.ruta)
     if carpeta_accesible:
         try:
-            for archivo_nombre in os.listdir(carpeta.ruta):
-                archivo_path = os.path.join(carpeta.ruta, archivo_nombre)
-                if os.path.isfile(archivo_path) and archivo_nombre.lower().endswith(('.xlsx', '.xls', '.csv', '.txt')):
-                    if archivo_nombre.lower().endswith(('.xlsx', '.xls')):
-                        tipo = 'excel'
-                    elif archivo_nombre.lower().endswith('.csv'):
-                        tipo = 'csv'
-                    else:
-                        tipo = 'txt'
-                    archivo_obj, _created = ArchivoDetectado.objects.get_or_create(
-                        ruta_completa=archivo_path,
-                        defaults={
-                            'nombre': archivo_nombre,
-                            'carpeta': carpeta,
-                            'tipo': tipo,
-                            'tamaño': os.path.getsize(archivo_path),
-                            'fecha_modificacion': datetime.fromtimestamp(os.path.getmtime(archivo_path))
-                        }
-                    )
-                    archivos_detectados.append(archivo_obj)
-                    tipos_archivo[tipo] = tipos_archivo.get(tipo, 0) + 1
+            archivos_detectados = escanear_carpeta(carpeta, forzar=refrescar)
+            for archivo_obj in archivos_detectados:
+                tipos_archivo[archivo_obj.tipo] = tipos_archivo.get(archivo_obj.tipo, 0) + 1
         except Exception as e:
             messages.error(request, f'Error al leer la carpeta: {e}')
             carpeta_accesible = False
@@ -2165,98 +1821,77 @@ def listar_archivos(request, carpeta_id):
 def ejecutar_proceso(request, proceso_id):
     proceso = get_object_or_404(ProcessConfig, id=proceso_id, activo=True)
     run = ProcessRunLog.objects.create(proceso=proceso)
-    cfg = proceso.json_config
-    errores = []
-    total_filas = 0
-    try:
-        destino = cfg['destino']
-        motor = destino['motor']
-        conn = destino['conexion']
-        # Validación específica: usuario indicó SQL Server pero motor mal configurado (p.e. 'mysql')
-        # Detectamos patrón de instancia '\\' o puerto 1433 combinado con motor mysql y lo corregimos.
-        if motor == 'mysql' and (('\\' in str(conn.get('host',''))) or str(conn.get('puerto')) == '1433'):
-            messages.warning(request, "Configuración detectada como SQL Server; ajustando motor a mssql automáticamente.")
-            motor = 'mssql'
-        if motor == 'mysql':
-            engine_url = f"mysql+pymysql://{conn['usuario']}:{conn['password']}@{conn['host']}:{conn['puerto']}/{conn['base']}"
-        elif motor == 'postgres':
-            engine_url = f"postgresql://{conn['usuario']}:{conn['password']}@{conn['host']}:{conn['puerto']}/{conn['base']}"
-        elif motor == 'mssql':
-            # Soportar host con instancia (host\INSTANCIA) sin puerto explícito
-            host_val = conn['host']
-            puerto_val = conn.get('puerto')
-            if '\\' in host_val:
-                # Si hay instancia y además puerto (posible conflicto), preferimos host\INSTANCIA y omitimos puerto
-                engine_url = f"mssql+pyodbc://{conn['usuario']}:{conn['password']}@{host_val}/{conn['base']}?driver=ODBC+Driver+17+for+SQL+Server"
-            else:
-                engine_url = f"mssql+pyodbc://{conn['usuario']}:{conn['password']}@{host_val},{puerto_val}/{conn['base']}?driver=ODBC+Driver+17+for+SQL+Server"
-        else:
-            raise ValueError("Motor destino no soportado")
-        engine = create_engine(engine_url)
-
-        origen = cfg['origen']
-        if origen['tipo'] in ('excel','csv'):
-            # ...existing code para excel/csv...
-            pass  # (deja tu implementación previa)
-        elif origen['tipo'] == 'sql_script':
-            # Cargar script inline o desde archivo definido en configuracion
-            sql_text = origen.get('contenido')
-            if not sql_text:
-                ruta_base = origen.get('ruta_base') or ''
-                archivo_script = origen.get('archivo')
-                if not archivo_script:
-                    raise ValueError("Script SQL no definido en configuración.")
-                script_path = os.path.join(ruta_base, archivo_script) if ruta_base else archivo_script
-                with open(script_path, 'r', encoding='utf-8') as f:
-                    sql_text = f.read()
-            bloques = [b.strip() for b in sql_text.split(';') if b.strip()]
-            with engine.begin() as conn:
-                for stmt in bloques:
-                    try:
-                        conn.execute(text(stmt))
-                    except Exception as e:
-                        errores.append({'stmt': stmt[:60], 'error': str(e)})
-                        if cfg.get('ejecucion', {}).get('on_error') == 'stop':
-                            raise
-            # 2. Opcional: post_copia tablas (si quieres mapear a otros nombres)
-            for m in origen.get('tablas_resultantes', []):
-                # m puede ser string (mismo nombre) o dict {'origen':'t1','destino':'t2','modo':'replace'}
-                if isinstance(m, str):
-                    tabla_origen = tabla_destino = m
-                    modo = 'replace'
-                else:
-                    tabla_origen = m.get('origen')
-                    tabla_destino = m.get('destino', tabla_origen)
-                    modo = m.get('modo', 'replace')
-                if not tabla_origen:                    continue
-                df = pd.read_sql(f"SELECT * FROM [{tabla_origen}]", engine)
-                df.to_sql(tabla_destino, engine, if_exists=('replace' if modo=='replace' else 'append'), index=False)
-                total_filas += len(df)
-        else:
-            raise ValueError("Origen no implementado aún")
-
-        run.exito = True
-        run.filas_totales = total_filas
-        run.mensaje = f"OK. Filas procesadas: {total_filas}"
-    except Exception as e:
-        run.exito = False
-        run.mensaje = f"Fallo: {e}"
-        errores.append({'stack': traceback.format_exc()})
-    run.fin = timezone.now()
-    if errores:
-        run.errores = errores
-    run.save()
-    if run.exito:
+    trabajo = jobs.enviar('ejecutar_proceso', {'proceso_id': proceso.id, 'run_id': run.id}, run_log=run)
+
+    if trabajo.estado == 'pendiente':
+        # Solo si el worker no lo terminó ya (guardar `run` pisaría su resultado)
+        ProcessRunLog.objects.filter(pk=run.pk, fin__isnull=True).update(
+            mensaje=f"En cola (trabajo #{trabajo.id})")
+        request.session['trabajo_en_curso'] = trabajo.id
+        messages.info(request, f"Proceso '{proceso.nombre}' en cola (trabajo #{trabajo.id}).")
+        return redirect('procesos_list')
+
+    run.refresh_from_db()
+    if trabajo.estado == 'completado':
+        for aviso in trabajo.resultado.get('avisos', []):
+            messages.warning(request, aviso)
         messages.success(request, f"Proceso '{proceso.nombre}' ejecutado. Filas: {run.filas_totales}")
     else:
         messages.error(request, f"Proceso '{proceso.nombre}' falló: {run.mensaje}")
     return redirect('procesos_list')
 
 
+@require_GET
+def progreso_trabajo(request, trabajo_id):
+    """
+    Avance de un trabajo de la cola en JSON: sentencias ejecutadas, filas
+    cargadas, tiempo transcurrido y rendimiento. Al terminar el trabajo que la
+    página estaba siguiendo se olvida de la sesión.
+    """
+    trabajo = get_object_or_404(TrabajoCola, id=trabajo_id)
+    datos = jobs.resumen(trabajo)
+    if datos['terminado'] and request.session.get('trabajo_en_curso') == trabajo.id:
+        del request.session['trabajo_en_curso']
+    return JsonResponse(datos)
+
+
+@require_GET
+def navegar_tabla(request, tabla):
+    """
+    Página de filas de una tabla de la base conectada, en JSON por columnas
+    (ver navegador.pagina_tabla).
+    Parámetros (GET):
+      ?columnas=a,b,c        Proyección (todas si se omite)
+      ?filtro=col:op:valor   Repetible; op en eq, ne, lt, le, gt, ge, contiene, empieza, en, nulo, no_nulo
+      ?orden=col,-col2       Orden ('-' = descendente); por defecto la clave primaria
+      ?despues=<cursor>      Valor 'siguiente' de la página anterior
+      ?tamanio=100           Filas por página
+      ?contar=1              Contar las filas que cumplen los filtros
+    """
+    engine_url = request.session.get('engine_url')
+    if not engine_url:
+        return JsonResponse({'ok': False, 'error': 'Sin conexión'})
+    columnas = [c for c in request.GET.get('columnas', '').split(',') if c.strip()]
+    try:
+        pagina = navegador.pagina_tabla(
+            get_engine(engine_url),
+            tabla,
+            columnas=columnas or None,
+            filtros=[navegador.parsear_filtro(f) for f in request.GET.getlist('filtro')],
+            orden=navegador.parsear_orden(request.GET.get('orden')),
+            cursor=request.GET.get('despues') or None,
+            tamanio=request.GET.get('tamanio') or None,
+            contar=request.GET.get('contar') == '1',
+        )
+    except Exception as e:
+        return JsonResponse({'ok': False, 'error': str(e)})
+    return JsonResponse({'ok': True, **pagina})
+
+
 def _leer_origen_simple(tipo, archivo, hoja=None):
     try:
         if tipo == 'excel':
-            return pd.read_excel(archivo, sheet_name=hoja, dtype=object)
+            return leer_excel(archivo, hoja, dtype=object)
         if tipo == 'csv':
             return pd.read_csv(archivo, dtype=object)
     except Exception:
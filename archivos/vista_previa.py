@@ -0,0 +1,119 @@
+"""
+Vistas previas de datos en JSON por columnas
+
+df.to_html() arma en el servidor una tabla HTML completa (etiquetas,
+atributos y valores sin recortar) que luego viaja dentro del JSON o de la
+sesión. Aquí la vista previa es compacta:
+  - Nombres de columna una sola vez y una lista de valores por columna.
+  - Los textos largos se recortan a VISTA_PREVIA_LARGO_MAXIMO caracteres.
+  - Se codifica con orjson si está instalado (json de la biblioteca estándar
+    si no) y las respuestas de la API van comprimidas con gzip cuando el
+    cliente lo acepta y superan VISTA_PREVIA_GZIP_MINIMO bytes.
+El navegador dibuja la tabla con static/js/vista_previa.js, que solo crea las
+filas visibles.
+"""
+import datetime
+import gzip
+import json
+import math
+
+import numpy as np
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.safestring import mark_safe
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+LARGO_MAXIMO = getattr(settings, 'VISTA_PREVIA_LARGO_MAXIMO', 200)
+GZIP = getattr(settings, 'VISTA_PREVIA_GZIP', True)
+GZIP_MINIMO = getattr(settings, 'VISTA_PREVIA_GZIP_MINIMO', 1024)
+
+# Mismos reemplazos que el filtro json_script de Django: el JSON puede ir
+# dentro de <script> sin cerrar la etiqueta
+_ESCAPES_HTML = {ord('>'): '\\u003E', ord('<'): '\\u003C', ord('&'): '\\u0026'}
+
+
+def _valor(valor, largo):
+    """Valor JSON de una celda y si se recortó."""
+    if isinstance(valor, np.generic):
+        # Escalares de numpy dentro de columnas object
+        valor = valor.item()
+    if valor is None or isinstance(valor, (bool, int)):
+        return valor, False
+    if isinstance(valor, float):
+        return (valor if math.isfinite(valor) else None), False
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        texto = valor.isoformat()
+    else:
+        texto = str(valor)
+    if largo and len(texto) > largo:
+        return texto[:largo] + '…', True
+    return texto, False
+
+
+def serializar(df, filas=None, largo_maximo=None):
+    """
+    Vista previa por columnas de un DataFrame.
+
+    Parámetros:
+    - df: DataFrame
+    - filas: Máximo de filas (todas si es None)
+    - largo_maximo: Caracteres por valor (por defecto VISTA_PREVIA_LARGO_MAXIMO; 0 sin recorte)
+
+    Retorna:
+    - Dict serializable con 'columnas', 'valores' (una lista por columna, None
+      en las celdas vacías), 'filas' y 'recortados' (valores recortados)
+    """
+    largo = LARGO_MAXIMO if largo_maximo is None else largo_maximo
+    if filas is not None:
+        df = df.head(filas)
+    valores = []
+    recortados = 0
+    for _, serie in df.items():
+        # astype(object) entrega escalares de Python (int, float, Timestamp, str)
+        crudos = serie.astype(object).where(serie.notna(), None).tolist()
+        columna = []
+        for valor in crudos:
+            valor, recortado = _valor(valor, largo)
+            columna.append(valor)
+            recortados += recortado
+        valores.append(columna)
+    return {
+        'columnas': [str(c) for c in df.columns],
+        'valores': valores,
+        'filas': len(df),
+        'recortados': recortados,
+    }
+
+
+def codificar(datos):
+    """JSON compacto en bytes (orjson si está disponible)."""
+    if orjson is not None:
+        return orjson.dumps(datos, default=str)
+    return json.dumps(datos, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def para_plantilla(datos):
+    """JSON listo para incrustar en <script type="application/json"> de una plantilla."""
+    return mark_safe(codificar(datos).decode('utf-8').translate(_ESCAPES_HTML))
+
+
+def respuesta_json(request, datos):
+    """
+    HttpResponse con 'datos' en JSON, comprimida con gzip si el cliente la
+    acepta y el cuerpo supera VISTA_PREVIA_GZIP_MINIMO bytes.
+    """
+    cuerpo = codificar(datos)
+    comprimir = (GZIP and len(cuerpo) >= GZIP_MINIMO
+                 and 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if comprimir:
+        cuerpo = gzip.compress(cuerpo, compresslevel=6)
+    response = HttpResponse(cuerpo, content_type='application/json')
+    if comprimir:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -145,3 +145,110 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Ingesta por bloques de archivos CSV/TXT (archivos/ingesta.py)
+INGESTA_TAMANIO_BLOQUE = 50000  # Filas por bloque
+INGESTA_TAMANIO_MUESTRA = 64 * 1024  # Bytes usados para detectar el separador
+
+
+# Caché columnar (Arrow) de archivos ya parseados para la paginación (archivos/cache_datos.py)
+CACHE_DATOS_DIR = BASE_DIR / 'cache_datos'
+CACHE_DATOS_MAX_BYTES = 2 * 1024 ** 3  # Límite total en disco; se expulsan las entradas menos usadas
+CACHE_DATOS_MAX_ARCHIVOS = 500
+
+
+# Escaneo incremental de carpetas compartidas (archivos/escaner.py)
+ESCANER_MAX_EDAD_SEGUNDOS = 900  # Fuerza un recorrido completo aunque el mtime del directorio no cambie
+
+
+# Vigilante de carpetas en segundo plano (python manage.py vigilar_carpetas)
+VIGILANTE_CARPETAS_ACTIVO = False  # True: listar_archivos solo lee la BD que mantiene el vigilante
+VIGILANTE_INTERVALO = 30  # Segundos entre consultas en carpetas de red
+VIGILANTE_INTERVALO_MAX = 600  # Tope del backoff cuando no hay cambios
+
+
+# Área de staging para archivos subidos desde el navegador (archivos/staging.py)
+STAGING_DIR = BASE_DIR / 'staging'
+STAGING_TTL_SEGUNDOS = 6 * 3600  # Los archivos sin uso se eliminan pasado este tiempo
+
+
+# Carga masiva de DataFrames en base de datos (archivos/bulk_loader.py)
+CARGA_MASIVA_TAMANIO_LOTE = 10000  # Filas por lote; cada lote se confirma en su propia transacción
+
+
+# Pool de conexiones de los engines SQLAlchemy compartidos (archivos/engines.py)
+SQLALCHEMY_POOL_SIZE = 5
+SQLALCHEMY_MAX_OVERFLOW = 10
+SQLALCHEMY_POOL_RECYCLE = 1800  # Segundos; evita usar conexiones cerradas por el servidor
+SQLALCHEMY_POOL_PRE_PING = True
+
+
+# Ejecución de scripts SQL convertidos (mysql_to_sqlserver.execute_sqlserver_script)
+SQL_EJECUCION_MODO = 'lotes'  # 'lotes': agrupa DML y pliega INSERT de una fila; 'individual': una sentencia por viaje
+SQL_LOTE_MAX_BYTES = 256 * 1024
+SQL_LOTE_MAX_SENTENCIAS = 1000
+
+
+# Cola local de trabajos en segundo plano (archivos/jobs.py, python manage.py procesar_cola)
+COLA_TRABAJOS_ASINCRONA = False  # True: las importaciones SQL y los procesos se encolan y los ejecuta el worker
+COLA_TRABAJOS_WORKERS = 2  # Trabajos simultáneos por worker
+COLA_TRABAJOS_TIMEOUT_SEGUNDOS = 3600  # Sin avance durante este tiempo, el trabajo se marca como interrumpido
+
+
+# Programación de procesos guardados (archivos/programador.py, python manage.py programar_procesos)
+PROGRAMADOR_WORKERS = 4  # Ejecuciones simultáneas
+PROGRAMADOR_MAX_POR_DESTINO = 2  # Ejecuciones simultáneas contra una misma base de datos destino
+PROGRAMADOR_LIMITES_DESTINO = {}  # Excepciones por destino, p.e. {'mssql://servidor:1433/base': 1}
+PROGRAMADOR_JITTER_SEGUNDOS = 30  # Retraso aleatorio máximo al lanzar una ejecución vencida
+PROGRAMADOR_INTERVALO = 15  # Segundos entre revisiones de la programación
+
+
+# Scripts .sql de los procesos guardados desde el asistente (archivos/procesos.py)
+PROCESOS_SCRIPTS_DIR = BASE_DIR / 'procesos_scripts'
+
+
+# Origen excel/csv de los procesos guardados (archivos/carga_paralela.py)
+CARGA_ARCHIVOS_WORKERS = 4  # Procesos que leen y cargan hojas en paralelo (nunca más que CPUs)
+DIVISION_HOJAS_MEDIR_MEMORIA = False  # Informar el pico de memoria al dividir un Excel por hojas (tracemalloc, ~5x más lento)
+
+
+# Lectura de Excel (archivos/excel_reader.py, python manage.py benchmark_excel)
+EXCEL_MOTOR = 'auto'  # 'auto' (python-calamine si está instalado), 'calamine' u 'openpyxl'
+
+
+# Normalización del asistente de carga (archivos/normalizacion.py, python manage.py benchmark_normalizacion)
+NORMALIZACION_REGLAS = {}  # Juegos de reglas adicionales, p.e. {'estricta': {'nulos': ['', '-', 'sin dato'], 'recortar': True}}
+
+
+# Inferencia de tipos de columna antes de cargar (archivos/esquema.py)
+ESQUEMA_FILAS_MUESTRA = 10000  # Valores por columna examinados para decidir su tipo
+ESQUEMA_FILAS_PREVIEW = 1000  # Filas leídas en la vista previa del paso 2 para mostrar el esquema
+
+
+# Metadatos de tablas (archivos/metadatos.py): existencia y filas consultadas en lote
+METADATOS_TTL_SEGUNDOS = 30  # Segundos que se reutiliza el resultado; 0 desactiva la caché
+
+
+# Vista previa de scripts .sql sin ejecutarlos (archivos/sql_preview.py)
+SQL_PREVIEW_FILAS = 25  # Filas de muestra por tabla leídas de los INSERT del script
+
+
+# Staging de scripts .sql del asistente (archivos/staging_sql.py)
+STAGING_SQL_TTL_SEGUNDOS = 3600  # Los esquemas __stg_ más antiguos se eliminan aunque la sesión se haya abandonado
+
+
+# Lectura de consultas en streaming (archivos/lectura_sql.py): copias entre bases y lecturas por bloques
+LECTURA_SQL_ARRAYSIZE = 5000  # Filas que el driver pide al servidor en cada viaje
+LECTURA_SQL_TAMANIO_BLOQUE = 50000  # Filas por DataFrame entregado
+
+
+# Navegación paginada de tablas (archivos/navegador.py, api/tablas/<tabla>/filas/)
+NAVEGADOR_FILAS_PAGINA = 100
+NAVEGADOR_MAX_FILAS_PAGINA = 1000  # Tope del parámetro ?tamanio
+
+
+# Vistas previas en JSON por columnas (archivos/vista_previa.py)
+VISTA_PREVIA_LARGO_MAXIMO = 200  # Caracteres por valor; los textos más largos se recortan
+VISTA_PREVIA_GZIP = True  # Comprimir las respuestas de la API si el cliente acepta gzip
+VISTA_PREVIA_GZIP_MINIMO = 1024  # Bytes a partir de los que se comprime